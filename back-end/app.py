@@ -1,26 +1,48 @@
 # app.py
 # Aplicação FastAPI principal com todas as rotas
-from fastapi import FastAPI, HTTPException, Depends, status, Request
+from fastapi import FastAPI, HTTPException, Depends, status, Request, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from datetime import timedelta
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse, PlainTextResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+from urllib.parse import quote
+import asyncio
+import os
 import uvicorn
 
 # Imports locais
-from database import get_database_session, init_database
+from database import (
+    get_async_session, get_read_session, init_database, async_engine, read_async_engine,
+    AsyncSessionLocal, ReadSessionLocal, get_database_diagnostics, DB_PATH
+)
+from estatisticas import reconciliar_estatisticas, iniciar_pedidos_reconciliacao
 from models import Usuario, Aluno, Turma, HistoricoLogin, CargoEnum
 from schemas import (
+    StatusAlunoEnum,
     UsuarioCreate, UsuarioLogin, UsuarioResponse, UsuarioUpdate,
     AlunoCreate, AlunoUpdate, AlunoResponse, AlunoListResponse,
     TurmaCreate, TurmaUpdate, TurmaResponse, TurmaListResponse,
-    TokenResponse, MessageResponse, StatisticsResponse
+    TokenResponse, MessageResponse, StatisticsResponse, ImportacaoResponse
 )
 from auth import (
-    authenticate_user, create_access_token, get_current_user,
-    require_admin, require_admin_or_coordinator, ACCESS_TOKEN_EXPIRE_MINUTES
+    authenticate_user, create_access_token, get_current_user, get_current_user_model,
+    require_admin, require_admin_or_coordinator, ACCESS_TOKEN_EXPIRE_MINUTES,
+    UsuarioAutenticado, password_queue_depth
 )
 from services import UsuarioService, AlunoService, TurmaService, StatisticsService
+from importacao import detectar_formato, iter_linhas, iter_registros, iter_lotes
+import exportacao
+from buffer_acessos import buffer_acessos
+from limite_login import limitador_login, retry_after, ip_cliente
+from serializacao import json_list_response
+from versoes import obter_versoes, calcular_etag, etag_corresponde
+from retencao import executar_retencao, create_arquivo_engine, HISTORICO_RETENCAO_INTERVALO
+import metricas
+from instrumentacao import orcamento_consultas, RotaCronometrada
+from logs import configurar_logs
 
 # Inicializar aplicação
 app = FastAPI(
@@ -28,8 +50,13 @@ app = FastAPI(
     description="API completa para gerenciamento de escola com autenticação JWT",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    # orjson serializa bem mais rápido que o json da stdlib (ver bench_respostas.py)
+    default_response_class=ORJSONResponse
 )
+# Marca o fim de cada rota para separar a serialização no Server-Timing
+app.router.route_class = RotaCronometrada
+configurar_logs()
 
 # Configurar CORS
 app.add_middleware(
@@ -40,14 +67,153 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compressão das respostas: "gzip" (padrão), "brotli" (requer o pacote
+# opcional brotli-asgi; clientes sem suporte recebem gzip) ou "none".
+# Respostas menores que COMPRESSION_MIN_SIZE bytes seguem sem compressão.
+# GZIP_LEVEL 5 comprime quase como o 9 em uma fração do tempo de CPU.
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "gzip")
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+
+if RESPONSE_COMPRESSION == "brotli":
+    try:
+        from brotli_asgi import BrotliMiddleware
+        app.add_middleware(BrotliMiddleware, minimum_size=COMPRESSION_MIN_SIZE, gzip_fallback=True)
+    except ImportError:
+        print("⚠️ brotli-asgi não instalado; usando gzip")
+        RESPONSE_COMPRESSION = "gzip"
+if RESPONSE_COMPRESSION == "gzip":
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_SIZE, compresslevel=GZIP_LEVEL)
+
+# Métricas (GET /metrics). Adicionado por último para ficar mais externo e
+# medir também o tempo de compressão. METRICS_TOKEN, se definido, passa a
+# ser exigido como "Authorization: Bearer <token>" para ler as métricas.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+app.add_middleware(metricas.MetricsMiddleware)
+
+# Filas e pool lidos no momento da coleta
+metricas.Gauge("password_hash_queue_depth", "Requisições aguardando o pool de bcrypt",
+               funcao=password_queue_depth)
+metricas.Gauge("login_buffer_pending", "Tentativas de login aguardando gravação",
+               funcao=buffer_acessos.profundidade)
+metricas.Gauge("db_pool_size", "Tamanho configurado do pool de conexões",
+               funcao=lambda: async_engine.pool.size())
+metricas.Gauge("db_pool_checked_out", "Conexões do pool atualmente em uso",
+               funcao=lambda: async_engine.pool.checkedout())
+metricas.Gauge("db_read_pool_size", "Tamanho configurado do pool somente leitura",
+               funcao=lambda: read_async_engine.pool.size())
+metricas.Gauge("db_read_pool_checked_out", "Conexões do pool somente leitura em uso",
+               funcao=lambda: read_async_engine.pool.checkedout())
+
+async def _conditional_response(request: Request, response: Response, db: AsyncSession,
+                                tabelas: list, por_data: bool = False):
+    """
+    Calcula a ETag da listagem a partir das versões das tabelas envolvidas.
+    Se o cliente já tem essa versão (If-None-Match), retorna um 304 sem
+    executar a consulta; senão define ETag/Cache-Control na resposta e
+    retorna None. `por_data` inclui a data atual na ETag, para respostas
+    que dependem dela (a idade dos alunos muda à meia-noite).
+    """
+    versoes = await obter_versoes(db, tabelas)
+    if por_data:
+        versoes["data"] = date.today().isoformat()
+    etag = calcular_etag(request.url.path, versoes, str(request.query_params))
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_corresponde(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
 # Inicializar banco de dados na inicialização
+# Intervalo (s) da reconciliação periódica dos contadores do dashboard
+STATS_RECONCILE_INTERVAL = float(os.getenv("STATS_RECONCILE_INTERVAL", "600"))
+
+async def reconcile_statistics_periodically():
+    """
+    Recalcula os contadores do dashboard periodicamente para corrigir
+    desvios, ou antes, quando /statistics encontra contadores faltando
+    """
+    pedido = iniciar_pedidos_reconciliacao()
+    while True:
+        try:
+            await asyncio.wait_for(pedido.wait(), timeout=STATS_RECONCILE_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        pedido.clear()
+        try:
+            async with AsyncSessionLocal() as db:
+                await reconciliar_estatisticas(db)
+        except Exception as e:
+            print(f"⚠️ Erro ao reconciliar estatísticas: {e}")
+
+async def retain_login_history_periodically():
+    """Resume e arquiva o histórico de login antigo (ver retencao.py)"""
+    arquivo_engine = create_arquivo_engine()
+    try:
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    resultado = await executar_retencao(db, arquivo_engine)
+                print(f"🗃️ Retenção do histórico de login: {resultado}")
+            except Exception as e:
+                print(f"⚠️ Erro na retenção do histórico de login: {e}")
+            await asyncio.sleep(HISTORICO_RETENCAO_INTERVALO)
+    finally:
+        await arquivo_engine.dispose()
+
+# Com vários workers (start.py --modo producao) só o processo que obtiver
+# este lock executa a reconciliação e a retenção periódicas
+BACKGROUND_TASKS_LOCK = os.getenv("BACKGROUND_TASKS_LOCK", f"{DB_PATH}.tarefas.lock")
+
+def acquire_background_tasks_lock() -> bool:
+    """Tenta obter o lock das tarefas periódicas (liberado quando o processo termina)"""
+    try:
+        import fcntl
+    except ImportError:
+        return True  # Windows: sem fork, sempre um único processo
+    
+    arquivo = open(BACKGROUND_TASKS_LOCK, "a")
+    try:
+        fcntl.flock(arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        arquivo.close()
+        return False
+    app.state.background_lock = arquivo  # mantém o descritor (e o lock) aberto
+    return True
+
 @app.on_event("startup")
 async def startup_event():
     """Eventos de inicialização"""
     print("🚀 Iniciando Sistema de Gestão Escolar...")
     init_database()
+    app.state.stats_task = None
+    app.state.retention_task = None
+    if acquire_background_tasks_lock():
+        async with AsyncSessionLocal() as db:
+            await reconciliar_estatisticas(db)
+        app.state.stats_task = asyncio.create_task(reconcile_statistics_periodically())
+        if HISTORICO_RETENCAO_INTERVALO > 0:
+            app.state.retention_task = asyncio.create_task(retain_login_history_periodically())
+    await buffer_acessos.iniciar()
+    app.state.lag_task = asyncio.create_task(metricas.monitor_event_loop_lag())
     print("✅ Sistema pronto para uso!")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Eventos de encerramento"""
+    app.state.lag_task.cancel()
+    if app.state.stats_task:
+        app.state.stats_task.cancel()
+    if app.state.retention_task:
+        app.state.retention_task.cancel()
+    if getattr(app.state, "background_lock", None):
+        app.state.background_lock.close()
+        app.state.background_lock = None
+    await buffer_acessos.parar()
+    await async_engine.dispose()
+    if read_async_engine is not async_engine:
+        await read_async_engine.dispose()
+
 # ================================
 # ROTAS DE AUTENTICAÇÃO
 # ================================
@@ -55,11 +221,11 @@ async def startup_event():
 @app.post("/auth/register", response_model=MessageResponse, tags=["Autenticação"])
 async def register_user(
     user_data: UsuarioCreate,
-    db: Session = Depends(get_database_session)
+    db: AsyncSession = Depends(get_async_session)
 ):
     """Registrar novo usuário"""
     try:
-        user = UsuarioService.create_user(db, user_data)
+        user = await UsuarioService.create_user(db, user_data)
         return MessageResponse(
             message=f"Usuário {user.nome} criado com sucesso!",
             success=True
@@ -73,30 +239,46 @@ async def register_user(
         )
 
 @app.post("/auth/login", response_model=TokenResponse, tags=["Autenticação"])
+@orcamento_consultas(1)
 async def login_user(
     credentials: UsuarioLogin,
     request: Request,
-    db: Session = Depends(get_database_session)
+    db: AsyncSession = Depends(get_async_session)
 ):
     """Login de usuário"""
+    # Limite por IP/email antes de qualquer consulta ou bcrypt
+    ip_address = ip_cliente(
+        request.client.host if request.client else None,
+        request.headers.get("x-forwarded-for")
+    )
+    espera = await limitador_login.consumir(ip_address, credentials.email)
+    if espera is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas tentativas de login. Tente novamente mais tarde.",
+            headers={"Retry-After": retry_after(espera)}
+        )
+    
     # Autenticar usuário
-    user = authenticate_user(db, credentials.email, credentials.senha)
+    user = await authenticate_user(db, credentials.email, credentials.senha)
     if not user:
-        # Registrar tentativa de login falhada
-        historico = HistoricoLogin(
+        await limitador_login.registrar_falha(ip_address, credentials.email)
+        
+        # Registrar tentativa de login falhada (gravação adiada)
+        buffer_acessos.registrar_login(
             usuario_id=0,  # ID 0 para tentativas falhadas
-            ip_address=request.client.host,
+            ip_address=ip_address,
             user_agent=request.headers.get("user-agent"),
             sucesso=False
         )
-        db.add(historico)
-        db.commit()
         
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou senha incorretos"
         )
     
+    await limitador_login.registrar_sucesso(ip_address, credentials.email)
+    
     # Criar token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -104,64 +286,59 @@ async def login_user(
         expires_delta=access_token_expires
     )
     
-    # Atualizar último acesso
-    UsuarioService.update_last_access(db, user.id)
-    
-    # Registrar login bem-sucedido
-    historico = HistoricoLogin(
+    # Registrar login bem-sucedido e último acesso (gravação adiada)
+    ultimo_acesso = buffer_acessos.registrar_login(
         usuario_id=user.id,
-        ip_address=request.client.host,
+        ip_address=ip_address,
         user_agent=request.headers.get("user-agent"),
         sucesso=True
     )
-    db.add(historico)
-    db.commit()
     
     return TokenResponse(
         access_token=access_token,
         token_type="bearer",
-        user=UsuarioResponse.from_orm(user)
+        user=UsuarioResponse.from_orm(user).copy(update={"ultimo_acesso": ultimo_acesso})
     )
 
 @app.get("/auth/me", response_model=UsuarioResponse, tags=["Autenticação"])
-async def get_current_user_info(current_user: Usuario = Depends(get_current_user)):
+@orcamento_consultas(1)
+async def get_current_user_info(
+    user: Usuario = Depends(get_current_user_model)
+):
     """Obter informações do usuário atual"""
-    # Criar response manualmente para garantir que está correto
-    response_data = {
-        "id": current_user.id,
-        "nome": current_user.nome,
-        "email": current_user.email,
-        "cargo": current_user.cargo.value,  # Garantir que é string
-        "ativo": current_user.ativo,
-        "data_criacao": current_user.data_criacao,
-        "ultimo_acesso": current_user.ultimo_acesso
-    }
-    
-    return UsuarioResponse(**response_data)
+    return UsuarioResponse.from_orm(user)
 
 # ================================
 # ROTAS DE USUÁRIOS
 # ================================
 
 @app.get("/users", response_model=list[UsuarioResponse], tags=["Usuários"])
+@orcamento_consultas(3)
 async def list_users(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    current_user: Usuario = Depends(require_admin),
-    db: Session = Depends(get_database_session)
+    current_user: UsuarioAutenticado = Depends(require_admin),
+    db: AsyncSession = Depends(get_read_session)
 ):
     """Listar usuários (apenas diretores)"""
-    users, total = UsuarioService.get_users(db, skip, limit)
-    return [UsuarioResponse.from_orm(user) for user in users]
+    not_modified = await _conditional_response(request, response, db, ["usuarios"])
+    if not_modified:
+        return not_modified
+    
+    users, total = await UsuarioService.get_users(db, skip, limit)
+    return json_list_response(users, UsuarioResponse, response)
 
 @app.get("/users/{user_id}", response_model=UsuarioResponse, tags=["Usuários"])
+@orcamento_consultas(1)
 async def get_user(
     user_id: int,
-    current_user: Usuario = Depends(require_admin),
-    db: Session = Depends(get_database_session)
+    current_user: UsuarioAutenticado = Depends(require_admin),
+    db: AsyncSession = Depends(get_read_session)
 ):
     """Obter usuário por ID (apenas diretores)"""
-    user = UsuarioService.get_user_by_id(db, user_id)
+    user = await UsuarioService.get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -173,11 +350,11 @@ async def get_user(
 async def update_user(
     user_id: int,
     user_data: UsuarioUpdate,
-    current_user: Usuario = Depends(require_admin),
-    db: Session = Depends(get_database_session)
+    current_user: UsuarioAutenticado = Depends(require_admin),
+    db: AsyncSession = Depends(get_async_session)
 ):
     """Atualizar usuário (apenas diretores)"""
-    user = UsuarioService.update_user(db, user_id, user_data)
+    user = await UsuarioService.update_user(db, user_id, user_data)
     return UsuarioResponse.from_orm(user)
 
 # ================================
@@ -187,33 +364,41 @@ async def update_user(
 @app.post("/turmas", response_model=TurmaResponse, tags=["Turmas"])
 async def create_turma(
     turma_data: TurmaCreate,
-    current_user: Usuario = Depends(require_admin_or_coordinator),
-    db: Session = Depends(get_database_session)
+    current_user: UsuarioAutenticado = Depends(require_admin_or_coordinator),
+    db: AsyncSession = Depends(get_async_session)
 ):
     """Criar nova turma"""
-    turma = TurmaService.create_turma(db, turma_data)
+    turma = await TurmaService.create_turma(db, turma_data)
     return TurmaResponse.from_orm(turma)
 
 @app.get("/turmas", response_model=list[TurmaResponse], tags=["Turmas"])
+@orcamento_consultas(2)
 async def list_turmas(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     ativas_apenas: bool = True,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_database_session)
+    current_user: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session)
 ):
-    """Listar turmas"""
-    turmas = TurmaService.get_turmas_with_stats(db)
-    return turmas
+    """Listar turmas com o total de alunos ativos de cada uma"""
+    not_modified = await _conditional_response(request, response, db, ["turmas", "alunos"])
+    if not_modified:
+        return not_modified
+    
+    turmas = await TurmaService.get_turmas_with_stats(db, skip=skip, limit=limit, ativas_apenas=ativas_apenas)
+    return json_list_response(turmas, TurmaResponse, response)
 
 @app.get("/turmas/{turma_id}", response_model=TurmaResponse, tags=["Turmas"])
+@orcamento_consultas(1)
 async def get_turma(
     turma_id: int,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_database_session)
+    current_user: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session)
 ):
     """Obter turma por ID"""
-    turma = TurmaService.get_turma_by_id(db, turma_id)
+    turma = await TurmaService.get_turma_by_id(db, turma_id)
     if not turma:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -221,25 +406,43 @@ async def get_turma(
         )
     return TurmaResponse.from_orm(turma)
 
+@app.get("/turmas/{turma_id}/alunos/export", tags=["Turmas"])
+@orcamento_consultas(n_mais_um=False)
+async def export_alunos_turma(
+    turma_id: int,
+    formato: str = "csv",
+    status_aluno: Optional[StatusAlunoEnum] = Query(None, alias="status"),
+    current_user: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session)
+):
+    """Exportar os alunos de uma turma em CSV ou NDJSON (streaming)"""
+    turma = await TurmaService.get_turma_by_id(db, turma_id)
+    if not turma:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Turma não encontrada"
+        )
+    return _export_response(formato, f"alunos_turma_{turma_id}", turma_id=turma_id, status_aluno=status_aluno)
+
 @app.put("/turmas/{turma_id}", response_model=TurmaResponse, tags=["Turmas"])
 async def update_turma(
     turma_id: int,
     turma_data: TurmaUpdate,
-    current_user: Usuario = Depends(require_admin_or_coordinator),
-    db: Session = Depends(get_database_session)
+    current_user: UsuarioAutenticado = Depends(require_admin_or_coordinator),
+    db: AsyncSession = Depends(get_async_session)
 ):
     """Atualizar turma"""
-    turma = TurmaService.update_turma(db, turma_id, turma_data)
+    turma = await TurmaService.update_turma(db, turma_id, turma_data)
     return TurmaResponse.from_orm(turma)
 
 @app.delete("/turmas/{turma_id}", response_model=MessageResponse, tags=["Turmas"])
 async def delete_turma(
     turma_id: int,
-    current_user: Usuario = Depends(require_admin),
-    db: Session = Depends(get_database_session)
+    current_user: UsuarioAutenticado = Depends(require_admin),
+    db: AsyncSession = Depends(get_async_session)
 ):
     """Excluir turma (apenas diretores)"""
-    success = TurmaService.delete_turma(db, turma_id)
+    success = await TurmaService.delete_turma(db, turma_id)
     if success:
         return MessageResponse(message="Turma excluída com sucesso")
     
@@ -255,49 +458,135 @@ async def delete_turma(
 @app.post("/alunos", response_model=AlunoResponse, tags=["Alunos"])
 async def create_aluno(
     aluno_data: AlunoCreate,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_database_session)
+    current_user: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session)
 ):
     """Criar novo aluno"""
-    aluno = AlunoService.create_aluno(db, aluno_data)
+    aluno = await AlunoService.create_aluno(db, aluno_data)
     return AlunoResponse.from_orm(aluno)
 
+@app.post("/alunos/import", response_model=ImportacaoResponse, tags=["Alunos"])
+@orcamento_consultas(n_mais_um=False)
+async def import_alunos(
+    request: Request,
+    formato: Optional[str] = None,
+    current_user: UsuarioAutenticado = Depends(require_admin_or_coordinator),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """
+    Importar alunos em massa (diretores e coordenadores).
+    
+    O arquivo vai no corpo da requisição: CSV com cabeçalho (`text/csv`) ou
+    um objeto JSON por linha (`application/x-ndjson`); `formato=csv|ndjson`
+    força o formato; um array JSON (`application/json`) é recusado com 415.
+    O corpo é lido em streaming e gravado em lotes; cada lote é uma
+    transação. Retorna os erros de validação por linha.
+    """
+    formato_arquivo = detectar_formato(request.headers.get("content-type"), formato)
+    if not formato_arquivo:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Formato não suportado. Envie CSV (text/csv) ou NDJSON (application/x-ndjson)"
+        )
+    
+    total_linhas = 0
+    importados = 0
+    erros = []
+    registros = iter_registros(iter_linhas(request.stream()), formato_arquivo)
+    async for lote in iter_lotes(registros):
+        total_linhas += len(lote)
+        inseridos, erros_lote = await AlunoService.import_alunos_lote(db, lote)
+        importados += inseridos
+        erros.extend(erros_lote)
+    
+    return ImportacaoResponse(total_linhas=total_linhas, importados=importados, erros=erros)
+
 @app.get("/alunos", response_model=list[AlunoResponse], tags=["Alunos"])
+@orcamento_consultas(2)
 async def list_alunos(
+    request: Request,
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
-    search: str = None,
-    turma_id: int = None,
-    status: str = None,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_database_session)
+    limit: int = Query(100, ge=1, le=500),
+    search: Optional[str] = None,
+    turma_id: Optional[int] = None,
+    status: Optional[StatusAlunoEnum] = None,
+    after_id: Optional[int] = None,
+    after_nome: Optional[str] = None,
+    current_user: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session)
 ):
-    """Listar alunos com filtros"""
-    alunos = AlunoService.get_alunos_with_turma(db)
+    """
+    Listar alunos com filtros.
+    
+    Filtros, ordenação (nome, id) e paginação são executados no banco.
+    Para paginar por chave, envie `after_id`/`after_nome` com os valores dos
+    headers `X-Next-After-Id`/`X-Next-After-Nome` da página anterior.
+    Com `search` a ordem é por relevância e a paginação usa `skip`.
+    `after_nome` sem `after_id` é recusado com 422 (cursor incompleto).
+    """
+    if after_nome is not None and after_id is None:
+        # `status` aqui é o filtro da rota, não o módulo do FastAPI
+        raise HTTPException(
+            status_code=422,
+            detail="after_nome exige after_id (headers X-Next-After-Id/X-Next-After-Nome)"
+        )
     
-    # Aplicar filtros
-    if search:
-        alunos = [a for a in alunos if search.lower() in a.nome.lower() or (a.email and search.lower() in a.email.lower())]
+    not_modified = await _conditional_response(request, response, db, ["alunos", "turmas"], por_data=True)
+    if not_modified:
+        return not_modified
     
-    if turma_id:
-        alunos = [a for a in alunos if a.turma_id == turma_id]
+    alunos = await AlunoService.get_alunos(
+        db,
+        skip=skip,
+        limit=limit,
+        search=search,
+        turma_id=turma_id,
+        status=status,
+        after_id=after_id,
+        after_nome=after_nome
+    )
     
-    if status:
-        alunos = [a for a in alunos if a.status.value == status]
+    # Cursor para a próxima página (apenas se a página veio cheia)
+    if len(alunos) == limit and not search:
+        response.headers["X-Next-After-Id"] = str(alunos[-1]["id"])
+        response.headers["X-Next-After-Nome"] = quote(alunos[-1]["nome"])
     
-    # Aplicar paginação
-    start = skip
-    end = skip + limit
-    return alunos[start:end]
+    return json_list_response(alunos, AlunoResponse, response)
+
+def _export_response(formato: str, nome_arquivo: str, turma_id: Optional[int] = None, status_aluno=None) -> StreamingResponse:
+    """Monta o StreamingResponse da exportação de alunos"""
+    if formato not in exportacao.FORMATOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Formato inválido. Use csv ou ndjson"
+        )
+    
+    return StreamingResponse(
+        exportacao.exportar_alunos(formato, turma_id=turma_id, status=status_aluno),
+        media_type=exportacao.FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nome_arquivo}.{formato}"'}
+    )
+
+@app.get("/alunos/export", tags=["Alunos"])
+@orcamento_consultas(n_mais_um=False)
+async def export_alunos(
+    formato: str = "csv",
+    status_aluno: Optional[StatusAlunoEnum] = Query(None, alias="status"),
+    current_user: UsuarioAutenticado = Depends(get_current_user)
+):
+    """Exportar todos os alunos em CSV ou NDJSON (streaming)"""
+    return _export_response(formato, "alunos", status_aluno=status_aluno)
 
 @app.get("/alunos/{aluno_id}", response_model=AlunoResponse, tags=["Alunos"])
+@orcamento_consultas(1)
 async def get_aluno(
     aluno_id: int,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_database_session)
+    current_user: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session)
 ):
     """Obter aluno por ID"""
-    aluno = AlunoService.get_aluno_by_id(db, aluno_id)
+    aluno = await AlunoService.get_aluno_by_id(db, aluno_id)
     if not aluno:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -309,21 +598,21 @@ async def get_aluno(
 async def update_aluno(
     aluno_id: int,
     aluno_data: AlunoUpdate,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_database_session)
+    current_user: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session)
 ):
     """Atualizar aluno"""
-    aluno = AlunoService.update_aluno(db, aluno_id, aluno_data)
+    aluno = await AlunoService.update_aluno(db, aluno_id, aluno_data)
     return AlunoResponse.from_orm(aluno)
 
 @app.delete("/alunos/{aluno_id}", response_model=MessageResponse, tags=["Alunos"])
 async def delete_aluno(
     aluno_id: int,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_database_session)
+    current_user: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session)
 ):
     """Inativar ou excluir aluno permanentemente se já inativo"""
-    result = AlunoService.delete_aluno(db, aluno_id)
+    result = await AlunoService.delete_aluno(db, aluno_id)
     return MessageResponse(message=result["message"])
 
 # ================================
@@ -331,12 +620,21 @@ async def delete_aluno(
 # ================================
 
 @app.get("/statistics", response_model=StatisticsResponse, tags=["Estatísticas"])
+@orcamento_consultas(3)
 async def get_statistics(
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_database_session)
+    request: Request,
+    response: Response,
+    current_user: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session)
 ):
     """Obter estatísticas do sistema"""
-    stats = StatisticsService.get_dashboard_stats(db)
+    not_modified = await _conditional_response(
+        request, response, db, ["alunos", "turmas", "usuarios", "estatisticas"]
+    )
+    if not_modified:
+        return not_modified
+    
+    stats = await StatisticsService.get_dashboard_stats(db)
     return StatisticsResponse(**stats)
 
 # ================================
@@ -356,12 +654,47 @@ async def root():
 
 @app.get("/health", tags=["Sistema"])
 async def health_check():
-    """Verificação de saúde da API"""
-    return {
-        "status": "healthy",
-        "timestamp": "2024-01-01T00:00:00Z",
-        "database": "connected"
-    }
+    """Verificação de saúde da API (503 se o banco não responder)"""
+    try:
+        # Banco principal e, quando separado, o engine somente leitura
+        for session_factory in {AsyncSessionLocal, ReadSessionLocal}:
+            async with session_factory() as db:
+                await db.execute(text("SELECT 1"))
+        database = "connected"
+    except Exception as e:
+        database = f"error: {e.__class__.__name__}"
+    
+    saudavel = database == "connected"
+    return ORJSONResponse(
+        status_code=status.HTTP_200_OK if saudavel else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "status": "healthy" if saudavel else "unhealthy",
+            "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "database": database,
+            "login_buffer_pendentes": buffer_acessos.profundidade(),
+            "password_queue_depth": password_queue_depth(),
+            "db_pool_checked_out": async_engine.pool.checkedout(),
+            "db_read_pool_checked_out": read_async_engine.pool.checkedout(),
+        }
+    )
+
+@app.get("/metrics", tags=["Sistema"], include_in_schema=False)
+async def metrics(request: Request):
+    """Métricas no formato texto do Prometheus (coletadas em processo)"""
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token de métricas inválido")
+    return PlainTextResponse(
+        metricas.render_metrics(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+@app.get("/database/diagnostics", tags=["Sistema"])
+async def database_diagnostics(
+    current_user: UsuarioAutenticado = Depends(require_admin),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """Banco em uso, pool e configuração efetiva da conexão (apenas diretores)"""
+    return await get_database_diagnostics(db)
 
 # ================================
 # HANDLER DE ERROS
@@ -376,7 +709,8 @@ async def http_exception_handler(request: Request, exc: HTTPException):
             "error": True,
             "message": exc.detail,
             "status_code": exc.status_code
-        }
+        },
+        headers=getattr(exc, "headers", None)
     )
 
 @app.exception_handler(Exception)
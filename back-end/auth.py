@@ -1,14 +1,19 @@
 # auth.py
 # Sistema de autenticação JWT
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, NamedTuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from database import get_database_session
-from models import Usuario
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_read_session
+from models import Usuario, CargoEnum
+from cache import TTLCache
+from instrumentacao import medir_fase
 import os
 
 # Configurações de segurança
@@ -19,9 +24,43 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 horas
 # Configuração para hash de senhas
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Pool dedicado para bcrypt: cada hash/verify custa 100-300 ms de CPU e não
+# pode rodar no event loop. PASSWORD_HASH_WORKERS limita quantos rodam ao
+# mesmo tempo, PASSWORD_HASH_MAX_QUEUE quantos podem esperar na fila e
+# PASSWORD_HASH_QUEUE_TIMEOUT quanto tempo (s) uma requisição espera antes
+# de receber 503.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "2.0"))
+
+_password_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS,
+    thread_name_prefix="bcrypt"
+)
+_password_slots: dict = {}
+_password_waiting = 0
+
 # Esquema de autenticação Bearer
 security = HTTPBearer()
 
+# Cache do usuário autenticado, indexado pelo "sub" do token. Evita um
+# SELECT em usuarios por requisição; USER_CACHE_TTL (s) limita por quanto
+# tempo outro worker pode enxergar um cargo/status desatualizado.
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+
+class UsuarioAutenticado(NamedTuple):
+    """Snapshot imutável do usuário autenticado usado nas checagens de acesso"""
+    id: int
+    cargo: CargoEnum
+    ativo: bool
+
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+def invalidate_cached_user(user_id: int):
+    """Remove o usuário do cache de autenticação"""
+    user_cache.invalidate(str(user_id))
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica se a senha está correta"""
     return pwd_context.verify(plain_password, hashed_password)
@@ -30,6 +69,59 @@ def get_password_hash(password: str) -> str:
     """Gera hash da senha"""
     return pwd_context.hash(password)
 
+def _get_password_semaphore() -> asyncio.Semaphore:
+    """Semáforo de admissão do pool de senhas (um por event loop)"""
+    loop = asyncio.get_running_loop()
+    semaphore = _password_slots.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(PASSWORD_HASH_WORKERS)
+        _password_slots.clear()
+        _password_slots[loop] = semaphore
+    return semaphore
+
+def password_queue_depth() -> int:
+    """Quantidade de requisições aguardando vaga no pool de senhas"""
+    return _password_waiting
+
+async def _run_password_task(func, *args):
+    """
+    Executa uma operação de bcrypt no pool dedicado com controle de admissão.
+    Levanta 503 se a fila estiver cheia ou se a espera passar do timeout.
+    """
+    global _password_waiting
+    
+    busy_exception = HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Servidor ocupado processando logins. Tente novamente em instantes.",
+        headers={"Retry-After": "1"},
+    )
+    
+    semaphore = _get_password_semaphore()
+    if semaphore.locked() and _password_waiting >= PASSWORD_HASH_MAX_QUEUE:
+        raise busy_exception
+    
+    _password_waiting += 1
+    try:
+        await asyncio.wait_for(semaphore.acquire(), timeout=PASSWORD_HASH_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise busy_exception
+    finally:
+        _password_waiting -= 1
+    
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, func, *args)
+    finally:
+        semaphore.release()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verifica a senha fora do event loop, no pool de bcrypt"""
+    return await _run_password_task(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Gera o hash da senha fora do event loop, no pool de bcrypt"""
+    return await _run_password_task(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Cria token JWT"""
     to_encode = data.copy()
@@ -50,51 +142,95 @@ def verify_token(token: str) -> Optional[dict]:
     except JWTError:
         return None
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[Usuario]:
-    """Autentica usuário com email e senha"""
-    user = db.query(Usuario).filter(Usuario.email == email).first()
-    if not user:
-        return None
-    if not verify_password(password, user.senha_hash):
-        return None
-    if not user.ativo:
-        return None
-    return user
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[Usuario]:
+    """Autentica usuário com email e senha (fase "auth" do Server-Timing)"""
+    with medir_fase("auth"):
+        user = await db.scalar(select(Usuario).where(Usuario.email == email))
+        if not user:
+            return None
+        if not await verify_password_async(password, user.senha_hash):
+            return None
+        if not user.ativo:
+            return None
+        return user
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_database_session)
-) -> Usuario:
-    """Obtém o usuário atual a partir do token"""
-    
-    credentials_exception = HTTPException(
+    db: AsyncSession = Depends(get_read_session)
+) -> UsuarioAutenticado:
+    """Obtém o usuário atual a partir do token (com cache por TTL)"""
+    # Sessão somente leitura: também nas rotas de escrita, a autenticação
+    # não ocupa conexões do pool principal nem espera pelos escritores.
+    # Tempo da fase "auth" do Server-Timing
+    with medir_fase("auth"):
+        return await _resolve_current_user(credentials, db)
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Token inválido ou expirado",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+def _token_sub(credentials: HTTPAuthorizationCredentials) -> str:
+    """Valida o token e retorna o "sub" (id do usuário)"""
     try:
-        token = credentials.credentials
-        payload = verify_token(token)
+        payload = verify_token(credentials.credentials)
         if payload is None:
-            raise credentials_exception
+            raise _credentials_exception()
         
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-            
+        sub = payload.get("sub")
+        if sub is None:
+            raise _credentials_exception()
+        int(sub)  # o id precisa ser numérico
+        return sub
+    
     except (JWTError, ValueError):
-        raise credentials_exception
+        raise _credentials_exception()
+
+def _cache_user(sub: str, user: Usuario) -> UsuarioAutenticado:
+    """Guarda o snapshot do usuário no cache; 401 se ele estiver inativo"""
+    snapshot = UsuarioAutenticado(id=user.id, cargo=user.cargo, ativo=user.ativo)
+    user_cache.set(sub, snapshot)
+    if not snapshot.ativo:
+        raise _credentials_exception()
+    return snapshot
+
+async def _resolve_current_user(credentials: HTTPAuthorizationCredentials, db: AsyncSession) -> UsuarioAutenticado:
+    """Valida o token e carrega o snapshot do usuário (cache ou banco)"""
+    sub = _token_sub(credentials)
     
-    user = db.query(Usuario).filter(Usuario.id == user_id).first()
-    if user is None or not user.ativo:
-        raise credentials_exception
+    cached = user_cache.get(sub)
+    if cached is not None:
+        if not cached.ativo:
+            raise _credentials_exception()
+        return cached
     
-    return user
+    user = await db.get(Usuario, int(sub))
+    if user is None:
+        raise _credentials_exception()
+    return _cache_user(sub, user)
+
+async def get_current_user_model(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_read_session)
+) -> Usuario:
+    """
+    Obtém o Usuario completo do token, para rotas que devolvem o próprio
+    usuário (/auth/me). Sempre consulta o banco (uma consulta) e atualiza
+    o snapshot do cache com o resultado.
+    """
+    with medir_fase("auth"):
+        sub = _token_sub(credentials)
+        user = await db.get(Usuario, int(sub))
+        if user is None:
+            raise _credentials_exception()
+        _cache_user(sub, user)
+        return user
 
 def require_role(allowed_roles: list):
     """Decorator para exigir roles específicos"""
-    def role_checker(current_user: Usuario = Depends(get_current_user)):
+    def role_checker(current_user: UsuarioAutenticado = Depends(get_current_user)):
         if current_user.cargo.value not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -104,7 +240,7 @@ def require_role(allowed_roles: list):
     return role_checker
 
 # Roles específicos
-def require_admin(current_user: Usuario = Depends(get_current_user)):
+def require_admin(current_user: UsuarioAutenticado = Depends(get_current_user)):
     """Exige role de diretor"""
     if current_user.cargo.value != "diretor":
         raise HTTPException(
@@ -113,7 +249,7 @@ def require_admin(current_user: Usuario = Depends(get_current_user)):
         )
     return current_user
 
-def require_admin_or_coordinator(current_user: Usuario = Depends(get_current_user)):
+def require_admin_or_coordinator(current_user: UsuarioAutenticado = Depends(get_current_user)):
     """Exige role de diretor ou coordenador"""
     if current_user.cargo.value not in ["diretor", "coordenador"]:
         raise HTTPException(
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# bench_respostas.py
+# Compara o pipeline de serialização, a codificação JSON e a compressão de
+# uma listagem com 10 mil alunos
+#
+# Executar: python bench_respostas.py [quantidade]
+import asyncio
+import gzip
+import json
+import sys
+import time
+from datetime import date, datetime
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from models import StatusAlunoEnum
+from schemas import AlunoResponse
+from serializacao import serializar_lista
+
+def gerar_linhas(quantidade: int) -> list:
+    """Linhas como as de AlunoService.get_alunos para `quantidade` alunos"""
+    agora = datetime(2025, 3, 1, 12, 30, 15, 123456)
+    return [
+        dict(
+            id=i,
+            nome=f"Aluno Exemplo {i:05d}",
+            cpf=f"{i:011d}",
+            rg=f"{i:09d}",
+            data_nascimento=date(2010, 1 + i % 12, 1 + i % 28),
+            email=f"aluno{i}@escola.com",
+            telefone="(11) 99999-0000",
+            endereco="Rua das Flores, 123 - Centro",
+            nome_responsavel=f"Responsável {i:05d}",
+            telefone_responsavel="(11) 98888-0000",
+            status=StatusAlunoEnum.ativo if i % 7 else StatusAlunoEnum.inativo,
+            data_matricula=date(2025, 2, 1),
+            observacoes=None,
+            turma_id=1 + i % 40,
+            data_criacao=agora,
+            data_atualizacao=agora,
+            turma_nome=f"TURMA {i % 40}",
+            idade=15,
+        )
+        for i in range(quantidade)
+    ]
+
+def medir(funcao, repeticoes: int = 5):
+    """Melhor tempo (ms) de `repeticoes` execuções e o último resultado"""
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor * 1000, resultado
+
+def comparar_pipelines(linhas: list):
+    """
+    Pipeline anterior (AlunoResponse por linha + validação/serialização do
+    response_model do FastAPI + orjson) contra o atual (serializacao.py),
+    com e sem a validação única pelo TypeAdapter. A maior parte do custo da
+    validação é o EmailStr (email-validator), por isso o padrão é não validar.
+    """
+    campo = create_response_field(name="resposta", type_=List[AlunoResponse], mode="serialization")
+    
+    def anterior():
+        objetos = [AlunoResponse(**linha) for linha in linhas]
+        conteudo = asyncio.run(serialize_response(field=campo, response_content=objetos))
+        return ORJSONResponse(conteudo).body
+    
+    tempo_anterior, corpo_anterior = medir(anterior, 3)
+    tempo_adapter, corpo_adapter = medir(lambda: serializar_lista(linhas, AlunoResponse, validar=True), 3)
+    tempo_direto, corpo_direto = medir(lambda: serializar_lista(linhas, AlunoResponse, validar=False), 3)
+    
+    # Os três pipelines devem produzir o mesmo JSON
+    assert json.loads(corpo_anterior) == json.loads(corpo_adapter) == json.loads(corpo_direto)
+    
+    milhar = len(linhas) / 1000
+    print(f"Pipeline de serialização ({len(linhas)} alunos, ms por 1000 linhas)")
+    print(f"{'pipeline':<28}{'ms/1k':>10}{'ganho':>10}")
+    for nome, tempo in [
+        ("response_model (anterior)", tempo_anterior),
+        ("TypeAdapter, valida 1x", tempo_adapter),
+        ("direto (sem validação)", tempo_direto),
+    ]:
+        print(f"{nome:<28}{tempo / milhar:>10.2f}{tempo_anterior / tempo:>9.1f}x")
+    print()
+
+def main(quantidade: int = 10000):
+    linhas = gerar_linhas(quantidade)
+    comparar_pipelines(linhas)
+    
+    # A etapa do FastAPI comum às duas classes de resposta
+    conteudo = jsonable_encoder([AlunoResponse(**linha) for linha in linhas])
+    
+    linhas = []
+    tempo_json, corpo_json = medir(lambda: JSONResponse(conteudo).body)
+    tempo_orjson, corpo_orjson = medir(lambda: ORJSONResponse(conteudo).body)
+    linhas.append(("json (stdlib)", tempo_json, len(corpo_json)))
+    linhas.append(("orjson", tempo_orjson, len(corpo_orjson)))
+    
+    # Níveis de gzip (GZIP_LEVEL no app.py; o padrão do Starlette é 9)
+    for nivel in (1, 5, 9):
+        tempo_gzip, corpo_gzip = medir(lambda: gzip.compress(corpo_orjson, compresslevel=nivel))
+        linhas.append((f"orjson + gzip-{nivel}", tempo_orjson + tempo_gzip, len(corpo_gzip)))
+    
+    try:
+        import brotli
+        # Qualidade padrão do BrotliMiddleware (brotli-asgi)
+        tempo_br, corpo_br = medir(lambda: brotli.compress(corpo_orjson, quality=4))
+        linhas.append(("orjson + brotli", tempo_orjson + tempo_br, len(corpo_br)))
+    except ImportError:
+        print("(brotli não instalado: pip install brotli-asgi)")
+    
+    print(f"Listagem de {quantidade} alunos")
+    print(f"{'formato':<18}{'tempo (ms)':>12}{'bytes':>12}{'vs json':>10}")
+    for nome, tempo, tamanho in linhas:
+        print(f"{nome:<18}{tempo:>12.1f}{tamanho:>12}{tamanho / len(corpo_json):>10.1%}")
+    print(f"\norjson codifica {tempo_json / tempo_orjson:.1f}x mais rápido que o json da stdlib")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# bench_rotas.py
+# Benchmark por rota da API, em processo (TestClient), com bancos sintéticos
+# de vários tamanhos. Mede p50/p95/p99 e consultas SQL por requisição.
+#
+# Executar:
+#   python bench_rotas.py                              # 1k, 10k e 100k alunos
+#   python bench_rotas.py --escalas 1000 10000 --saida bench.json
+#   python bench_rotas.py --baseline bench_baseline.json   # falha se regredir
+#
+# Cada escala roda em um subprocesso com seu próprio banco temporário
+# (DB_PATH), porque os engines do app são criados na importação. Cada
+# escala é medida --repeticoes vezes e o resultado é a mediana das rodadas:
+# uma rodada isolada com ruído (GC, outro processo) não vira regressão.
+# Regenere a baseline com as mesmas opções sempre que o caminho quente mudar:
+#   python bench_rotas.py --saida bench_baseline.json
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ESCALAS = [1000, 10000, 100000]
+ALUNOS_POR_TURMA = 25
+
+# Regressão (mediana das rodadas): p50 acima de baseline * (1 + tolerância)
+# ou p95 acima de baseline * (1 + TOLERANCIA_P95), em ambos os casos com
+# pelo menos MIN_DIFERENCA_MS de diferença. Entre execuções separadas na
+# mesma máquina os tempos variam 30-40%, então a checagem de tempo pega só
+# regressões grosseiras (índice perdido, varredura completa); a de consultas
+# por requisição é estrita (folga de MIN_DIFERENCA_QUERIES para as gravações
+# em segundo plano, como o buffer de logins)
+TOLERANCIA = 0.5
+TOLERANCIA_P95 = 1.0
+MIN_DIFERENCA_MS = 3.0
+MIN_DIFERENCA_QUERIES = 0.5
+REPETICOES = 3
+
+def ambiente_escala(diretorio: str) -> dict:
+    """Variáveis de ambiente do subprocesso: banco temporário e limites altos"""
+    env = dict(os.environ)
+    env.update({
+        "DB_PATH": os.path.join(diretorio, "escola.db"),
+        "HISTORICO_ARQUIVO_PATH": os.path.join(diretorio, "arquivo.db"),
+        "HISTORICO_RETENCAO_INTERVALO": "0",
+        "STATS_RECONCILE_INTERVAL": "86400",
+        "LOGIN_RATE_LIMIT_BACKEND": "memoria",
+        "LOGIN_RATE_IP_CAPACIDADE": "1000000",
+        "LOGIN_RATE_EMAIL_CAPACIDADE": "1000000",
+        "LOGIN_RATE_EMAIL_TOTAL_CAPACIDADE": "1000000",
+    })
+    return env
+
+def popular(quantidade: int, seed: int = 42) -> int:
+    """Gera `quantidade` alunos em turmas de ALUNOS_POR_TURMA (gerador.py)"""
+    from database import SessionLocal, init_database
+    from gerador import gerar_dados, SERIES
+    
+    init_database()
+    turmas_por_escola = len(SERIES) * 2
+    escolas = math.ceil(quantidade / (turmas_por_escola * ALUNOS_POR_TURMA))
+    with SessionLocal() as db:
+        resumo = gerar_dados(
+            db, escolas=escolas, turmas_por_ano=2, alunos_por_turma=ALUNOS_POR_TURMA,
+            proporcao_inativos=0.15, usuarios_por_escola=2, limite_alunos=quantidade, seed=seed
+        )
+    return resumo["turmas"]
+
+def percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(p * len(ordenados)) - 1)]
+
+def executar_escala(quantidade: int, iteracoes: int, iteracoes_login: int) -> dict:
+    """Roda dentro do subprocesso: popula o banco e mede cada rota"""
+    from sqlalchemy import event
+    from fastapi.testclient import TestClient
+    
+    from gerador import SENHA_PADRAO, cpf_valido
+    
+    total_turmas = popular(quantidade)
+    
+    import app as app_module
+    from database import async_engine, read_async_engine
+    
+    consultas = {"total": 0}
+    
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        consultas["total"] += 1
+    
+    # Rotas GET usam o engine somente leitura; as demais, o principal
+    for engine in {async_engine, read_async_engine}:
+        event.listen(engine.sync_engine, "before_cursor_execute", contar)
+    
+    resultados = {}
+    
+    with TestClient(app_module.app) as client:
+        def medir(nome: str, requisicao, vezes: int = iteracoes, esperado=(200,)):
+            tempos, queries = [], []
+            for i in range(vezes):
+                consultas["total"] = 0
+                inicio = time.perf_counter()
+                resposta = requisicao(i)
+                tempos.append((time.perf_counter() - inicio) * 1000)
+                queries.append(consultas["total"])
+                if resposta.status_code not in esperado:
+                    raise RuntimeError(f"{nome}: HTTP {resposta.status_code} {resposta.text[:200]}")
+            resultados[nome] = {
+                "n": vezes,
+                "p50_ms": round(percentil(tempos, 0.50), 3),
+                "p95_ms": round(percentil(tempos, 0.95), 3),
+                "p99_ms": round(percentil(tempos, 0.99), 3),
+                "queries": round(sum(queries) / vezes, 2),
+            }
+            print(f"  {nome:<40} p50 {resultados[nome]['p50_ms']:>8.2f} ms"
+                  f"  p95 {resultados[nome]['p95_ms']:>8.2f} ms  q {resultados[nome]['queries']}",
+                  file=sys.stderr)
+        
+        login = {"email": "admin@escola.com", "senha": SENHA_PADRAO}
+        token = client.post("/auth/login", json=login).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        
+        def get(url, extra=None):
+            return lambda i: client.get(url, headers={**headers, **(extra or {})})
+        
+        medir("POST /auth/login", lambda i: client.post("/auth/login", json=login), iteracoes_login)
+        medir("GET /auth/me", get("/auth/me"))
+        
+        medir("GET /alunos", get("/alunos"))
+        medir("GET /alunos?skip", get(f"/alunos?skip={quantidade // 2}"))
+        cursor = client.get("/alunos?limit=100", headers=headers).headers.get("x-next-after-id")
+        medir("GET /alunos?after_id", get(f"/alunos?after_id={cursor}"))
+        medir("GET /alunos?search", get("/alunos?search=silva"))
+        medir("GET /alunos?search (cpf)", get(f"/alunos?search={cpf_valido(quantidade // 3)}"))
+        medir("GET /alunos?turma_id", get(f"/alunos?turma_id={total_turmas // 2 + 1}"))
+        medir("GET /alunos?status", get("/alunos?status=inativo"))
+        medir("GET /alunos?turma_id&status", get(f"/alunos?turma_id={total_turmas // 2 + 1}&status=ativo"))
+        medir("GET /alunos?limit=500", get("/alunos?limit=500"))
+        etag = client.get("/alunos", headers=headers).headers["etag"]
+        medir("GET /alunos (304)", get("/alunos", {"If-None-Match": etag}), esperado=(304,))
+        
+        medir("GET /turmas", get("/turmas"))
+        medir("GET /statistics", get("/statistics"))
+        
+        criados = []
+        
+        def criar(i):
+            resposta = client.post("/alunos", headers=headers, json={
+                "nome": f"Aluno Benchmark {i}",
+                "cpf": f"9{i:010d}",
+                "email": f"bench{i}@escola.com",
+                "data_nascimento": "2012-05-10",
+                "turma_id": 1 + i % total_turmas,
+            })
+            if resposta.status_code == 200:
+                criados.append(resposta.json()["id"])
+            return resposta
+        
+        medir("POST /alunos", criar)
+        medir("PUT /alunos/{id}", lambda i: client.put(
+            f"/alunos/{criados[i]}", headers=headers, json={"telefone": f"(11) 9{i:04d}-0000"}
+        ))
+        medir("DELETE /alunos/{id} (inativa)", lambda i: client.delete(f"/alunos/{criados[i]}", headers=headers))
+        medir("DELETE /alunos/{id} (exclui)", lambda i: client.delete(f"/alunos/{criados[i]}", headers=headers))
+    
+    return resultados
+
+def mediana_rodadas(rodadas: list) -> dict:
+    """Combina as rodadas de uma escala: mediana de cada medida por rota"""
+    combinado = {}
+    for rota in rodadas[0]:
+        medidas = [rodada[rota] for rodada in rodadas if rota in rodada]
+        combinado[rota] = {
+            chave: round(statistics.median(medida[chave] for medida in medidas), 3)
+            for chave in medidas[0]
+        }
+        combinado[rota]["rodadas"] = len(medidas)
+    return combinado
+
+def comparar(atual: dict, baseline: dict, tolerancia: float) -> list:
+    """Lista as regressões de `atual` em relação à baseline"""
+    regressoes = []
+    for escala, rotas in atual["resultados"].items():
+        for rota, medida in rotas.items():
+            base = baseline.get("resultados", {}).get(escala, {}).get(rota)
+            if not base:
+                continue
+            for chave, folga in (("p50_ms", tolerancia), ("p95_ms", TOLERANCIA_P95)):
+                limite = base[chave] * (1 + folga)
+                if medida[chave] > limite and medida[chave] - base[chave] >= MIN_DIFERENCA_MS:
+                    regressoes.append(
+                        f"{escala} alunos, {rota}: {chave[:3]} {medida[chave]:.2f} ms "
+                        f"(baseline {base[chave]:.2f} ms, limite {limite:.2f} ms)"
+                    )
+            if medida["queries"] - base["queries"] >= MIN_DIFERENCA_QUERIES:
+                regressoes.append(
+                    f"{escala} alunos, {rota}: {medida['queries']} consultas/req "
+                    f"(baseline {base['queries']})"
+                )
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark por rota da API")
+    parser.add_argument("--escalas", type=int, nargs="+", default=ESCALAS)
+    parser.add_argument("--iteracoes", type=int, default=50)
+    parser.add_argument("--iteracoes-login", type=int, default=10)
+    parser.add_argument("--saida", default="bench_resultados.json")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparação")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES,
+                        help="rodadas por escala (o resultado é a mediana)")
+    parser.add_argument("--escala-interna", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.escala_interna:
+        resultados = executar_escala(args.escala_interna, args.iteracoes, args.iteracoes_login)
+        print(json.dumps(resultados))
+        return 0
+    
+    atual = {
+        "meta": {
+            "data": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "iteracoes": args.iteracoes,
+            "repeticoes": args.repeticoes,
+        },
+        "resultados": {},
+    }
+    for escala in args.escalas:
+        rodadas = []
+        for rodada in range(args.repeticoes):
+            print(f"📊 {escala} alunos (rodada {rodada + 1}/{args.repeticoes})", file=sys.stderr)
+            with tempfile.TemporaryDirectory() as diretorio:
+                processo = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--escala-interna", str(escala),
+                     "--iteracoes", str(args.iteracoes), "--iteracoes-login", str(args.iteracoes_login)],
+                    env=ambiente_escala(diretorio), cwd=BASE_DIR, stdout=subprocess.PIPE, check=True, text=True
+                )
+            # A última linha da saída padrão é o JSON (o app também imprime)
+            rodadas.append(json.loads(processo.stdout.strip().splitlines()[-1]))
+        atual["resultados"][str(escala)] = mediana_rodadas(rodadas)
+    
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(atual, arquivo, indent=2, ensure_ascii=False)
+    print(f"✅ Resultados gravados em {args.saida}", file=sys.stderr)
+    
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as arquivo:
+            baseline = json.load(arquivo)
+        regressoes = comparar(atual, baseline, args.tolerancia)
+        if regressoes:
+            print("❌ Regressões em relação à baseline:", file=sys.stderr)
+            for regressao in regressoes:
+                print(f"  - {regressao}", file=sys.stderr)
+            return 1
+        print("✅ Sem regressões em relação à baseline", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
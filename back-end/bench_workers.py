@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# bench_workers.py
+# Benchmark de carga HTTP: compara o processo único (uvicorn sem workers,
+# loop asyncio e parser h11) com o modo produção do start.py (gunicorn com
+# vários workers, uvloop/httptools quando instalados).
+#
+# Executar:
+#   python bench_workers.py                                  # 10k alunos, 20 s por modo
+#   python bench_workers.py --alunos 100000 --concorrencia 64 --workers 4
+#
+# O servidor roda em subprocesso com banco temporário (DB_PATH). O gerador
+# de carga é um único processo asyncio (httpx): em máquinas com poucas CPUs
+# ele disputa CPU com os workers, então compare os modos na mesma máquina.
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from bench_rotas import ambiente_escala, percentil, popular
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Rotas de leitura mais usadas pelo front-end (sem If-None-Match: respostas completas)
+ROTAS = ["/alunos?limit=100", "/turmas", "/statistics", "/alunos?search=silva"]
+
+def comando_servidor(modo: str, porta: int, workers: int) -> list:
+    if modo == "simples":
+        return [sys.executable, "-m", "uvicorn", "app:app", "--port", str(porta),
+                "--loop", "asyncio", "--http", "h11", "--log-level", "warning"]
+    return [sys.executable, "start.py", "--modo", "producao", "--port", str(porta),
+            "--workers", str(workers)]
+
+async def aguardar_servidor(url: str, timeout: float = 60.0):
+    async with httpx.AsyncClient() as client:
+        limite = time.monotonic() + timeout
+        while time.monotonic() < limite:
+            try:
+                if (await client.get(f"{url}/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Servidor não respondeu em {timeout:.0f}s")
+
+async def gerar_carga(url: str, concorrencia: int, duracao: float, aquecimento: float) -> dict:
+    """`concorrencia` clientes em laço fechado durante `duracao` segundos"""
+    limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=30) as client:
+        resposta = await client.post("/auth/login", json={"email": "admin@escola.com", "senha": "123456"})
+        resposta.raise_for_status()
+        headers = {"Authorization": f"Bearer {resposta.json()['access_token']}"}
+        
+        latencias, erros = [], 0
+        inicio = time.perf_counter()
+        inicio_medicao = inicio + aquecimento
+        fim = inicio_medicao + duracao
+        
+        async def cliente(indice: int):
+            nonlocal erros
+            i = indice
+            while True:
+                agora = time.perf_counter()
+                if agora >= fim:
+                    return
+                try:
+                    r = await client.get(ROTAS[i % len(ROTAS)], headers=headers)
+                    ok = r.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                depois = time.perf_counter()
+                if agora >= inicio_medicao:
+                    if ok:
+                        latencias.append(depois - agora)
+                    else:
+                        erros += 1
+                i += 1
+        
+        await asyncio.gather(*(cliente(i) for i in range(concorrencia)))
+    
+    ms = [valor * 1000 for valor in latencias]
+    return {
+        "requisicoes": len(ms),
+        "erros": erros,
+        "req_s": round(len(ms) / duracao, 1),
+        "p50_ms": round(percentil(ms, 0.50), 2) if ms else None,
+        "p95_ms": round(percentil(ms, 0.95), 2) if ms else None,
+        "p99_ms": round(percentil(ms, 0.99), 2) if ms else None,
+    }
+
+def medir_modo(modo: str, env: dict, args) -> dict:
+    """Sobe o servidor no modo pedido, gera carga e encerra com SIGTERM"""
+    url = f"http://127.0.0.1:{args.porta}"
+    processo = subprocess.Popen(
+        comando_servidor(modo, args.porta, args.workers), cwd=BASE_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        asyncio.run(aguardar_servidor(url))
+        return asyncio.run(gerar_carga(url, args.concorrencia, args.duracao, args.aquecimento))
+    finally:
+        processo.send_signal(signal.SIGTERM)
+        try:
+            processo.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            processo.kill()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark processo único x modo produção")
+    parser.add_argument("--alunos", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--concorrencia", type=int, default=32)
+    parser.add_argument("--duracao", type=float, default=20.0)
+    parser.add_argument("--aquecimento", type=float, default=2.0)
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--modos", nargs="+", choices=["simples", "producao"], default=["simples", "producao"])
+    parser.add_argument("--saida", help="grava os resultados em JSON")
+    parser.add_argument("--popular-interno", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.popular_interno:
+        popular(args.popular_interno)
+        return 0
+    
+    resultados = {}
+    with tempfile.TemporaryDirectory() as diretorio:
+        env = ambiente_escala(diretorio)
+        env.update({
+            # Compartilhado entre os workers; limites altos para não interferir
+            "LOGIN_RATE_LIMIT_BACKEND": "sqlite",
+            "LOGIN_RATE_LIMIT_DB": os.path.join(diretorio, "limites.db"),
+            "ACCESS_LOG": "0",
+        })
+        print(f"🌱 Gerando {args.alunos} alunos...", file=sys.stderr)
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--popular-interno", str(args.alunos)],
+            env=env, cwd=BASE_DIR, stdout=subprocess.DEVNULL, check=True
+        )
+        for modo in args.modos:
+            print(f"📊 Modo {modo}...", file=sys.stderr)
+            resultados[modo] = medir_modo(modo, env, args)
+    
+    print(f"\n{'modo':<10} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'erros':>6}")
+    for modo, r in resultados.items():
+        print(f"{modo:<10} {r['req_s']:>9} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {r['erros']:>6}")
+    
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump({"parametros": vars(args), "resultados": resultados}, arquivo, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# buffer_acessos.py
+# Gravação adiada (write-behind) do histórico de login e do último acesso
+import asyncio
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from database import AsyncSessionLocal
+
+# Intervalo máximo entre gravações e quantidade de registros que força uma
+# gravação antecipada. BUFFER_MAX_PENDENTES limita a memória se o banco
+# ficar indisponível (os registros mais antigos são descartados).
+LOGIN_BUFFER_FLUSH_MS = int(os.getenv("LOGIN_BUFFER_FLUSH_MS", "500"))
+LOGIN_BUFFER_MAX_ROWS = int(os.getenv("LOGIN_BUFFER_MAX_ROWS", "200"))
+LOGIN_BUFFER_MAX_PENDENTES = int(os.getenv("LOGIN_BUFFER_MAX_PENDENTES", "50000"))
+
+class BufferAcessos:
+    """
+    Acumula as linhas de HistoricoLogin e os ultimo_acesso dos usuários em
+    memória e grava tudo em uma única transação a cada LOGIN_BUFFER_FLUSH_MS
+    ou quando LOGIN_BUFFER_MAX_ROWS linhas se acumulam. Assim o login não
+    espera nenhum commit em disco.
+    """
+    
+    def __init__(self, intervalo_ms: int, max_linhas: int, max_pendentes: int):
+        self.intervalo = intervalo_ms / 1000
+        self.max_linhas = max_linhas
+        self.max_pendentes = max_pendentes
+        self._historicos: List[dict] = []
+        self._ultimos_acessos: Dict[int, datetime] = {}
+        self._cheio: Optional[asyncio.Event] = None
+        self._tarefa: Optional[asyncio.Task] = None
+        self._parando = False
+        self.descartados = 0
+    
+    def profundidade(self) -> int:
+        """Registros aguardando gravação (métrica)"""
+        return len(self._historicos) + len(self._ultimos_acessos)
+    
+    def registrar_login(self, usuario_id: int, ip_address: Optional[str],
+                        user_agent: Optional[str], sucesso: bool) -> datetime:
+        """Enfileira uma tentativa de login; retorna o horário registrado"""
+        agora = datetime.utcnow()
+        self._historicos.append({
+            "usuario_id": usuario_id,
+            "data_login": agora,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "sucesso": sucesso,
+        })
+        if sucesso:
+            self._ultimos_acessos[usuario_id] = agora
+        
+        if len(self._historicos) > self.max_pendentes:
+            excesso = len(self._historicos) - self.max_pendentes
+            del self._historicos[:excesso]
+            self.descartados += excesso
+        
+        if self._cheio is not None and len(self._historicos) >= self.max_linhas:
+            self._cheio.set()
+        return agora
+    
+    async def iniciar(self):
+        """Inicia a tarefa de gravação periódica"""
+        self._cheio = asyncio.Event()
+        self._parando = False
+        self._tarefa = asyncio.create_task(self._executar())
+    
+    async def parar(self):
+        """Interrompe a tarefa e grava o que estiver pendente"""
+        if self._tarefa:
+            # Sem cancel(): uma gravação em andamento termina antes de sair
+            self._parando = True
+            self._cheio.set()
+            await self._tarefa
+            self._tarefa = None
+        await self.gravar()
+    
+    async def _executar(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._cheio.wait(), timeout=self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+            self._cheio.clear()
+            if self._parando:
+                return
+            try:
+                await self.gravar()
+            except Exception as e:
+                print(f"⚠️ Erro ao gravar histórico de login: {e}")
+    
+    async def gravar(self):
+        """Grava os registros pendentes em uma transação"""
+        if not self._historicos and not self._ultimos_acessos:
+            return
+        
+        from services import UsuarioService
+        
+        historicos, self._historicos = self._historicos, []
+        ultimos_acessos, self._ultimos_acessos = self._ultimos_acessos, {}
+        try:
+            async with AsyncSessionLocal() as db:
+                await UsuarioService.registrar_acessos(db, historicos, ultimos_acessos)
+        except BaseException:
+            # Devolve para a fila (também se a tarefa for cancelada); a
+            # próxima rodada, ou a gravação final do parar(), tenta de novo
+            self._historicos[:0] = historicos
+            for usuario_id, data in ultimos_acessos.items():
+                self._ultimos_acessos.setdefault(usuario_id, data)
+            raise
+
+buffer_acessos = BufferAcessos(LOGIN_BUFFER_FLUSH_MS, LOGIN_BUFFER_MAX_ROWS, LOGIN_BUFFER_MAX_PENDENTES)
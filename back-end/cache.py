@@ -0,0 +1,49 @@
+# cache.py
+# Cache em memória com expiração (TTL) e limite de tamanho (LRU)
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+import time
+
+class TTLCache:
+    """
+    Cache em processo: cada entrada expira após `ttl` segundos e, quando
+    `maxsize` é atingido, a entrada usada há mais tempo é descartada.
+    Não é compartilhado entre workers.
+    """
+    
+    def __init__(self, maxsize: int = 1024, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retorna o valor em cache ou None se ausente/expirado"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        
+        self._data.move_to_end(key)
+        return value
+    
+    def set(self, key: Hashable, value: Any):
+        """Armazena um valor, descartando o menos usado se necessário"""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+    
+    def invalidate(self, key: Hashable):
+        """Remove uma entrada do cache"""
+        self._data.pop(key, None)
+    
+    def clear(self):
+        """Esvazia o cache"""
+        self._data.clear()
+    
+    def __len__(self) -> int:
+        return len(self._data)
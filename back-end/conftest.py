@@ -0,0 +1,174 @@
+# conftest.py
+# Bancos dos testes: SQLite temporário sempre; PostgreSQL quando disponível
+#
+#   TEST_POSTGRES_URL=postgresql+psycopg://postgres@localhost:5432/postgres
+#       usa um servidor existente (cria e remove um banco por execução)
+#   sem TEST_POSTGRES_URL, com initdb/pg_ctl no PATH (ou em PG_BIN)
+#       inicia uma instância local temporária (não funciona como root)
+#   nenhum dos dois: os testes em PostgreSQL são pulados
+#
+# sessoes/client/headers: banco populado pelo gerador e cliente da API com
+# orçamento de consultas estrito, um por módulo de teste
+import os
+import shutil
+import socket
+import subprocess
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+import app as app_module
+import auth
+import instrumentacao
+from app import app
+from database import get_async_session, get_read_session, async_url, read_url, connect_args
+from gerador import gerar_dados, SENHA_PADRAO
+from instrumentacao import instrument_engine
+from limite_login import LimitadorLogin, BackendMemoria
+from models import Base
+from search import ensure_search_index
+
+def _binario(nome: str):
+    pg_bin = os.getenv("PG_BIN")
+    if pg_bin:
+        caminho = os.path.join(pg_bin, nome)
+        return caminho if os.path.exists(caminho) else None
+    return shutil.which(nome)
+
+def _porta_livre() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture(scope="session")
+def postgres_server(tmp_path_factory):
+    """URL administrativa (banco postgres) de um servidor PostgreSQL"""
+    url = os.getenv("TEST_POSTGRES_URL")
+    if url:
+        yield url
+        return
+    
+    initdb, pg_ctl = _binario("initdb"), _binario("pg_ctl")
+    if not initdb or not pg_ctl or os.geteuid() == 0:
+        pytest.skip("PostgreSQL indisponível: defina TEST_POSTGRES_URL ou PG_BIN")
+    
+    dados = str(tmp_path_factory.mktemp("pgdata"))
+    porta = _porta_livre()
+    subprocess.run([initdb, "-D", dados, "-U", "postgres", "--auth=trust", "-E", "UTF8"],
+                   check=True, stdout=subprocess.DEVNULL)
+    subprocess.run([pg_ctl, "-D", dados, "-w", "-l", os.path.join(dados, "log"),
+                    "-o", f"-p {porta} -k {dados} -c listen_addresses=127.0.0.1", "start"],
+                   check=True, stdout=subprocess.DEVNULL)
+    try:
+        yield f"postgresql+psycopg://postgres@127.0.0.1:{porta}/postgres"
+    finally:
+        subprocess.run([pg_ctl, "-D", dados, "-m", "fast", "stop"], stdout=subprocess.DEVNULL)
+
+def _postgres_database(servidor: str):
+    """Cria um banco vazio no servidor; retorna (url, função de remoção)"""
+    nome = f"escola_test_{uuid.uuid4().hex[:8]}"
+    # client_encoding: o banco administrativo pode ter sido criado em SQL_ASCII
+    admin = create_engine(servidor, isolation_level="AUTOCOMMIT",
+                          connect_args={"client_encoding": "utf8"})
+    with admin.connect() as conn:
+        conn.execute(text(f"CREATE DATABASE {nome} ENCODING 'UTF8' TEMPLATE template0"))
+    
+    def remover():
+        with admin.connect() as conn:
+            conn.execute(text(f"DROP DATABASE IF EXISTS {nome} WITH (FORCE)"))
+        admin.dispose()
+    
+    return make_url(servidor).set(database=nome).render_as_string(hide_password=False), remover
+
+@pytest.fixture(scope="module", params=["sqlite", "postgresql"])
+def database_url(request, tmp_path_factory):
+    """URL síncrona de um banco vazio, em cada backend suportado"""
+    if request.param == "sqlite":
+        yield f"sqlite:///{tmp_path_factory.mktemp('sqlite') / 'escola.db'}"
+        return
+    url, remover = _postgres_database(request.getfixturevalue("postgres_server"))
+    try:
+        yield url
+    finally:
+        remover()
+
+@pytest.fixture(scope="module")
+def sessoes(database_url):
+    """
+    Banco temporário (SQLite e PostgreSQL) populado e as fábricas de sessão
+    de escrita e somente leitura, como em database.py. Também devolve a
+    lista dos comandos executados pelo engine de escrita.
+    """
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    with sessionmaker(bind=engine)() as db:
+        gerar_dados(db, turmas_por_ano=2, alunos_por_turma=30, logins=50)
+    engine.dispose()
+    
+    # NullPool: sem o context manager, o TestClient usa um event loop por
+    # requisição e conexões assíncronas não podem ser reaproveitadas entre eles
+    escrita = create_async_engine(async_url(database_url), poolclass=NullPool)
+    url_leitura = read_url(async_url(database_url))
+    leitura = create_async_engine(
+        url_leitura, poolclass=NullPool,
+        connect_args=connect_args(url_leitura, somente_leitura=True)
+    )
+    comandos_escrita = []
+    for async_engine in (escrita, leitura):
+        instrument_engine(async_engine.sync_engine)
+    event.listen(escrita.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: comandos_escrita.append(statement))
+    
+    yield (
+        async_sessionmaker(bind=escrita, expire_on_commit=False),
+        async_sessionmaker(bind=leitura, expire_on_commit=False),
+        comandos_escrita,
+    )
+
+@pytest.fixture(scope="module")
+def client(sessoes):
+    """Cliente da API com as sessões do banco temporário e orçamento estrito"""
+    fabrica_escrita, fabrica_leitura, _ = sessoes
+    
+    async def override_session():
+        async with fabrica_escrita() as db:
+            yield db
+    
+    async def override_read_session():
+        async with fabrica_leitura() as db:
+            yield db
+    
+    app.dependency_overrides[get_async_session] = override_session
+    app.dependency_overrides[get_read_session] = override_read_session
+    modo_anterior = instrumentacao.SQL_QUERY_BUDGET
+    instrumentacao.SQL_QUERY_BUDGET = "raise"
+    # Limites de login e cache de usuários próprios do módulo: todos os
+    # logins vêm do mesmo IP e os ids se repetem entre os bancos
+    limitador_anterior = app_module.limitador_login
+    app_module.limitador_login = LimitadorLogin(BackendMemoria())
+    auth.user_cache.clear()
+    try:
+        # Sem o context manager: os eventos de startup usariam o banco padrão
+        yield TestClient(app)
+    finally:
+        instrumentacao.SQL_QUERY_BUDGET = modo_anterior
+        app_module.limitador_login = limitador_anterior
+        auth.user_cache.clear()
+        app.dependency_overrides.pop(get_async_session, None)
+        app.dependency_overrides.pop(get_read_session, None)
+
+@pytest.fixture(scope="module")
+def headers(client):
+    response = client.post("/auth/login", json={"email": "admin@escola.com", "senha": SENHA_PADRAO})
+    assert response.status_code == 200, response.text
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    # Os orçamentos das rotas supõem o usuário autenticado já em cache
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    return headers
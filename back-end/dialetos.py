@@ -0,0 +1,25 @@
+# dialetos.py
+# Construções SQL que variam entre os bancos suportados (SQLite e PostgreSQL)
+from sqlalchemy.dialects import postgresql, sqlite
+
+# INSERT ... ON CONFLICT: mesma API (on_conflict_do_update/do_nothing,
+# index_elements, set_, excluded) nos dois dialetos
+_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+def dialect_name(bind) -> str:
+    """Nome do dialeto de uma Connection, Engine, Session ou AsyncSession"""
+    dialect = getattr(bind, "dialect", None)
+    if dialect is None:
+        dialect = bind.get_bind().dialect
+    return dialect.name
+
+def upsert_insert(bind, table):
+    """insert() com suporte a ON CONFLICT para o dialeto de `bind`"""
+    nome = dialect_name(bind)
+    try:
+        return _INSERTS[nome](table)
+    except KeyError:
+        raise NotImplementedError(f"Upsert não suportado para o banco {nome}") from None
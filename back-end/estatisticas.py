@@ -0,0 +1,191 @@
+# estatisticas.py
+# Contadores do dashboard mantidos de forma incremental
+import asyncio
+from collections import Counter, defaultdict
+from typing import Optional
+from sqlalchemy import event, inspect, select, func, delete, insert, case
+from sqlalchemy.orm import Session
+from models import (
+    Usuario, Aluno, Turma, StatusAlunoEnum,
+    EstatisticaContador, EstatisticaTurma
+)
+from versoes import registrar_alteracao
+from dialetos import upsert_insert
+
+# Chaves da tabela `estatisticas`
+CONTADORES = ["total_alunos", "alunos_ativos", "total_turmas", "turmas_ativas", "usuarios_ativos"]
+
+# Pedido para a tarefa periódica de app.py reconciliar antes do próximo
+# intervalo. Criado pela própria tarefa, no event loop dela.
+_pedido_reconciliacao: Optional[asyncio.Event] = None
+
+def _valor(value):
+    """Normaliza enums do modelo e dos schemas para o valor em string"""
+    return getattr(value, "value", value)
+
+def _anterior(obj, attr: str):
+    """Valor do atributo antes das alterações pendentes no flush atual"""
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, attr)
+
+def _contribuicao(modelo, valores: dict, sinal: int, contadores: Counter, por_turma: dict):
+    """Soma (sinal=+1) ou subtrai (sinal=-1) a contribuição de uma linha"""
+    if issubclass(modelo, Aluno):
+        ativo = _valor(valores["status"] or StatusAlunoEnum.ativo) == StatusAlunoEnum.ativo.value
+        contadores["total_alunos"] += sinal
+        contadores["alunos_ativos"] += sinal * ativo
+        if valores["turma_id"] is not None:
+            por_turma[valores["turma_id"]][0] += sinal
+            por_turma[valores["turma_id"]][1] += sinal * ativo
+    elif issubclass(modelo, Turma):
+        contadores["total_turmas"] += sinal
+        contadores["turmas_ativas"] += sinal * (valores["ativa"] is not False)
+    elif issubclass(modelo, Usuario):
+        contadores["usuarios_ativos"] += sinal * (valores["ativo"] is not False)
+
+_ATRIBUTOS = {
+    Aluno: ("status", "turma_id"),
+    Turma: ("ativa",),
+    Usuario: ("ativo",),
+}
+
+def _atributos(obj):
+    for cls, attrs in _ATRIBUTOS.items():
+        if isinstance(obj, cls):
+            return attrs
+    return None
+
+def _aplicar_deltas(session: Session, flush_context):
+    """
+    Listener after_flush: calcula os deltas das linhas inseridas, alteradas e
+    removidas neste flush e os grava na mesma transação, via upsert.
+    """
+    contadores = Counter()
+    por_turma = defaultdict(lambda: [0, 0])
+    
+    for obj in session.new:
+        attrs = _atributos(obj)
+        if attrs:
+            _contribuicao(type(obj), {a: getattr(obj, a) for a in attrs}, +1, contadores, por_turma)
+    
+    for obj in session.deleted:
+        attrs = _atributos(obj)
+        if attrs:
+            _contribuicao(type(obj), {a: _anterior(obj, a) for a in attrs}, -1, contadores, por_turma)
+    
+    for obj in session.dirty:
+        attrs = _atributos(obj)
+        if not attrs or not session.is_modified(obj):
+            continue
+        _contribuicao(type(obj), {a: _anterior(obj, a) for a in attrs}, -1, contadores, por_turma)
+        _contribuicao(type(obj), {a: getattr(obj, a) for a in attrs}, +1, contadores, por_turma)
+    
+    _gravar_deltas(session.connection(), contadores, por_turma)
+
+def _gravar_deltas(conn, contadores: Counter, por_turma: dict):
+    """Aplica os deltas nas tabelas de contadores via upsert"""
+    for chave, delta in contadores.items():
+        if delta == 0:
+            continue
+        stmt = upsert_insert(conn, EstatisticaContador).values(chave=chave, valor=delta)
+        conn.execute(stmt.on_conflict_do_update(
+            index_elements=[EstatisticaContador.chave],
+            set_={"valor": EstatisticaContador.valor + stmt.excluded.valor}
+        ))
+    
+    for turma_id, (total, ativos) in por_turma.items():
+        if total == 0 and ativos == 0:
+            continue
+        stmt = upsert_insert(conn, EstatisticaTurma).values(
+            turma_id=turma_id, total_alunos=total, alunos_ativos=ativos
+        )
+        conn.execute(stmt.on_conflict_do_update(
+            index_elements=[EstatisticaTurma.turma_id],
+            set_={
+                "total_alunos": EstatisticaTurma.total_alunos + stmt.excluded.total_alunos,
+                "alunos_ativos": EstatisticaTurma.alunos_ativos + stmt.excluded.alunos_ativos,
+            }
+        ))
+
+# Vale para todas as sessões (síncronas e a sessão interna das assíncronas)
+event.listen(Session, "after_flush", _aplicar_deltas)
+
+def registrar_insercoes(session: Session, modelo, linhas: list):
+    """
+    Atualiza os contadores para linhas inseridas em massa com insert() do
+    Core, que não passam pelo after_flush. Deve rodar na mesma transação.
+    """
+    contadores = Counter()
+    por_turma = defaultdict(lambda: [0, 0])
+    attrs = _ATRIBUTOS[modelo]
+    for linha in linhas:
+        _contribuicao(modelo, {a: linha.get(a) for a in attrs}, +1, contadores, por_turma)
+    _gravar_deltas(session.connection(), contadores, por_turma)
+
+def contar(session: Session) -> dict:
+    """
+    Conta os valores dos contadores direto nas tabelas de origem, sem
+    gravar nada (funciona em uma sessão somente leitura)
+    """
+    ativo = StatusAlunoEnum.ativo
+    return {
+        "total_alunos": session.scalar(select(func.count(Aluno.id))),
+        "alunos_ativos": session.scalar(select(func.count(Aluno.id)).where(Aluno.status == ativo)),
+        "total_turmas": session.scalar(select(func.count(Turma.id))),
+        "turmas_ativas": session.scalar(select(func.count(Turma.id)).where(Turma.ativa == True)),
+        "usuarios_ativos": session.scalar(select(func.count(Usuario.id)).where(Usuario.ativo == True)),
+    }
+
+def contar_por_turma():
+    """Subconsulta (turma_id, total_alunos, alunos_ativos) contada em alunos"""
+    return select(
+        Aluno.turma_id.label("turma_id"),
+        func.count(Aluno.id).label("total_alunos"),
+        func.sum(case((Aluno.status == StatusAlunoEnum.ativo, 1), else_=0)).label("alunos_ativos")
+    ).where(Aluno.turma_id.is_not(None)).group_by(Aluno.turma_id)
+
+def recalcular_contadores(session: Session) -> dict:
+    """
+    Recalcula todos os contadores a partir das tabelas de origem, na
+    transação da sessão síncrona (sem commit). Usado por quem insere em
+    massa com o Core, como o gerador.py.
+    """
+    valores = contar(session)
+    
+    session.execute(delete(EstatisticaContador))
+    session.execute(insert(EstatisticaContador), [
+        {"chave": chave, "valor": valor} for chave, valor in valores.items()
+    ])
+    
+    session.execute(delete(EstatisticaTurma))
+    session.execute(insert(EstatisticaTurma).from_select(
+        ["turma_id", "total_alunos", "alunos_ativos"], contar_por_turma()
+    ))
+    # Invalida as ETags de /statistics caso a reconciliação corrija algo
+    registrar_alteracao(session, "estatisticas")
+    return valores
+
+async def reconciliar_estatisticas(db) -> dict:
+    """
+    Corrige qualquer desvio dos contadores (ex.: alterações feitas fora do
+    ORM, como nos scripts fix_*.py) recalculando tudo em uma transação.
+    """
+    valores = await db.run_sync(recalcular_contadores)
+    await db.commit()
+    return valores
+
+def iniciar_pedidos_reconciliacao() -> asyncio.Event:
+    """Evento aguardado pela tarefa periódica (chamado no event loop dela)"""
+    global _pedido_reconciliacao
+    _pedido_reconciliacao = asyncio.Event()
+    return _pedido_reconciliacao
+
+def solicitar_reconciliacao():
+    """
+    Antecipa a reconciliação periódica. Sem efeito se a tarefa não roda
+    neste processo (outro worker tem o lock): ela reconcilia no intervalo.
+    """
+    if _pedido_reconciliacao is not None:
+        _pedido_reconciliacao.set()
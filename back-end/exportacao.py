@@ -0,0 +1,85 @@
+# exportacao.py
+# Exportação de alunos em streaming (CSV/NDJSON)
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+from typing import AsyncIterator, Optional
+
+from database import ReadSessionLocal
+
+FORMATOS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Linhas acumuladas antes de enviar um pedaço da resposta
+EXPORT_FLUSH_ROWS = int(os.getenv("EXPORT_FLUSH_ROWS", "500"))
+
+COLUNAS = [
+    "id", "nome", "cpf", "rg", "data_nascimento", "email", "telefone",
+    "endereco", "nome_responsavel", "telefone_responsavel", "status",
+    "data_matricula", "observacoes", "turma_id", "turma_nome",
+    "data_criacao", "data_atualizacao",
+]
+
+def _serializar(valor):
+    """Converte datas e enums para texto"""
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return getattr(valor, "value", valor)
+
+async def gerar_exportacao(
+    linhas: AsyncIterator,
+    formato: str
+) -> AsyncIterator[bytes]:
+    """
+    Converte as linhas do banco em pedaços de CSV/NDJSON. O cabeçalho sai
+    imediatamente e depois um pedaço a cada EXPORT_FLUSH_ROWS linhas, então a
+    memória usada não depende do tamanho da lista.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if formato == "csv" else None
+    
+    if writer:
+        writer.writerow(COLUNAS)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    
+    pendentes = 0
+    async for linha in linhas:
+        valores = [_serializar(valor) for valor in linha]
+        if writer:
+            writer.writerow(["" if valor is None else valor for valor in valores])
+        else:
+            buffer.write(json.dumps(dict(zip(COLUNAS, valores)), ensure_ascii=False))
+            buffer.write("\n")
+        
+        pendentes += 1
+        if pendentes >= EXPORT_FLUSH_ROWS:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pendentes = 0
+    
+    if pendentes:
+        yield buffer.getvalue().encode("utf-8")
+
+async def exportar_alunos(
+    formato: str,
+    turma_id: Optional[int] = None,
+    status=None
+) -> AsyncIterator[bytes]:
+    """
+    Gera a exportação com uma sessão própria: o StreamingResponse continua
+    enviando depois que a rota retorna, então a sessão da requisição não
+    pode ser usada aqui.
+    """
+    from services import AlunoService
+    
+    async with ReadSessionLocal() as db:
+        linhas = AlunoService.stream_alunos(db, turma_id=turma_id, status=status)
+        async for pedaco in gerar_exportacao(linhas, formato):
+            yield pedaco
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# gerador.py
+# Gerador determinístico de dados sintéticos (usuários, turmas, alunos e
+# histórico de login) com inserts em massa do SQLAlchemy Core
+#
+# Executar: python gerador.py --escolas 10 --turmas-por-ano 4 --alunos-por-turma 30
+import argparse
+import os
+import random
+import time
+import unicodedata
+from contextlib import contextmanager
+from operator import mul
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import insert, select, func, text
+from sqlalchemy.orm import Session
+
+from models import Usuario, Turma, Aluno, HistoricoLogin, StatusAlunoEnum, CargoEnum
+from auth import get_password_hash
+from estatisticas import recalcular_contadores
+from versoes import registrar_alteracao
+import search as search_index
+
+SENHA_PADRAO = "123456"
+
+# Cache do SQLite (KiB) na conexão que faz a carga
+GERADOR_CACHE_KB = int(os.getenv("GERADOR_CACHE_KB", "1048576"))
+
+# Usuários fixos (credenciais documentadas no README)
+USUARIOS_PADRAO = [
+    ("Admin Sistema", "admin@escola.com", CargoEnum.diretor),
+    ("Maria Santos Silva", "maria@escola.com", CargoEnum.coordenador),
+    ("Ana Paula Costa", "ana@escola.com", CargoEnum.secretario),
+    ("João Carlos Oliveira", "joao@escola.com", CargoEnum.professor),
+]
+
+# Séries: (nome, descrição, idade típica)
+SERIES = [
+    (f"{ano}º ANO", f"{ano}º ano do ensino fundamental", 5 + ano) for ano in range(1, 10)
+] + [
+    (f"{ano}º MÉDIO", f"{ano}º ano do ensino médio", 14 + ano) for ano in range(1, 4)
+]
+PERIODOS = ["Matutino", "Vespertino", "Noturno"]
+
+NOMES = [
+    "Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Felipe", "Gabriela", "Heitor", "Isabela",
+    "João", "Larissa", "Lucas", "Mariana", "Miguel", "Natália", "Otávio", "Paula", "Pedro",
+    "Rafaela", "Samuel", "Sofia", "Thiago", "Valentina", "Vitor", "Helena", "Arthur",
+    "Alice", "Bernardo", "Laura", "Davi", "Manuela", "Gustavo", "Beatriz", "Enzo",
+]
+SOBRENOMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Costa", "Almeida",
+    "Ferreira", "Rodrigues", "Gomes", "Martins", "Araújo", "Barbosa", "Ribeiro",
+    "Carvalho", "Rocha", "Dias", "Moreira", "Nascimento", "Mendes", "Freitas",
+]
+RUAS = ["Rua das Flores", "Av. Principal", "Rua do Comércio", "Rua São João",
+        "Av. Brasil", "Rua das Palmeiras", "Rua XV de Novembro", "Av. Paulista"]
+BAIRROS = ["Centro", "Jardim", "Vila Nova", "Boa Vista", "Santa Cruz", "Industrial"]
+OBSERVACOES = ["Aluno exemplar", "Bom desempenho em matemática", "Precisa de reforço em português",
+               "Participa do grêmio estudantil", "Transferido de outra escola"]
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_0) Safari/605.1.15",
+    "Mozilla/5.0 (X11; Linux x86_64) Firefox/121.0",
+]
+
+# Bijeção em [0, 10^9): números-base de CPF distintos para cada índice
+_CPF_BASES = 1_000_000_000
+_CPF_MULTIPLICADOR = 387_420_489  # 3^18, primo com 10^9
+_CPF_REPETIDOS = {int(str(d) * 9) for d in range(10)}
+# Últimos índices reservados: os números-base deles substituem os repetidos,
+# então nenhum índice usável recebe a base de outro
+_CPF_RESERVA = 20
+
+# Soma ponderada dos dígitos por bloco de 3 (centenas de milhão, milhar,
+# unidade) do número-base: o cálculo dos verificadores vira 6 consultas
+_PESOS_1 = range(10, 1, -1)
+_PESOS_2 = range(11, 2, -1)
+_SOMAS = [
+    [(sum(map(mul, map(int, f"{v:03d}"), _PESOS_1[3 * p:3 * p + 3])),
+      sum(map(mul, map(int, f"{v:03d}"), _PESOS_2[3 * p:3 * p + 3])))
+     for v in range(1000)]
+    for p in range(3)
+]
+
+def _digitos_cpf(base: int) -> str:
+    alto, resto = divmod(base, 1_000_000)
+    meio, baixo = divmod(resto, 1000)
+    a1, a2 = _SOMAS[0][alto]
+    m1, m2 = _SOMAS[1][meio]
+    b1, b2 = _SOMAS[2][baixo]
+    primeiro = (a1 + m1 + b1) * 10 % 11 % 10
+    segundo = (a2 + m2 + b2 + 2 * primeiro) * 10 % 11 % 10
+    return f"{primeiro}{segundo}"
+
+def digitos_cpf(base: str) -> str:
+    """Calcula os dois dígitos verificadores de um CPF de 9 dígitos"""
+    return _digitos_cpf(int(base))
+
+def _cpf_base(indice: int) -> int:
+    return indice * _CPF_MULTIPLICADOR % _CPF_BASES
+
+# Base repetida -> base de um índice reservado (não repetida)
+_CPF_SUBSTITUTOS = dict(zip(
+    sorted(_CPF_REPETIDOS),
+    [base for base in map(_cpf_base, range(_CPF_BASES - _CPF_RESERVA, _CPF_BASES))
+     if base not in _CPF_REPETIDOS],
+))
+
+def cpf_valido(indice: int) -> str:
+    """
+    CPF formatado, válido e único para cada índice (até 10^9 - 20). Não
+    depende da seed: o índice continua após os alunos existentes, então
+    execuções com seeds diferentes no mesmo banco não repetem CPFs.
+    """
+    if not 0 <= indice < _CPF_BASES - _CPF_RESERVA:
+        raise ValueError(f"Índice de CPF fora da faixa: {indice}")
+    base = _cpf_base(indice)
+    if base in _CPF_REPETIDOS:  # 111.111.111-11 etc. são inválidos
+        base = _CPF_SUBSTITUTOS[base]
+    numero = f"{base:09d}"
+    return f"{numero[:3]}.{numero[3:6]}.{numero[6:]}-{_digitos_cpf(base)}"
+
+def _ascii(texto: str) -> str:
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode().lower()
+
+# Nomes sem acento para os emails, calculados uma vez
+_ASCII = {nome: _ascii(nome) for nome in NOMES + SOBRENOMES}
+
+def _gerar_alunos(rnd: random.Random, inicio: int, fim: int, primeiro_aluno: int,
+                  turma_ids: list, alunos_por_turma: int, turmas_por_ano: int,
+                  proporcao_inativos: float, ano: int) -> list:
+    """
+    Linhas dos alunos de índice [inicio, fim). Usa random() e choices() em
+    vez de randint()/choice() por linha: é o trecho mais quente da carga.
+    data_criacao/data_atualizacao ficam com o default do banco (now()).
+    """
+    r = rnd.random
+    n = fim - inicio
+    nomes = rnd.choices(NOMES, k=n)
+    sobrenomes = rnd.choices(SOBRENOMES, k=2 * n)
+    responsaveis = rnd.choices(NOMES, k=n)
+    ruas = rnd.choices(RUAS, k=n)
+    bairros = rnd.choices(BAIRROS, k=n)
+    nascimentos = {
+        idade: [date(ano - idade, 1, 1) + timedelta(days=d) for d in range(365)]
+        for _, _, idade in SERIES
+    }
+    matriculas = [date(ano, 2, 1) + timedelta(days=d) for d in range(30)]
+    ativo, inativo = StatusAlunoEnum.ativo, StatusAlunoEnum.inativo
+    
+    linhas = []
+    for k in range(n):
+        i = inicio + k
+        indice = primeiro_aluno + i
+        turma_indice = i // alunos_por_turma
+        idade = SERIES[turma_indice // turmas_por_ano % len(SERIES)][2]
+        sobrenome = f"{sobrenomes[2 * k]} {sobrenomes[2 * k + 1]}"
+        nome = f"{nomes[k]} {sobrenome}"
+        linhas.append({
+            "nome": nome,
+            "cpf": cpf_valido(indice),
+            "rg": f"{int(r() * 90) + 10}.{int(r() * 900) + 100}.{int(r() * 900) + 100}-{int(r() * 10)}",
+            "data_nascimento": nascimentos[idade][int(r() * 365)],
+            "email": f"{_ASCII[nomes[k]]}.{_ASCII[sobrenomes[2 * k]]}.{_ASCII[sobrenomes[2 * k + 1]]}.{indice}@aluno.escola.com",
+            "telefone": f"(11) 9{int(r() * 9000) + 1000}-{int(r() * 9000) + 1000}",
+            "endereco": f"{ruas[k]}, {int(r() * 2000) + 1} - {bairros[k]}",
+            "nome_responsavel": f"{responsaveis[k]} {sobrenome}",
+            "telefone_responsavel": f"(11) 9{int(r() * 9000) + 1000}-{int(r() * 9000) + 1000}",
+            "status": inativo if r() < proporcao_inativos else ativo,
+            "data_matricula": matriculas[int(r() * 30)],
+            "observacoes": OBSERVACOES[int(r() * len(OBSERVACOES))] if r() < 0.2 else None,
+            "turma_id": turma_ids[turma_indice],
+        })
+    return linhas
+
+@contextmanager
+def _sem_indices(conn, tabela):
+    """
+    Remove os índices secundários (não únicos) de `tabela` durante a carga e
+    os recria ao final: ordenar as chaves uma vez custa menos que inseri-las
+    em ordem aleatória a cada lote. Os UNIQUE (CPF, email) ficam, pois são
+    eles que garantem a unicidade. Roda na transação de `conn`.
+    """
+    indices = [index for index in tabela.indexes if not index.unique]
+    for index in indices:
+        index.drop(conn)
+    yield
+    for index in indices:
+        index.create(conn)
+
+def gerar_dados(
+    db: Session,
+    escolas: int = 1,
+    turmas_por_ano: int = 2,
+    alunos_por_turma: int = 25,
+    proporcao_inativos: float = 0.1,
+    logins: int = 0,
+    usuarios_por_escola: int = 0,
+    ano_letivo: str = "2025",
+    limite_alunos: Optional[int] = None,
+    seed: int = 42,
+    lote: int = 10000,
+) -> dict:
+    """
+    Insere dados sintéticos determinísticos (mesma seed, mesmos dados) e
+    retorna as quantidades criadas.
+    
+    Para cada escola são criadas `turmas_por_ano` turmas em cada uma das 12
+    séries, cada uma com `alunos_por_turma` alunos (até `limite_alunos` no
+    total). Os inserts são feitos em lotes de `lote` linhas dentro de uma
+    única transação; contadores do dashboard e versões das tabelas são
+    atualizados ao final.
+    """
+    if not 1 <= alunos_por_turma <= 100:
+        raise ValueError("alunos_por_turma deve estar entre 1 e 100 (capacidade máxima da turma)")
+    
+    inicio = time.perf_counter()
+    rnd = random.Random(seed)
+    agora = datetime.utcnow().replace(microsecond=0)
+    ano = int(ano_letivo)
+    senha_hash = get_password_hash(SENHA_PADRAO)
+    
+    # Os índices continuam após os registros existentes: CPFs/emails únicos
+    # mesmo ao rodar o gerador mais de uma vez no mesmo banco
+    primeiro_aluno = db.scalar(select(func.coalesce(func.max(Aluno.id), 0)))
+    primeiro_usuario = db.scalar(select(func.coalesce(func.max(Usuario.id), 0)))
+    
+    # Usuários
+    usuarios = []
+    if primeiro_usuario == 0:
+        usuarios = [
+            {"nome": nome, "email": email, "senha_hash": senha_hash, "cargo": cargo,
+             "ativo": True, "data_criacao": agora}
+            for nome, email, cargo in USUARIOS_PADRAO
+        ]
+    cargos = [CargoEnum.professor, CargoEnum.professor, CargoEnum.professor,
+              CargoEnum.coordenador, CargoEnum.secretario]
+    for i in range(escolas * usuarios_por_escola):
+        nome = f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)}"
+        usuarios.append({
+            "nome": nome,
+            "email": f"{_ascii(nome).replace(' ', '.')}.{primeiro_usuario + i}@escola.com",
+            "senha_hash": senha_hash,
+            "cargo": cargos[i % len(cargos)],
+            "ativo": rnd.random() >= proporcao_inativos,
+            "data_criacao": agora,
+        })
+    if usuarios:
+        db.execute(insert(Usuario), usuarios)
+    
+    # Turmas. O nome é único: numeração de escola que ainda não existe no
+    # banco (ex.: "ESCOLA 002 - 1º ANO A" em um banco já populado pelo seed)
+    existentes = set(db.scalars(select(Turma.nome)))
+    letras = [chr(ord("A") + i) for i in range(turmas_por_ano)]
+    turmas = []
+    numero = 0
+    for _ in range(escolas):
+        while True:
+            numero += 1
+            prefixo = f"ESCOLA {numero:03d} - " if escolas > 1 or numero > 1 else ""
+            nomes = {f"{prefixo}{serie} {letra}" for serie, _, _ in SERIES for letra in letras}
+            if existentes.isdisjoint(nomes):
+                break
+        for serie, descricao, _ in SERIES:
+            for j, letra in enumerate(letras):
+                turmas.append({
+                    "nome": f"{prefixo}{serie} {letra}",
+                    "descricao": f"{descricao} - Turma {letra}",
+                    "capacidade": min(100, alunos_por_turma + 5),
+                    "ano_letivo": ano_letivo,
+                    "periodo": PERIODOS[j % len(PERIODOS)],
+                    "ativa": True,
+                    "data_criacao": agora,
+                })
+    # RETURNING na ordem dos parâmetros: no PostgreSQL os ids vêm da sequence
+    # e não necessariamente seguem o maior id existente
+    turma_ids = db.scalars(
+        insert(Turma).returning(Turma.id, sort_by_parameter_order=True), turmas
+    ).all()
+    
+    # Alunos, turma a turma
+    total_alunos = len(turmas) * alunos_por_turma
+    if limite_alunos is not None:
+        total_alunos = min(total_alunos, limite_alunos)
+    
+    # Cache maior durante a carga: os índices de email/CPF recebem chaves
+    # espalhadas e, com o cache padrão, cada lote relê páginas do disco
+    if db.get_bind().dialect.name == "sqlite":
+        db.execute(text(f"PRAGMA cache_size=-{GERADOR_CACHE_KB}"))
+    
+    conn = db.connection()
+    with search_index.bulk_load(conn, primeiro_aluno), _sem_indices(conn, Aluno.__table__):
+        for inicio_lote in range(0, total_alunos, lote):
+            db.execute(insert(Aluno.__table__), _gerar_alunos(
+                rnd, inicio_lote, min(inicio_lote + lote, total_alunos), primeiro_aluno,
+                turma_ids, alunos_por_turma, turmas_por_ano, proporcao_inativos, ano
+            ))
+    
+    # Histórico de login nos últimos 90 dias (falhas com usuario_id=0)
+    total_usuarios = db.scalar(select(func.max(Usuario.id)))
+    r = rnd.random
+    segundos = 90 * 86400
+    for inicio_lote in range(0, logins, lote):
+        linhas = []
+        for _ in range(min(lote, logins - inicio_lote)):
+            sucesso = r() >= 0.1
+            linhas.append({
+                "usuario_id": int(r() * total_usuarios) + 1 if sucesso else 0,
+                "data_login": agora - timedelta(seconds=int(r() * segundos)),
+                "ip_address": f"10.{int(r() * 256)}.{int(r() * 256)}.{int(r() * 254) + 1}",
+                "user_agent": USER_AGENTS[int(r() * len(USER_AGENTS))],
+                "sucesso": sucesso,
+            })
+        db.execute(insert(HistoricoLogin.__table__), linhas)
+    
+    # Inserts do Core não passam pelos listeners: recalcula os contadores
+    recalcular_contadores(db)
+    registrar_alteracao(db, "usuarios", "turmas", "alunos")
+    db.commit()
+    
+    return {
+        "usuarios": len(usuarios),
+        "turmas": len(turmas),
+        "alunos": total_alunos,
+        "logins": logins,
+        "segundos": round(time.perf_counter() - inicio, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos determinísticos")
+    parser.add_argument("--escolas", type=int, default=1)
+    parser.add_argument("--turmas-por-ano", type=int, default=2)
+    parser.add_argument("--alunos-por-turma", type=int, default=25)
+    parser.add_argument("--proporcao-inativos", type=float, default=0.1)
+    parser.add_argument("--logins", type=int, default=0)
+    parser.add_argument("--usuarios-por-escola", type=int, default=0)
+    parser.add_argument("--ano-letivo", default="2025")
+    parser.add_argument("--limite-alunos", type=int)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
+    from database import SessionLocal, init_database
+    
+    init_database()
+    with SessionLocal() as db:
+        resultado = gerar_dados(
+            db,
+            escolas=args.escolas,
+            turmas_por_ano=args.turmas_por_ano,
+            alunos_por_turma=args.alunos_por_turma,
+            proporcao_inativos=args.proporcao_inativos,
+            logins=args.logins,
+            usuarios_por_escola=args.usuarios_por_escola,
+            ano_letivo=args.ano_letivo,
+            limite_alunos=args.limite_alunos,
+            seed=args.seed,
+        )
+    print(f"✅ Dados gerados: {resultado}")
+
+if __name__ == "__main__":
+    main()
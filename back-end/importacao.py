@@ -0,0 +1,129 @@
+# importacao.py
+# Leitura em streaming de arquivos CSV/NDJSON para importação de alunos
+import csv
+import json
+import os
+from typing import AsyncIterator, List, Optional, Tuple
+
+FORMATOS = ("csv", "ndjson")
+
+# Quantidade de linhas validadas e gravadas por transação
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+
+Registro = Tuple[int, Optional[dict], Optional[str]]
+
+def detectar_formato(content_type: Optional[str], formato: Optional[str]) -> Optional[str]:
+    """Escolhe o formato pelo parâmetro explícito ou pelo Content-Type"""
+    if formato:
+        return formato.lower() if formato.lower() in FORMATOS else None
+    content_type = (content_type or "").lower()
+    if "csv" in content_type:
+        return "csv"
+    # application/json (um array) não é NDJSON: cai no 415 como os demais
+    if "ndjson" in content_type or "jsonl" in content_type:
+        return "ndjson"
+    return None
+
+def _decodificar(linha: bytes) -> str:
+    return linha.decode("utf-8-sig").rstrip("\r")
+
+async def iter_linhas(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Quebra o corpo recebido em linhas de texto à medida que ele chega. Os
+    pedaços de uma linha incompleta ficam em uma lista e são unidos uma vez
+    só, quando a quebra de linha chega (linear mesmo em linhas longas).
+    """
+    partes: List[bytes] = []
+    async for pedaco in stream:
+        linhas = pedaco.split(b"\n")
+        if len(linhas) == 1:
+            partes.append(pedaco)
+            continue
+        partes.append(linhas[0])
+        yield _decodificar(b"".join(partes))
+        for linha in linhas[1:-1]:
+            yield _decodificar(linha)
+        partes = [linhas[-1]] if linhas[-1] else []
+    if partes:
+        yield _decodificar(b"".join(partes))
+
+def _limpar(registro: dict) -> dict:
+    """Campos vazios do CSV são omitidos para valerem os padrões do AlunoCreate"""
+    return {
+        chave.strip(): valor.strip()
+        for chave, valor in registro.items()
+        if chave and valor is not None and valor.strip()
+    }
+
+async def iter_registros_ndjson(linhas: AsyncIterator[str]) -> AsyncIterator[Registro]:
+    """Um objeto JSON por linha; linhas em branco são ignoradas"""
+    numero = 0
+    async for linha in linhas:
+        numero += 1
+        if not linha.strip():
+            continue
+        try:
+            registro = json.loads(linha)
+        except json.JSONDecodeError as e:
+            yield numero, None, f"JSON inválido: {e.msg}"
+            continue
+        if not isinstance(registro, dict):
+            yield numero, None, "Cada linha deve ser um objeto JSON"
+            continue
+        yield numero, registro, None
+
+async def iter_registros_csv(linhas: AsyncIterator[str]) -> AsyncIterator[Registro]:
+    """
+    CSV com cabeçalho na primeira linha. Um registro pode ocupar várias linhas
+    (campo entre aspas com quebra de linha): as linhas são acumuladas até o
+    número de aspas ficar par. A paridade é atualizada a cada linha, sem
+    recontar o registro inteiro.
+    """
+    cabecalho: Optional[List[str]] = None
+    pendente: List[str] = []
+    aspas_abertas = False
+    numero = 0
+    inicio = 0
+    async for linha in linhas:
+        numero += 1
+        if not pendente:
+            inicio = numero
+        pendente.append(linha)
+        if linha.count('"') % 2:
+            aspas_abertas = not aspas_abertas
+        if aspas_abertas:
+            continue
+        
+        texto = "\n".join(pendente)
+        pendente = []
+        if not texto.strip():
+            continue
+        
+        valores = next(csv.reader([texto]))
+        if cabecalho is None:
+            cabecalho = [coluna.strip() for coluna in valores]
+            continue
+        if len(valores) > len(cabecalho):
+            yield inicio, None, "Linha com mais colunas que o cabeçalho"
+            continue
+        yield inicio, _limpar(dict(zip(cabecalho, valores))), None
+    
+    if pendente:
+        yield inicio, None, "Aspas não fechadas no fim do arquivo"
+
+def iter_registros(linhas: AsyncIterator[str], formato: str) -> AsyncIterator[Registro]:
+    """Seleciona o leitor do formato informado"""
+    if formato == "csv":
+        return iter_registros_csv(linhas)
+    return iter_registros_ndjson(linhas)
+
+async def iter_lotes(registros: AsyncIterator[Registro], tamanho: int = IMPORT_CHUNK_SIZE) -> AsyncIterator[List[Registro]]:
+    """Agrupa os registros em lotes de `tamanho`"""
+    lote: List[Registro] = []
+    async for registro in registros:
+        lote.append(registro)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
@@ -0,0 +1,238 @@
+# instrumentacao.py
+# Instrumentação por requisição: contagem e tempo de SQL, consultas lentas,
+# detecção de N+1, orçamento de consultas por rota e fases do Server-Timing
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+logger = logging.getLogger("escola.sql")
+
+# Comandos acima deste tempo (ms) são registrados no log com os parâmetros
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "100"))
+# Um mesmo SELECT (normalizado) repetido mais que isso na requisição é N+1
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "10"))
+# "1" adiciona X-DB-Queries / X-DB-Time-Ms / X-DB-Repeated às respostas
+SQL_STATS_HEADER = os.getenv("SQL_STATS_HEADER", "0") == "1"
+# Orçamento de consultas por rota (desenvolvimento e testes):
+#   off   -> não verifica (padrão)
+#   warn  -> registra no log as requisições acima do orçamento ou com N+1
+#   raise -> levanta OrcamentoConsultasExcedido antes do comando excedente
+SQL_QUERY_BUDGET = os.getenv("SQL_QUERY_BUDGET", "off")
+# Orçamento das rotas sem @orcamento_consultas (0 = sem limite)
+SQL_QUERY_BUDGET_DEFAULT = int(os.getenv("SQL_QUERY_BUDGET_DEFAULT", "0"))
+# "0" desliga o header Server-Timing (auth, db, app, ser e total)
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+
+if SQL_QUERY_BUDGET not in ("off", "warn", "raise"):
+    raise ValueError(f"SQL_QUERY_BUDGET inválido: {SQL_QUERY_BUDGET}. Opções: off, warn, raise")
+
+_LITERAIS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ESPACOS = re.compile(r"\s+")
+
+class OrcamentoConsultasExcedido(RuntimeError):
+    """Rota executou mais SQL que o orçamento (apenas com SQL_QUERY_BUDGET=raise)"""
+
+def normalizar(statement: str) -> str:
+    """Forma canônica do comando: literais e listas de IN viram '?'"""
+    sql = _LITERAIS.sub("?", statement)
+    sql = _LISTAS.sub("(?)", sql)
+    return _ESPACOS.sub(" ", sql).strip()
+
+def orcamento_consultas(maximo: Optional[int] = None, n_mais_um: bool = True):
+    """
+    Define o orçamento de SQL de uma rota. Use abaixo do @app.get/...:
+    `maximo` é o número de comandos por requisição (None = padrão) e
+    `n_mais_um=False` desliga a detecção de N+1 (ex.: rotas que processam
+    em lotes e repetem o mesmo comando de propósito).
+    """
+    def decorator(func):
+        func._orcamento_consultas = (maximo, n_mais_um)
+        return func
+    return decorator
+
+class EstatisticasRequisicao:
+    """Acumulador de SQL e das fases da requisição atual (via contextvar)"""
+    __slots__ = ("consultas", "tempo_sql", "repeticoes", "scope", "inicio", "fases", "fim_handler")
+    
+    def __init__(self, scope: Optional[dict] = None):
+        self.consultas = 0
+        self.tempo_sql = 0.0
+        self.repeticoes = Counter()
+        # O roteador preenche scope["route"]/["endpoint"] depois do middleware
+        self.scope = scope or {}
+        self.inicio = time.perf_counter()
+        self.fases = {}  # fase -> [duração, tempo de SQL dentro da fase]
+        self.fim_handler = None
+    
+    def orcamento(self):
+        """(maximo, n_mais_um) da rota atual"""
+        maximo, n_mais_um = getattr(self.scope.get("endpoint"), "_orcamento_consultas", (None, True))
+        if maximo is None:
+            maximo = SQL_QUERY_BUDGET_DEFAULT or None
+        return maximo, n_mais_um
+    
+    def rota(self) -> str:
+        return getattr(self.scope.get("route"), "path", None) or "unmatched"
+    
+    def n_mais_um(self) -> dict:
+        """SELECTs repetidos acima do limite: {comando normalizado: vezes}"""
+        return {
+            sql: vezes for sql, vezes in self.repeticoes.items()
+            if vezes > SQL_N_PLUS_ONE_THRESHOLD
+        }
+    
+    def tempos(self, fim: Optional[float] = None) -> dict:
+        """
+        Decomposição do tempo (s) até `fim` (padrão: agora):
+          auth  -> get_current_user (JWT, cache e busca do usuário)
+          db    -> SQL fora da autenticação
+          ser   -> serialização: dentro da rota (listagens) e do retorno da
+                   rota até o início da resposta (response_model + JSON)
+          app   -> o restante (rota, dependências e framework)
+        """
+        fim = fim or time.perf_counter()
+        total = fim - self.inicio
+        auth, sql_auth = self.fases.get("auth", (0.0, 0.0))
+        ser, sql_ser = self.fases.get("ser", (0.0, 0.0))
+        if self.fim_handler is not None:
+            ser += fim - self.fim_handler
+        db = self.tempo_sql - sql_auth - sql_ser
+        return {
+            "auth": auth,
+            "db": db,
+            "app": max(0.0, total - auth - db - ser),
+            "ser": ser,
+            "total": total,
+        }
+    
+    def server_timing(self, fim: Optional[float] = None) -> bytes:
+        """Valor do header Server-Timing (durações em ms)"""
+        return ", ".join(
+            f"{fase};dur={valor * 1000:.2f}" for fase, valor in self.tempos(fim).items()
+        ).encode()
+    
+    def cabecalhos(self) -> list:
+        """Cabeçalhos opcionais com as contagens (SQL_STATS_HEADER=1)"""
+        repetidas = max(self.repeticoes.values(), default=0)
+        return [
+            (b"x-db-queries", str(self.consultas).encode()),
+            (b"x-db-time-ms", f"{self.tempo_sql * 1000:.2f}".encode()),
+            (b"x-db-repeated", str(repetidas).encode()),
+        ]
+
+requisicao_atual: contextvars.ContextVar[Optional[EstatisticasRequisicao]] = contextvars.ContextVar(
+    "requisicao_atual", default=None
+)
+
+@contextmanager
+def medir_fase(fase: str):
+    """Acumula a duração do bloco (e o SQL executado nele) na fase da requisição"""
+    estatisticas = requisicao_atual.get()
+    if estatisticas is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    sql_inicio = estatisticas.tempo_sql
+    try:
+        yield
+    finally:
+        acumulado = estatisticas.fases.setdefault(fase, [0.0, 0.0])
+        acumulado[0] += time.perf_counter() - inicio
+        acumulado[1] += estatisticas.tempo_sql - sql_inicio
+
+class RotaCronometrada(APIRoute):
+    """
+    APIRoute que marca quando a função da rota retorna; o que vem depois
+    (validação do response_model e JSON) conta como serialização.
+    """
+    
+    def __init__(self, path: str, endpoint, **kwargs):
+        @functools.wraps(endpoint)
+        async def endpoint_cronometrado(*args, **kw):
+            try:
+                return await endpoint(*args, **kw)
+            finally:
+                estatisticas = requisicao_atual.get()
+                if estatisticas is not None:
+                    estatisticas.fim_handler = time.perf_counter()
+        
+        # Rotas síncronas rodam no threadpool; ficam sem a marca
+        alvo = endpoint_cronometrado if asyncio.iscoroutinefunction(endpoint) else endpoint
+        super().__init__(path, alvo, **kwargs)
+
+# SQL executado fora de requisições (tarefas periódicas, buffer de logins...)
+fora_de_requisicao = EstatisticasRequisicao()
+
+def _verificar_orcamento(estatisticas: EstatisticasRequisicao, normalizado: str):
+    maximo, n_mais_um = estatisticas.orcamento()
+    if maximo is not None and estatisticas.consultas > maximo:
+        raise OrcamentoConsultasExcedido(
+            f"{estatisticas.rota()} executou {estatisticas.consultas} comandos SQL "
+            f"(orçamento: {maximo}): {normalizado[:200]}"
+        )
+    vezes = estatisticas.repeticoes.get(normalizado, 0)
+    if n_mais_um and vezes > SQL_N_PLUS_ONE_THRESHOLD:
+        raise OrcamentoConsultasExcedido(
+            f"N+1 em {estatisticas.rota()}: comando repetido {vezes} vezes: {normalizado[:200]}"
+        )
+
+def _antes_sql(conn, cursor, statement, parameters, context, executemany):
+    estatisticas = requisicao_atual.get()
+    if estatisticas is None:
+        fora_de_requisicao.consultas += 1
+    else:
+        estatisticas.consultas += 1
+        if statement.lstrip()[:6].upper() == "SELECT":
+            normalizado = normalizar(statement)
+            estatisticas.repeticoes[normalizado] += 1
+        else:
+            normalizado = statement
+        if SQL_QUERY_BUDGET == "raise":
+            _verificar_orcamento(estatisticas, normalizado)
+    context._inicio_sql = time.perf_counter()
+
+def _depois_sql(conn, cursor, statement, parameters, context, executemany):
+    duracao = time.perf_counter() - getattr(context, "_inicio_sql", time.perf_counter())
+    estatisticas = requisicao_atual.get()
+    (estatisticas or fora_de_requisicao).tempo_sql += duracao
+    
+    if duracao * 1000 >= SQL_SLOW_QUERY_MS:
+        logger.warning(
+            "Consulta lenta (%.1f ms) em %s: %s | parâmetros: %.500r",
+            duracao * 1000,
+            estatisticas.rota() if estatisticas else "background",
+            _ESPACOS.sub(" ", statement).strip(),
+            parameters,
+        )
+
+def instrument_engine(engine):
+    """Registra os listeners de instrumentação no engine (síncrono)"""
+    event.listen(engine, "before_cursor_execute", _antes_sql)
+    event.listen(engine, "after_cursor_execute", _depois_sql)
+
+def finalizar_requisicao(estatisticas: EstatisticasRequisicao) -> dict:
+    """
+    Registra no log os N+1 e, no modo warn, o estouro do orçamento da
+    requisição que terminou. Retorna os comandos repetidos.
+    """
+    maximo, n_mais_um = estatisticas.orcamento()
+    repetidas = estatisticas.n_mais_um() if n_mais_um else {}
+    for sql, vezes in repetidas.items():
+        logger.warning("Possível N+1 em %s: comando repetido %d vezes: %s", estatisticas.rota(), vezes, sql)
+    if SQL_QUERY_BUDGET == "warn" and maximo is not None and estatisticas.consultas > maximo:
+        logger.warning(
+            "%s executou %d comandos SQL (orçamento: %d)",
+            estatisticas.rota(), estatisticas.consultas, maximo
+        )
+    return repetidas
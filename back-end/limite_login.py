@@ -0,0 +1,280 @@
+# limite_login.py
+# Limite de tentativas de login (antes do bcrypt) por IP, por email + IP e por email
+import asyncio
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from cache import TTLCache
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Backend: "memoria" (por processo) ou "sqlite" (compartilhado entre workers)
+LOGIN_RATE_LIMIT_BACKEND = os.getenv("LOGIN_RATE_LIMIT_BACKEND", "memoria")
+LOGIN_RATE_LIMIT_DB = os.getenv("LOGIN_RATE_LIMIT_DB", os.path.join(BASE_DIR, "limites_login.db"))
+LOGIN_RATE_LIMIT_MAX_CHAVES = int(os.getenv("LOGIN_RATE_LIMIT_MAX_CHAVES", "100000"))
+
+# Token bucket: rajada máxima (capacidade) e reposição por minuto
+LOGIN_RATE_IP_CAPACIDADE = float(os.getenv("LOGIN_RATE_IP_CAPACIDADE", "20"))
+LOGIN_RATE_IP_POR_MINUTO = float(os.getenv("LOGIN_RATE_IP_POR_MINUTO", "10"))
+LOGIN_RATE_EMAIL_CAPACIDADE = float(os.getenv("LOGIN_RATE_EMAIL_CAPACIDADE", "5"))
+LOGIN_RATE_EMAIL_POR_MINUTO = float(os.getenv("LOGIN_RATE_EMAIL_POR_MINUTO", "5"))
+# Total por email, somando todos os IPs: limita ataques a uma conta
+# espalhados por muitos endereços
+LOGIN_RATE_EMAIL_TOTAL_CAPACIDADE = float(os.getenv("LOGIN_RATE_EMAIL_TOTAL_CAPACIDADE", "20"))
+LOGIN_RATE_EMAIL_TOTAL_POR_MINUTO = float(os.getenv("LOGIN_RATE_EMAIL_TOTAL_POR_MINUTO", "10"))
+
+# Bloqueio exponencial: a partir de N falhas seguidas a chave fica bloqueada
+# por BASE * 2^(falhas - N) segundos, até LOGIN_LOCKOUT_MAX. N é maior para
+# o IP, que pode ser compartilhado (rede da escola, NAT). As falhas são
+# esquecidas após LOGIN_LOCKOUT_JANELA segundos sem novas falhas.
+# O bloqueio do total por email também trava o dono da conta, por isso
+# exige mais falhas e dura no máximo LOGIN_LOCKOUT_EMAIL_TOTAL_MAX.
+LOGIN_LOCKOUT_FALHAS_EMAIL = int(os.getenv("LOGIN_LOCKOUT_FALHAS_EMAIL", "5"))
+LOGIN_LOCKOUT_FALHAS_IP = int(os.getenv("LOGIN_LOCKOUT_FALHAS_IP", "20"))
+LOGIN_LOCKOUT_FALHAS_EMAIL_TOTAL = int(os.getenv("LOGIN_LOCKOUT_FALHAS_EMAIL_TOTAL", "10"))
+LOGIN_LOCKOUT_BASE = float(os.getenv("LOGIN_LOCKOUT_BASE", "30"))
+LOGIN_LOCKOUT_MAX = float(os.getenv("LOGIN_LOCKOUT_MAX", "3600"))
+LOGIN_LOCKOUT_EMAIL_TOTAL_MAX = float(os.getenv("LOGIN_LOCKOUT_EMAIL_TOTAL_MAX", "300"))
+LOGIN_LOCKOUT_JANELA = float(os.getenv("LOGIN_LOCKOUT_JANELA", "900"))
+
+# Proxies reversos confiáveis (separados por vírgula; "*" = qualquer). Só
+# quando a conexão vem de um deles o X-Forwarded-For é usado para achar o IP
+# do cliente; vazio = header ignorado, porque o cliente poderia forjá-lo.
+FORWARDED_ALLOW_IPS = {ip.strip() for ip in os.getenv("FORWARDED_ALLOW_IPS", "").split(",") if ip.strip()}
+
+def _confiavel(ip: str) -> bool:
+    return "*" in FORWARDED_ALLOW_IPS or ip in FORWARDED_ALLOW_IPS
+
+def ip_cliente(peer: Optional[str], x_forwarded_for: Optional[str]) -> Optional[str]:
+    """
+    IP do cliente: o da conexão ou, atrás de um proxy confiável, o último
+    endereço não confiável do X-Forwarded-For (os anteriores vêm do
+    cliente e podem ser forjados).
+    """
+    if not peer or not x_forwarded_for or not _confiavel(peer):
+        return peer
+    enderecos = [endereco.strip() for endereco in x_forwarded_for.split(",") if endereco.strip()]
+    for endereco in reversed(enderecos):
+        if not _confiavel(endereco):
+            return endereco
+    return enderecos[0] if enderecos else peer
+
+class Regra(NamedTuple):
+    capacidade: float
+    por_segundo: float
+    falhas_bloqueio: int
+    bloqueio_max: Optional[float] = None  # None = LOGIN_LOCKOUT_MAX
+
+# Tipo da chave (prefixo antes de ":") -> regra
+REGRAS = {
+    "ip": Regra(LOGIN_RATE_IP_CAPACIDADE, LOGIN_RATE_IP_POR_MINUTO / 60, LOGIN_LOCKOUT_FALHAS_IP),
+    "email_ip": Regra(LOGIN_RATE_EMAIL_CAPACIDADE, LOGIN_RATE_EMAIL_POR_MINUTO / 60, LOGIN_LOCKOUT_FALHAS_EMAIL),
+    "email": Regra(LOGIN_RATE_EMAIL_TOTAL_CAPACIDADE, LOGIN_RATE_EMAIL_TOTAL_POR_MINUTO / 60,
+                   LOGIN_LOCKOUT_FALHAS_EMAIL_TOTAL, LOGIN_LOCKOUT_EMAIL_TOTAL_MAX),
+}
+
+def _estado_inicial(regra: Regra, agora: float) -> dict:
+    return {"tokens": regra.capacidade, "atualizado": agora,
+            "falhas": 0, "ultima_falha": 0.0, "bloqueado_ate": 0.0}
+
+def _repor(estado: dict, regra: Regra, agora: float):
+    """Repõe os tokens do intervalo e esquece falhas antigas"""
+    decorrido = max(0.0, agora - estado["atualizado"])
+    estado["tokens"] = min(regra.capacidade, estado["tokens"] + decorrido * regra.por_segundo)
+    estado["atualizado"] = agora
+    if estado["falhas"] and agora - estado["ultima_falha"] > LOGIN_LOCKOUT_JANELA:
+        estado["falhas"] = 0
+
+def _tipo(chave: str) -> str:
+    return chave.split(":", 1)[0]
+
+class BackendMemoria:
+    """Estado em memória do processo (cada worker tem seus próprios limites)"""
+    
+    def __init__(self, maxsize: int = LOGIN_RATE_LIMIT_MAX_CHAVES):
+        self._estados = TTLCache(maxsize=maxsize, ttl=max(LOGIN_LOCKOUT_MAX, LOGIN_LOCKOUT_JANELA))
+    
+    async def transacao(self, chaves: List[str], funcao: Callable):
+        # Sem await entre a leitura e a escrita: atômico no event loop
+        estados = {chave: self._estados.get(chave) for chave in chaves}
+        resultado = funcao(estados)
+        for chave, estado in estados.items():
+            if estado is not None:
+                self._estados.set(chave, estado)
+        return resultado
+
+class BackendSQLite:
+    """
+    Estado em um arquivo SQLite próprio, compartilhado pelos workers. Cada
+    operação roda em BEGIN IMMEDIATE, em uma thread, para não bloquear o
+    event loop nem disputar o lock de escrita do banco principal.
+    """
+    
+    def __init__(self, path: str = LOGIN_RATE_LIMIT_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+    
+    def _conexao(self) -> sqlite3.Connection:
+        """
+        Conexão do processo atual, aberta sob demanda: com preload (start.py
+        em modo produção) o módulo é importado antes do fork e cada worker
+        precisa da sua própria conexão.
+        """
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS limites_login ("
+                "chave TEXT PRIMARY KEY, estado TEXT NOT NULL, expira REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_limites_login_expira ON limites_login (expira)")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+    
+    def _executar(self, chaves: List[str], funcao: Callable):
+        with self._lock:
+            conn = self._conexao()
+            agora = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                estados = {}
+                for chave in chaves:
+                    row = conn.execute(
+                        "SELECT estado FROM limites_login WHERE chave = ? AND expira > ?",
+                        (chave, agora)
+                    ).fetchone()
+                    estados[chave] = json.loads(row[0]) if row else None
+                
+                resultado = funcao(estados)
+                
+                expira = agora + max(LOGIN_LOCKOUT_MAX, LOGIN_LOCKOUT_JANELA)
+                for chave, estado in estados.items():
+                    if estado is not None:
+                        conn.execute(
+                            "INSERT INTO limites_login (chave, estado, expira) VALUES (?, ?, ?) "
+                            "ON CONFLICT(chave) DO UPDATE SET estado = excluded.estado, expira = excluded.expira",
+                            (chave, json.dumps(estado), expira)
+                        )
+                # Limpeza incremental das chaves expiradas
+                conn.execute(
+                    "DELETE FROM limites_login WHERE rowid IN "
+                    "(SELECT rowid FROM limites_login WHERE expira <= ? LIMIT 100)", (agora,)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return resultado
+    
+    async def transacao(self, chaves: List[str], funcao: Callable):
+        return await asyncio.to_thread(self._executar, chaves, funcao)
+
+class LimitadorLogin:
+    """
+    Limita as tentativas de login com token bucket e aplica bloqueio
+    exponencial após falhas seguidas. Deve ser consultado antes de qualquer
+    acesso ao banco ou verificação de senha.
+    
+    Três chaves por tentativa: o IP, o email + IP (errar a senha de alguém
+    bloqueia só quem errou, não o dono da conta em outro endereço) e o
+    email sozinho, com limites mais altos e bloqueio curto, que ainda
+    limita o total de tentativas contra uma conta vindas de muitos IPs.
+    """
+    
+    def __init__(self, backend, regras: Dict[str, Regra] = REGRAS):
+        self.backend = backend
+        self.regras = regras
+    
+    @staticmethod
+    def chaves(ip: Optional[str], email: Optional[str]) -> List[str]:
+        chaves = []
+        if ip:
+            chaves.append(f"ip:{ip}")
+        if email:
+            email = email.strip().lower()
+            if ip:
+                chaves.append(f"email_ip:{email}|{ip}")
+            chaves.append(f"email:{email}")
+        return chaves
+    
+    async def consumir(self, ip: Optional[str], email: Optional[str]) -> Optional[float]:
+        """
+        Registra uma tentativa. Retorna None se permitida ou os segundos até
+        a próxima tentativa possível (Retry-After) se deve ser rejeitada.
+        """
+        def aplicar(estados: dict) -> Optional[float]:
+            agora = time.time()
+            espera = 0.0
+            for chave in estados:
+                regra = self.regras[_tipo(chave)]
+                estado = estados[chave] or _estado_inicial(regra, agora)
+                estados[chave] = estado
+                _repor(estado, regra, agora)
+                if estado["bloqueado_ate"] > agora:
+                    espera = max(espera, estado["bloqueado_ate"] - agora)
+                elif estado["tokens"] < 1:
+                    espera = max(espera, (1 - estado["tokens"]) / regra.por_segundo)
+            if espera:
+                return espera
+            for estado in estados.values():
+                estado["tokens"] -= 1
+            return None
+        
+        return await self.backend.transacao(self.chaves(ip, email), aplicar)
+    
+    async def registrar_falha(self, ip: Optional[str], email: Optional[str]):
+        """Conta uma falha de senha e, se preciso, bloqueia as chaves"""
+        def aplicar(estados: dict):
+            agora = time.time()
+            for chave in estados:
+                regra = self.regras[_tipo(chave)]
+                estado = estados[chave] or _estado_inicial(regra, agora)
+                estados[chave] = estado
+                _repor(estado, regra, agora)
+                estado["falhas"] += 1
+                estado["ultima_falha"] = agora
+                excesso = estado["falhas"] - regra.falhas_bloqueio
+                if excesso >= 0:
+                    maximo = LOGIN_LOCKOUT_MAX if regra.bloqueio_max is None else regra.bloqueio_max
+                    estado["bloqueado_ate"] = agora + min(
+                        maximo, LOGIN_LOCKOUT_BASE * 2 ** min(excesso, 32)
+                    )
+        
+        await self.backend.transacao(self.chaves(ip, email), aplicar)
+    
+    async def registrar_sucesso(self, ip: Optional[str], email: Optional[str]):
+        """
+        Zera as falhas do email (neste IP e no total) após um login correto.
+        As falhas do IP são mantidas: um atacante com conta válida não
+        consegue zerar o IP.
+        """
+        def aplicar(estados: dict):
+            for estado in estados.values():
+                if estado is not None:
+                    estado["falhas"] = 0
+                    estado["bloqueado_ate"] = 0.0
+        
+        chaves = [chave for chave in self.chaves(ip, email) if _tipo(chave) != "ip"]
+        await self.backend.transacao(chaves, aplicar)
+
+def create_backend(nome: str = LOGIN_RATE_LIMIT_BACKEND):
+    if nome == "memoria":
+        return BackendMemoria()
+    if nome == "sqlite":
+        return BackendSQLite()
+    raise ValueError(f"LOGIN_RATE_LIMIT_BACKEND inválido: {nome}. Opções: memoria, sqlite")
+
+limitador_login = LimitadorLogin(create_backend())
+
+def retry_after(segundos: float) -> str:
+    """Valor do header Retry-After (inteiro, arredondado para cima)"""
+    return str(max(1, math.ceil(segundos)))
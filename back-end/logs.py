@@ -0,0 +1,56 @@
+# logs.py
+# Logs estruturados (uma linha JSON por evento) dos loggers "escola.*"
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+
+import orjson
+
+# LOG_FORMAT: "json" (padrão, para o pipeline de logs) ou "texto"
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "0" desliga o log de acesso (uma linha por requisição com os tempos)
+ACCESS_LOG = os.getenv("ACCESS_LOG", "1") == "1"
+
+class JsonFormatter(logging.Formatter):
+    """Formata o registro como JSON; campos extras vêm de extra={"campos": {...}}"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        evento = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensagem": record.getMessage(),
+        }
+        evento.update(getattr(record, "campos", {}))
+        if record.exc_info:
+            evento["excecao"] = self.formatException(record.exc_info)
+        return orjson.dumps(evento, default=str).decode()
+
+class TextoFormatter(logging.Formatter):
+    """Formato legível para desenvolvimento, com os campos extras no fim"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        linha = super().format(record)
+        campos = getattr(record, "campos", None)
+        if campos:
+            linha += " " + " ".join(f"{chave}={valor}" for chave, valor in campos.items())
+        return linha
+
+def configurar_logs():
+    """Configura o logger raiz "escola" (idempotente)"""
+    logger = logging.getLogger("escola")
+    if getattr(logger, "_configurado", False):
+        return logger
+    
+    handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(TextoFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+    logger._configurado = True
+    return logger
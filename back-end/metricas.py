@@ -0,0 +1,299 @@
+# metricas.py
+# Métricas em processo no formato texto do Prometheus (GET /metrics)
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from instrumentacao import (
+    EstatisticasRequisicao, requisicao_atual, fora_de_requisicao,
+    finalizar_requisicao, SQL_STATS_HEADER, SERVER_TIMING
+)
+from logs import ACCESS_LOG
+
+access_logger = logging.getLogger("escola.acesso")
+
+# Intervalo (s) da medição do atraso do event loop
+EVENT_LOOP_LAG_INTERVAL = float(os.getenv("EVENT_LOOP_LAG_INTERVAL", "0.5"))
+
+# Buckets padrão do Prometheus (segundos) e de contagem de consultas
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+def _escape(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(nomes: Tuple[str, ...], valores: Tuple, extra: str = "") -> str:
+    pares = [f'{nome}="{_escape(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+def _numero(valor: float) -> str:
+    if valor == math.inf:
+        return "+Inf"
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+class _Metrica:
+    tipo = ""
+    
+    def __init__(self, nome: str, ajuda: str, labels: Tuple[str, ...] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.labels = labels
+        self._lock = threading.Lock()
+        registro.append(self)
+    
+    def _cabecalho(self) -> list:
+        return [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+
+class Counter(_Metrica):
+    """Valor acumulado; com `funcao`, é lido no momento da coleta"""
+    tipo = "counter"
+    
+    def __init__(self, *args, funcao: Optional[Callable[[], float]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.funcao = funcao
+        self._valores: Dict[Tuple, float] = {}
+    
+    def inc(self, *labels, valor: float = 1.0):
+        with self._lock:
+            self._valores[labels] = self._valores.get(labels, 0.0) + valor
+    
+    def render(self) -> list:
+        linhas = self._cabecalho()
+        if self.funcao is not None:
+            linhas.append(f"{self.nome} {_numero(self.funcao())}")
+            return linhas
+        with self._lock:
+            for labels, valor in sorted(self._valores.items()):
+                linhas.append(f"{self.nome}{_labels(self.labels, labels)} {_numero(valor)}")
+        return linhas
+
+class Gauge(_Metrica):
+    """Valor instantâneo; com `funcao`, é lido no momento da coleta"""
+    tipo = "gauge"
+    
+    def __init__(self, *args, funcao: Optional[Callable[[], float]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.funcao = funcao
+        self._valores: Dict[Tuple, float] = {}
+    
+    def set(self, *labels, valor: float):
+        with self._lock:
+            self._valores[labels] = valor
+    
+    def inc(self, *labels, valor: float = 1.0):
+        with self._lock:
+            self._valores[labels] = self._valores.get(labels, 0.0) + valor
+    
+    def dec(self, *labels, valor: float = 1.0):
+        self.inc(*labels, valor=-valor)
+    
+    def render(self) -> list:
+        linhas = self._cabecalho()
+        if self.funcao is not None:
+            try:
+                linhas.append(f"{self.nome} {_numero(self.funcao())}")
+            except Exception:
+                pass  # fonte indisponível (ex.: engine ainda não criado)
+            return linhas
+        with self._lock:
+            for labels, valor in sorted(self._valores.items()):
+                linhas.append(f"{self.nome}{_labels(self.labels, labels)} {_numero(valor)}")
+        return linhas
+
+class Histogram(_Metrica):
+    tipo = "histogram"
+    
+    def __init__(self, *args, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets) + (math.inf,)
+        self._series: Dict[Tuple, list] = {}  # labels -> [contagens..., soma, total]
+    
+    def observe(self, *labels, valor: float):
+        with self._lock:
+            serie = self._series.get(labels)
+            if serie is None:
+                serie = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[i] += 1
+                    break
+            serie[-2] += valor
+            serie[-1] += 1
+    
+    def render(self) -> list:
+        linhas = self._cabecalho()
+        with self._lock:
+            for labels, serie in sorted(self._series.items()):
+                acumulado = 0
+                for i, limite in enumerate(self.buckets):
+                    acumulado += serie[i]
+                    extra = f'le="{_numero(limite)}"'
+                    linhas.append(f"{self.nome}_bucket{_labels(self.labels, labels, extra)} {acumulado}")
+                linhas.append(f"{self.nome}_sum{_labels(self.labels, labels)} {_numero(serie[-2])}")
+                linhas.append(f"{self.nome}_count{_labels(self.labels, labels)} {serie[-1]}")
+        return linhas
+
+registro = []
+
+def render_metrics() -> str:
+    """Todas as métricas no formato texto do Prometheus (versão 0.0.4)"""
+    linhas = []
+    for metrica in registro:
+        linhas.extend(metrica.render())
+    return "\n".join(linhas) + "\n"
+
+# ================================
+# MÉTRICAS DA API
+# ================================
+
+http_requests = Counter(
+    "http_requests_total", "Requisições HTTP por método, rota e status",
+    ("method", "route", "status")
+)
+http_latency = Histogram(
+    "http_request_duration_seconds", "Duração das requisições HTTP (até o fim do corpo)",
+    ("method", "route", "status")
+)
+http_in_flight = Gauge("http_requests_in_flight", "Requisições HTTP em andamento")
+
+db_statements = Counter("db_statements_total", "Comandos SQL executados", ("route",))
+db_time = Counter("db_statement_seconds_total", "Tempo gasto em comandos SQL", ("route",))
+db_background_statements = Counter(
+    "db_background_statements_total", "Comandos SQL executados fora de requisições",
+    funcao=lambda: fora_de_requisicao.consultas
+)
+db_background_time = Counter(
+    "db_background_statement_seconds_total", "Tempo em SQL fora de requisições",
+    funcao=lambda: fora_de_requisicao.tempo_sql
+)
+db_n_plus_one = Counter(
+    "db_n_plus_one_total", "Requisições com o mesmo SELECT repetido acima do limite", ("route",)
+)
+db_statements_per_request = Histogram(
+    "db_statements_per_request", "Comandos SQL por requisição", ("method", "route"),
+    buckets=COUNT_BUCKETS
+)
+db_time_per_request = Histogram(
+    "db_time_per_request_seconds", "Tempo em SQL por requisição", ("method", "route")
+)
+db_pool_wait = Histogram(
+    "db_pool_checkout_wait_seconds", "Espera para obter uma conexão do pool",
+    labels=("pool",),
+    buckets=(0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+)
+
+event_loop_lag = Gauge("event_loop_lag_seconds", "Último atraso medido do event loop")
+event_loop_lag_histogram = Histogram(
+    "event_loop_lag_distribution_seconds", "Distribuição do atraso do event loop",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+# ================================
+# POOL DE CONEXÕES
+# ================================
+
+class MonitoredAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Pool do engine assíncrono que mede a espera por conexão"""
+    rotulo = "escrita"
+    
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_wait.observe(self.rotulo, valor=time.perf_counter() - inicio)
+
+class MonitoredReadAsyncQueuePool(MonitoredAsyncQueuePool):
+    """Pool do engine somente leitura (rotas GET)"""
+    rotulo = "leitura"
+
+# ================================
+# MIDDLEWARE E TAREFAS
+# ================================
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: conta requisições, mede a latência até o fim do corpo
+    da resposta e o SQL executado, rotulando pela rota (template) e status.
+    Também emite o header Server-Timing e o log de acesso estruturado.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        estatisticas = EstatisticasRequisicao(scope)
+        token = requisicao_atual.set(estatisticas)
+        status_code = 500
+        inicio = estatisticas.inicio
+        inicio_resposta = None
+        
+        async def send_wrapper(message):
+            nonlocal status_code, inicio_resposta
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                inicio_resposta = time.perf_counter()
+                extras = []
+                if SERVER_TIMING:
+                    extras.append((b"server-timing", estatisticas.server_timing(inicio_resposta)))
+                if SQL_STATS_HEADER:
+                    extras.extend(estatisticas.cabecalhos())
+                if extras:
+                    message["headers"] = list(message.get("headers", [])) + extras
+            await send(message)
+        
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duracao = time.perf_counter() - inicio
+            http_in_flight.dec()
+            requisicao_atual.reset(token)
+            
+            rota = estatisticas.rota()
+            metodo = scope.get("method", "")
+            http_requests.inc(metodo, rota, str(status_code))
+            http_latency.observe(metodo, rota, str(status_code), valor=duracao)
+            db_statements.inc(rota, valor=estatisticas.consultas)
+            db_time.inc(rota, valor=estatisticas.tempo_sql)
+            db_statements_per_request.observe(metodo, rota, valor=estatisticas.consultas)
+            db_time_per_request.observe(metodo, rota, valor=estatisticas.tempo_sql)
+            if finalizar_requisicao(estatisticas):
+                db_n_plus_one.inc(rota)
+            if ACCESS_LOG:
+                _log_acesso(estatisticas, metodo, rota, status_code, duracao, inicio_resposta)
+
+def _log_acesso(estatisticas, metodo: str, rota: str, status_code: int, duracao: float, inicio_resposta):
+    """Uma linha por requisição com os mesmos tempos do Server-Timing"""
+    campos = {
+        "metodo": metodo,
+        "rota": rota,
+        "caminho": estatisticas.scope.get("path"),
+        "status": status_code,
+        "duracao_ms": round(duracao * 1000, 2),
+        "consultas": estatisticas.consultas,
+    }
+    for fase, valor in estatisticas.tempos(inicio_resposta).items():
+        campos[f"{fase}_ms"] = round(valor * 1000, 2)
+    access_logger.info("%s %s %d", metodo, campos["caminho"], status_code, extra={"campos": campos})
+
+async def monitor_event_loop_lag(intervalo: float = EVENT_LOOP_LAG_INTERVAL):
+    """Mede quanto o event loop atrasa para acordar de um sleep"""
+    while True:
+        inicio = time.perf_counter()
+        await asyncio.sleep(intervalo)
+        atraso = max(0.0, time.perf_counter() - inicio - intervalo)
+        event_loop_lag.set(valor=atraso)
+        event_loop_lag_histogram.observe(valor=atraso)
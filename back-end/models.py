@@ -1,6 +1,6 @@
 # models.py
 # Definição dos modelos ORM para SQLAlchemy
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, Enum, DateTime, Boolean, Text
+from sqlalchemy import Column, Integer, BigInteger, String, Date, ForeignKey, Enum, DateTime, Boolean, Text, Index, text
 from sqlalchemy.orm import relationship, declarative_base
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -30,6 +30,11 @@ class Usuario(Base):
     data_criacao = Column(DateTime, default=func.now(), nullable=False)
     ultimo_acesso = Column(DateTime, nullable=True)
     
+    __table_args__ = (
+        # Índice parcial: apenas usuários ativos (contagem do dashboard)
+        Index("ix_usuarios_ativos", "id", sqlite_where=text("ativo = 1"), postgresql_where=text("ativo")),
+    )
+    
     def __repr__(self):
         return f"<Usuario(id={self.id}, nome='{self.nome}', email='{self.email}', cargo='{self.cargo.value}')>"
 
@@ -48,6 +53,11 @@ class Turma(Base):
     # Relacionamento com alunos
     alunos = relationship("Aluno", back_populates="turma", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        # Índice parcial: apenas turmas ativas (listagem e dashboard)
+        Index("ix_turmas_ativas", "id", sqlite_where=text("ativa = 1"), postgresql_where=text("ativa")),
+    )
+    
     def __repr__(self):
         return f"<Turma(id={self.id}, nome='{self.nome}', capacidade={self.capacidade})>"
 
@@ -74,6 +84,13 @@ class Aluno(Base):
     turma_id = Column(Integer, ForeignKey("turmas.id"), nullable=True)
     turma = relationship("Turma", back_populates="alunos")
     
+    __table_args__ = (
+        # Capacidade da turma e filtro por turma: (turma_id, status)
+        Index("ix_alunos_turma_status", "turma_id", "status"),
+        # Filtro por status já na ordem da listagem (nome, id)
+        Index("ix_alunos_status_nome", "status", "nome"),
+    )
+    
     def __repr__(self):
         return f"<Aluno(id={self.id}, nome='{self.nome}', status='{self.status.value}')>"
 
@@ -81,14 +98,74 @@ class HistoricoLogin(Base):
     __tablename__ = "historico_login"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
+    # Sem FOREIGN KEY: tentativas falhadas usam usuario_id=0, que não existe
+    # em usuarios (bancos que sempre validam FKs, como o PostgreSQL, recusariam)
+    usuario_id = Column(Integer, nullable=False)
     data_login = Column(DateTime, default=func.now(), nullable=False)
     ip_address = Column(String(45), nullable=True)
     user_agent = Column(Text, nullable=True)
     sucesso = Column(Boolean, nullable=False)
     
     # Relacionamento
-    usuario = relationship("Usuario")
+    usuario = relationship("Usuario", primaryjoin="foreign(HistoricoLogin.usuario_id) == Usuario.id")
+    
+    __table_args__ = (
+        Index("ix_historico_login_usuario_data", "usuario_id", "data_login"),
+        # Recorte por data da rotina de retenção (retencao.py)
+        Index("ix_historico_login_data", "data_login"),
+    )
     
     def __repr__(self):
         return f"<HistoricoLogin(usuario_id={self.usuario_id}, data='{self.data_login}', sucesso={self.sucesso})>"
+
+
+class ResumoLoginUsuario(Base):
+    __tablename__ = "resumo_login_usuario"
+    
+    dia = Column(Date, primary_key=True)
+    usuario_id = Column(Integer, primary_key=True)  # 0 = tentativas falhadas
+    sucessos = Column(Integer, nullable=False, default=0)
+    falhas = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<ResumoLoginUsuario(dia='{self.dia}', usuario_id={self.usuario_id}, sucessos={self.sucessos})>"
+
+class ResumoLoginIp(Base):
+    __tablename__ = "resumo_login_ip"
+    
+    dia = Column(Date, primary_key=True)
+    ip_address = Column(String(45), primary_key=True)  # "" quando desconhecido
+    sucessos = Column(Integer, nullable=False, default=0)
+    falhas = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<ResumoLoginIp(dia='{self.dia}', ip_address='{self.ip_address}', falhas={self.falhas})>"
+
+
+class EstatisticaContador(Base):
+    __tablename__ = "estatisticas"
+    
+    chave = Column(String(50), primary_key=True)
+    valor = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<EstatisticaContador(chave='{self.chave}', valor={self.valor})>"
+
+class EstatisticaTurma(Base):
+    __tablename__ = "estatisticas_turma"
+    
+    turma_id = Column(Integer, ForeignKey("turmas.id"), primary_key=True)
+    total_alunos = Column(Integer, nullable=False, default=0)
+    alunos_ativos = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<EstatisticaTurma(turma_id={self.turma_id}, total_alunos={self.total_alunos})>"
+
+class VersaoTabela(Base):
+    __tablename__ = "versoes_tabela"
+    
+    tabela = Column(String(50), primary_key=True)
+    versao = Column(BigInteger, nullable=False)  # começa em ms desde a época
+    
+    def __repr__(self):
+        return f"<VersaoTabela(tabela='{self.tabela}', versao={self.versao})>"
\ No newline at end of file
@@ -0,0 +1,172 @@
+# retencao.py
+# Retenção do historico_login: resumos diários e arquivamento em lotes
+#
+# Executar manualmente: python retencao.py
+import asyncio
+import os
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import (
+    MetaData, Table, Column, Integer, String, DateTime, Boolean, Text,
+    select, delete, insert, func, case, text
+)
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from models import HistoricoLogin, ResumoLoginUsuario, ResumoLoginIp
+from dialetos import upsert_insert, dialect_name
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Dias de histórico bruto mantidos no banco principal
+HISTORICO_RETENCAO_DIAS = int(os.getenv("HISTORICO_RETENCAO_DIAS", "90"))
+# Arquivo SQLite separado que recebe as linhas antigas. HISTORICO_ARQUIVO_URL
+# (URL assíncrona, ex.: postgresql+asyncpg://.../escola_arquivo) permite usar
+# outro banco; precisa ser um banco diferente do principal (mesma tabela)
+HISTORICO_ARQUIVO_PATH = os.getenv(
+    "HISTORICO_ARQUIVO_PATH", os.path.join(BASE_DIR, "escola_arquivo.db")
+)
+HISTORICO_ARQUIVO_URL = os.getenv("HISTORICO_ARQUIVO_URL")
+# Linhas por transação e pausa (s) entre lotes, para liberar o lock de escrita
+HISTORICO_RETENCAO_LOTE = int(os.getenv("HISTORICO_RETENCAO_LOTE", "1000"))
+HISTORICO_RETENCAO_PAUSA = float(os.getenv("HISTORICO_RETENCAO_PAUSA", "0.05"))
+# Intervalo (s) da execução periódica na API; 0 desativa
+HISTORICO_RETENCAO_INTERVALO = float(os.getenv("HISTORICO_RETENCAO_INTERVALO", "86400"))
+
+# Tabela do arquivo: mesmas colunas do historico_login, sem chave estrangeira
+arquivo_metadata = MetaData()
+historico_arquivo = Table(
+    "historico_login", arquivo_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("usuario_id", Integer, nullable=False),
+    Column("data_login", DateTime, nullable=False, index=True),
+    Column("ip_address", String(45)),
+    Column("user_agent", Text),
+    Column("sucesso", Boolean, nullable=False),
+)
+
+def create_arquivo_engine(path: str = HISTORICO_ARQUIVO_PATH):
+    """Engine assíncrono do banco de arquivo"""
+    if HISTORICO_ARQUIVO_URL and path == HISTORICO_ARQUIVO_PATH:
+        return create_async_engine(HISTORICO_ARQUIVO_URL, pool_pre_ping=True)
+    return create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+async def resumir_dias(db: AsyncSession, ate: date) -> int:
+    """
+    Recalcula os resumos diários (por usuário e por IP) dos dias completos
+    ainda presentes no histórico bruto, de onde o último resumo parou até o
+    dia anterior a `ate`. O último dia resumido é refeito, pois o buffer de
+    logins pode ter gravado linhas dele depois da execução anterior.
+    """
+    # Primeiro dia com linhas brutas a partir do último resumo; dias já
+    # arquivados por inteiro mantêm o resumo que têm
+    consulta = select(func.min(HistoricoLogin.data_login))
+    ultimo = await db.scalar(select(func.max(ResumoLoginUsuario.dia)))
+    if ultimo is not None:
+        consulta = consulta.where(
+            HistoricoLogin.data_login >= datetime.combine(ultimo, datetime.min.time())
+        )
+    inicio = await db.scalar(consulta)
+    if inicio is None:
+        return 0
+    inicio = inicio.date()
+    if inicio >= ate:
+        return 0
+    
+    desde = datetime.combine(inicio, datetime.min.time())
+    limite = datetime.combine(ate, datetime.min.time())
+    periodo = (
+        HistoricoLogin.data_login >= desde,
+        HistoricoLogin.data_login < limite,
+    )
+    dia = func.date(HistoricoLogin.data_login)
+    sucessos = func.sum(case((HistoricoLogin.sucesso == True, 1), else_=0))
+    falhas = func.sum(case((HistoricoLogin.sucesso == True, 0), else_=1))
+    ip = func.coalesce(HistoricoLogin.ip_address, "")
+    
+    await db.execute(delete(ResumoLoginUsuario).where(ResumoLoginUsuario.dia >= inicio))
+    await db.execute(insert(ResumoLoginUsuario).from_select(
+        ["dia", "usuario_id", "sucessos", "falhas"],
+        select(dia, HistoricoLogin.usuario_id, sucessos, falhas)
+        .where(*periodo).group_by(dia, HistoricoLogin.usuario_id)
+    ))
+    await db.execute(delete(ResumoLoginIp).where(ResumoLoginIp.dia >= inicio))
+    await db.execute(insert(ResumoLoginIp).from_select(
+        ["dia", "ip_address", "sucessos", "falhas"],
+        select(dia, ip, sucessos, falhas).where(*periodo).group_by(dia, ip)
+    ))
+    await db.commit()
+    return (ate - inicio).days
+
+async def arquivar_historico(db: AsyncSession, arquivo_engine, antes_de: datetime,
+                             lote: int = HISTORICO_RETENCAO_LOTE,
+                             pausa: float = HISTORICO_RETENCAO_PAUSA) -> int:
+    """
+    Copia para o banco de arquivo e remove do principal as linhas anteriores
+    a `antes_de`, um lote por transação. A cópia ignora ids já arquivados,
+    então uma execução interrompida pode ser repetida sem duplicar linhas.
+    """
+    async with arquivo_engine.begin() as conn:
+        await conn.run_sync(arquivo_metadata.create_all)
+    
+    colunas = [c.name for c in historico_arquivo.columns]
+    total = 0
+    while True:
+        linhas = (await db.execute(
+            select(*[getattr(HistoricoLogin, c) for c in colunas])
+            .where(HistoricoLogin.data_login < antes_de)
+            .order_by(HistoricoLogin.data_login)
+            .limit(lote)
+        )).all()
+        if not linhas:
+            break
+        
+        async with arquivo_engine.begin() as conn:
+            await conn.execute(
+                upsert_insert(conn, historico_arquivo).on_conflict_do_nothing(),
+                [dict(zip(colunas, linha)) for linha in linhas]
+            )
+        
+        await db.execute(delete(HistoricoLogin).where(
+            HistoricoLogin.id.in_([linha.id for linha in linhas])
+        ))
+        await db.commit()
+        total += len(linhas)
+        
+        if len(linhas) < lote:
+            break
+        await asyncio.sleep(pausa)
+    
+    # SQLite com auto_vacuum=INCREMENTAL devolve as páginas liberadas ao
+    # sistema; caso contrário elas ficam livres e são reaproveitadas (no
+    # PostgreSQL o autovacuum cuida disso)
+    if total and dialect_name(db) == "sqlite" and (await db.scalar(text("PRAGMA auto_vacuum"))) == 2:
+        await db.execute(text("PRAGMA incremental_vacuum"))
+    return total
+
+async def executar_retencao(db: AsyncSession, arquivo_engine,
+                            dias: int = HISTORICO_RETENCAO_DIAS) -> dict:
+    """Resume os dias completos e arquiva o histórico fora da janela"""
+    hoje = datetime.utcnow().date()
+    # Pelo menos o dia anterior fica no banco: ele é refeito no próximo resumo
+    corte = hoje - timedelta(days=max(dias, 1))
+    dias_resumidos = await resumir_dias(db, hoje)
+    arquivadas = await arquivar_historico(
+        db, arquivo_engine, datetime.combine(corte, datetime.min.time())
+    )
+    return {"dias_resumidos": dias_resumidos, "linhas_arquivadas": arquivadas, "corte": corte.isoformat()}
+
+async def main():
+    from database import AsyncSessionLocal, async_engine, init_database
+    
+    init_database()
+    arquivo_engine = create_arquivo_engine()
+    try:
+        async with AsyncSessionLocal() as db:
+            resultado = await executar_retencao(db, arquivo_engine)
+    finally:
+        await arquivo_engine.dispose()
+        await async_engine.dispose()
+    print(f"✅ Retenção concluída: {resultado}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -197,6 +197,15 @@ class StatisticsResponse(BaseModel):
     alunos_por_turma: List[dict]
     usuarios_ativos: int
 
+class ImportacaoErro(BaseModel):
+    linha: int
+    erros: List[str]
+
+class ImportacaoResponse(BaseModel):
+    total_linhas: int
+    importados: int
+    erros: List[ImportacaoErro]
+
 # Schemas para listas com paginação
 class PaginatedResponse(BaseModel):
     items: List
@@ -0,0 +1,176 @@
+# search.py
+# Índice de busca textual de alunos (SQLite FTS5; trigramas no PostgreSQL)
+from sqlalchemy import text, literal_column
+from sqlalchemy.sql import table, column
+from sqlalchemy.engine import Engine
+from typing import Optional
+from contextlib import contextmanager
+import re
+
+from dialetos import dialect_name
+
+FTS_TABLE = "alunos_fts"
+
+# Tabela FTS5 com uma linha por aluno (rowid = alunos.id). O CPF é indexado
+# apenas com os dígitos para que "12345678901" e "123.456.789-01" encontrem
+# o mesmo aluno. remove_diacritics faz "joao" encontrar "João".
+_CPF_DIGITS = "replace(replace({}.cpf, '.', ''), '-', '')"
+
+_CREATE_STATEMENTS = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        nome, email, cpf, nome_responsavel, observacoes,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS alunos_fts_insert AFTER INSERT ON alunos BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, nome, email, cpf, nome_responsavel, observacoes)
+        VALUES (new.id, new.nome, new.email, {_CPF_DIGITS.format('new')},
+                new.nome_responsavel, new.observacoes);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS alunos_fts_delete AFTER DELETE ON alunos BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS alunos_fts_update
+    AFTER UPDATE OF nome, email, cpf, nome_responsavel, observacoes ON alunos BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE}(rowid, nome, email, cpf, nome_responsavel, observacoes)
+        VALUES (new.id, new.nome, new.email, {_CPF_DIGITS.format('new')},
+                new.nome_responsavel, new.observacoes);
+    END
+    """,
+]
+
+_REBUILD_STATEMENTS = [
+    f"DELETE FROM {FTS_TABLE}",
+    f"""
+    INSERT INTO {FTS_TABLE}(rowid, nome, email, cpf, nome_responsavel, observacoes)
+    SELECT id, nome, email, {_CPF_DIGITS.format('alunos')}, nome_responsavel, observacoes
+    FROM alunos
+    """,
+]
+
+_TRIGGERS = ["alunos_fts_insert", "alunos_fts_delete", "alunos_fts_update"]
+
+_INDEX_NEW_STATEMENT = f"""
+    INSERT INTO {FTS_TABLE}(rowid, nome, email, cpf, nome_responsavel, observacoes)
+    SELECT id, nome, email, {_CPF_DIGITS.format('alunos')}, nome_responsavel, observacoes
+    FROM alunos WHERE id > :after_id
+"""
+
+# Representação leve da tabela FTS para montar consultas com SQLAlchemy
+alunos_fts = table(FTS_TABLE, column("rowid"), column("rank"))
+
+# Indica se o SQLite em uso tem FTS5; sem ele a busca cai no LIKE
+fts_enabled = False
+
+# PostgreSQL: a busca usa ILIKE '%termo%', acelerado por índices GIN de
+# trigramas (extensão pg_trgm) em nome e email
+_TRIGRAM_STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_alunos_nome_trgm ON alunos USING gin (nome gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_alunos_email_trgm ON alunos USING gin (email gin_trgm_ops)",
+]
+
+def fts_ativo(bind) -> bool:
+    """Se a busca deve usar o FTS5 na conexão/sessão `bind`"""
+    return fts_enabled and dialect_name(bind) == "sqlite"
+
+def ensure_trigram_index(engine: Engine) -> bool:
+    """Cria os índices de trigramas da busca no PostgreSQL, se possível"""
+    try:
+        with engine.begin() as conn:
+            for statement in _TRIGRAM_STATEMENTS:
+                conn.execute(text(statement))
+    except Exception as e:
+        print(f"⚠️ pg_trgm indisponível, busca de alunos usará ILIKE sem índice: {str(e).splitlines()[0]}")
+        return False
+    return True
+
+def ensure_search_index(engine: Engine) -> bool:
+    """
+    Cria a tabela FTS5 e os triggers de sincronização, se ainda não existirem.
+    Na primeira criação o índice é populado com os alunos já cadastrados.
+    Em outros bancos não há FTS5 (retorna False); no PostgreSQL são criados
+    os índices de trigramas usados pelo ILIKE.
+    """
+    global fts_enabled
+    
+    if engine.dialect.name == "postgresql":
+        ensure_trigram_index(engine)
+    if engine.dialect.name != "sqlite":
+        return False
+    
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE}
+        ).first() is not None
+        
+        try:
+            for statement in _CREATE_STATEMENTS:
+                conn.execute(text(statement))
+        except Exception as e:
+            print(f"⚠️ FTS5 indisponível, busca de alunos usará LIKE: {e}")
+            fts_enabled = False
+            return fts_enabled
+        
+        if not exists:
+            for statement in _REBUILD_STATEMENTS:
+                conn.execute(text(statement))
+    
+    fts_enabled = True
+    return fts_enabled
+
+def rebuild_search_index(engine: Engine):
+    """Reconstrói o índice de busca a partir da tabela alunos"""
+    with engine.begin() as conn:
+        for statement in _REBUILD_STATEMENTS:
+            conn.execute(text(statement))
+
+@contextmanager
+def bulk_load(conn, after_id: int):
+    """
+    Carga em massa de alunos (gerador.py): remove os triggers do FTS durante
+    os inserts e, ao final, indexa de uma vez os alunos com id > `after_id`.
+    Roda na transação de `conn`; escritas concorrentes nesse intervalo não
+    seriam indexadas, então use apenas com a API parada.
+    
+    Os merges automáticos de segmentos ficam desligados durante a indexação
+    e um único 'optimize' no fim junta tudo (~20% mais rápido em 1M alunos).
+    """
+    if not fts_ativo(conn):
+        yield
+        return
+    
+    for trigger in _TRIGGERS:
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    yield
+    for statement in _CREATE_STATEMENTS[1:]:
+        conn.execute(text(statement))
+    conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('automerge', 0)"))
+    conn.execute(text(_INDEX_NEW_STATEMENT), {"after_id": after_id})
+    conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"))
+    # Valor padrão do FTS5: a configuração fica gravada na tabela
+    conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('automerge', 4)"))
+
+def build_match_query(search: str) -> Optional[str]:
+    """
+    Converte o texto digitado em uma expressão MATCH do FTS5: cada termo vira
+    um prefixo entre aspas ("ana"* "silv"*), todos obrigatórios. Pontos e
+    traços entre dígitos são removidos para casar CPFs formatados.
+    """
+    normalized = re.sub(r"(?<=\d)[.\-](?=\d)", "", search)
+    terms = re.findall(r"\w+", normalized)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+def match(query: str):
+    """Expressão `alunos_fts MATCH :query` para uso em where()"""
+    return literal_column(FTS_TABLE).op("MATCH")(query)
@@ -0,0 +1,42 @@
+# serializacao.py
+# Serialização das listagens: linhas projetadas do banco direto para JSON
+import os
+from functools import lru_cache
+from typing import List, Optional
+
+import orjson
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from instrumentacao import medir_fase
+
+# As listagens retornam dicionários montados a partir de colunas do banco
+# (ver *_COLUNAS em services.py), que já respeitam os schemas de resposta.
+# Por padrão vão direto para o orjson, sem passar pelo Pydantic. Com
+# VALIDATE_RESPONSES=1 (desenvolvimento/testes) cada payload é validado uma
+# única vez pelo TypeAdapter do schema antes de ser serializado.
+VALIDATE_RESPONSES = os.getenv("VALIDATE_RESPONSES", "0") == "1"
+
+@lru_cache(maxsize=None)
+def list_adapter(schema) -> TypeAdapter:
+    """TypeAdapter de list[schema], construído uma vez por schema"""
+    return TypeAdapter(List[schema])
+
+def serializar_lista(linhas: list, schema, validar: bool = VALIDATE_RESPONSES) -> bytes:
+    """Serializa as linhas em JSON, validando com o schema se `validar`"""
+    with medir_fase("ser"):
+        if validar:
+            adapter = list_adapter(schema)
+            return adapter.dump_json(adapter.validate_python(linhas))
+        return orjson.dumps(linhas)
+
+def json_list_response(linhas: list, schema, response: Optional[Response] = None) -> Response:
+    """
+    Resposta JSON de uma listagem, sem a validação do response_model do
+    FastAPI (o response_model da rota continua valendo para a documentação).
+    Os headers definidos em `response` (ETag, cursores) são mantidos.
+    """
+    resposta = Response(content=serializar_lista(linhas, schema), media_type="application/json")
+    if response is not None:
+        resposta.headers.raw.extend(response.headers.raw)
+    return resposta
@@ -1,23 +1,50 @@
 # services.py
 # Lógica de negócio e operações de banco de dados
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, desc, asc, func
-from models import Usuario, Aluno, Turma, HistoricoLogin, StatusAlunoEnum, CargoEnum
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, insert, or_, and_, desc, asc, func, tuple_
+from models import (
+    Usuario, Aluno, Turma, HistoricoLogin, StatusAlunoEnum, CargoEnum,
+    EstatisticaContador, EstatisticaTurma
+)
 from schemas import (
     UsuarioCreate, UsuarioUpdate, AlunoCreate, AlunoUpdate, 
-    TurmaCreate, TurmaUpdate, AlunoResponse, TurmaResponse
+    TurmaCreate, TurmaUpdate
+)
+from auth import get_password_hash_async, invalidate_cached_user
+import search as search_index
+from estatisticas import (
+    CONTADORES, contar, contar_por_turma, registrar_insercoes, solicitar_reconciliacao
 )
-from auth import get_password_hash
+from versoes import registrar_alteracao
+from pydantic import ValidationError
 from typing import List, Optional, Tuple
 from datetime import date, datetime
 from fastapi import HTTPException, status
 
+# Colunas projetadas nas listagens, na ordem dos schemas de resposta. As
+# listagens não carregam objetos ORM (nem colunas como senha_hash) e seus
+# dicionários vão direto para o JSON (ver serializacao.py).
+USUARIO_COLUNAS = (
+    Usuario.nome, Usuario.email, Usuario.cargo, Usuario.id, Usuario.ativo,
+    Usuario.data_criacao, Usuario.ultimo_acesso
+)
+TURMA_COLUNAS = (
+    Turma.nome, Turma.descricao, Turma.capacidade, Turma.ano_letivo, Turma.periodo,
+    Turma.id, Turma.ativa, Turma.data_criacao
+)
+ALUNO_COLUNAS = (
+    Aluno.nome, Aluno.cpf, Aluno.rg, Aluno.data_nascimento, Aluno.email,
+    Aluno.telefone, Aluno.endereco, Aluno.nome_responsavel, Aluno.telefone_responsavel,
+    Aluno.status, Aluno.data_matricula, Aluno.observacoes, Aluno.turma_id, Aluno.id,
+    Aluno.data_criacao, Aluno.data_atualizacao, Turma.nome.label("turma_nome")
+)
+
 class UsuarioService:
     @staticmethod
-    def create_user(db: Session, user_data: UsuarioCreate) -> Usuario:
+    async def create_user(db: AsyncSession, user_data: UsuarioCreate) -> Usuario:
         """Cria um novo usuário"""
         # Verificar se email já existe
-        existing_user = db.query(Usuario).filter(Usuario.email == user_data.email).first()
+        existing_user = await db.scalar(select(Usuario).where(Usuario.email == user_data.email))
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -28,64 +55,91 @@ class UsuarioService:
         db_user = Usuario(
             nome=user_data.nome,
             email=user_data.email,
-            senha_hash=get_password_hash(user_data.senha),
+            senha_hash=await get_password_hash_async(user_data.senha),
             cargo=user_data.cargo,
             ativo=True
         )
         
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
         return db_user
     
     @staticmethod
-    def get_user_by_id(db: Session, user_id: int) -> Optional[Usuario]:
+    async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[Usuario]:
         """Busca usuário por ID"""
-        return db.query(Usuario).filter(Usuario.id == user_id).first()
+        return await db.get(Usuario, user_id)
     
     @staticmethod
-    def get_user_by_email(db: Session, email: str) -> Optional[Usuario]:
+    async def get_user_by_email(db: AsyncSession, email: str) -> Optional[Usuario]:
         """Busca usuário por email"""
-        return db.query(Usuario).filter(Usuario.email == email).first()
+        return await db.scalar(select(Usuario).where(Usuario.email == email))
     
     @staticmethod
-    def get_users(db: Session, skip: int = 0, limit: int = 100) -> Tuple[List[Usuario], int]:
-        """Lista usuários com paginação"""
-        total = db.query(Usuario).count()
-        users = db.query(Usuario).offset(skip).limit(limit).all()
-        return users, total
+    async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100) -> Tuple[List[dict], int]:
+        """
+        Lista usuários com paginação, projetando só as colunas de
+        UsuarioResponse (sem senha_hash) em dicionários prontos para JSON
+        """
+        total = await db.scalar(select(func.count()).select_from(Usuario))
+        result = await db.execute(select(*USUARIO_COLUNAS).order_by(Usuario.id).offset(skip).limit(limit))
+        return [dict(row) for row in result.mappings()], total
     
     @staticmethod
-    def update_user(db: Session, user_id: int, user_data: UsuarioUpdate) -> Usuario:
+    async def update_user(db: AsyncSession, user_id: int, user_data: UsuarioUpdate) -> Usuario:
         """Atualiza usuário"""
-        db_user = db.query(Usuario).filter(Usuario.id == user_id).first()
+        db_user = await db.get(Usuario, user_id)
         if not db_user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Usuário não encontrado"
             )
         
-        for field, value in user_data.dict(exclude_unset=True).items():
+        update_data = user_data.dict(exclude_unset=True)
+        for field, value in update_data.items():
             setattr(db_user, field, value)
         
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
+        
+        # Cargo/status fazem parte do snapshot de autenticação em cache
+        if 'cargo' in update_data or 'ativo' in update_data:
+            invalidate_cached_user(user_id)
         return db_user
     
     @staticmethod
-    def update_last_access(db: Session, user_id: int):
-        """Atualiza último acesso do usuário"""
-        db.query(Usuario).filter(Usuario.id == user_id).update({
-            "ultimo_acesso": datetime.utcnow()
-        })
-        db.commit()
+    async def update_last_access(db: AsyncSession, user_id: int):
+        """
+        Atualiza último acesso do usuário. Não incrementa a versão de
+        "usuarios": o ultimo_acesso fica fora das ETags (ver versoes.py).
+        """
+        await db.execute(
+            update(Usuario).where(Usuario.id == user_id).values(ultimo_acesso=datetime.utcnow())
+        )
+        await db.commit()
+    
+    @staticmethod
+    async def registrar_acessos(db: AsyncSession, historicos: List[dict], ultimos_acessos: dict):
+        """
+        Grava em lote as tentativas de login e os últimos acessos acumulados
+        pelo buffer_acessos, em uma única transação. Como em
+        update_last_access, a versão de "usuarios" não muda.
+        """
+        if historicos:
+            await db.execute(insert(HistoricoLogin), historicos)
+        if ultimos_acessos:
+            await db.execute(update(Usuario), [
+                {"id": usuario_id, "ultimo_acesso": data}
+                for usuario_id, data in ultimos_acessos.items()
+            ])
+        await db.commit()
 
 class TurmaService:
     @staticmethod
-    def create_turma(db: Session, turma_data: TurmaCreate) -> Turma:
+    async def create_turma(db: AsyncSession, turma_data: TurmaCreate) -> Turma:
         """Cria nova turma"""
         # Verificar se nome já existe
-        existing_turma = db.query(Turma).filter(Turma.nome == turma_data.nome).first()
+        existing_turma = await db.scalar(select(Turma).where(Turma.nome == turma_data.nome))
         if existing_turma:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -94,57 +148,56 @@ class TurmaService:
         
         db_turma = Turma(**turma_data.dict())
         db.add(db_turma)
-        db.commit()
-        db.refresh(db_turma)
+        await db.commit()
+        await db.refresh(db_turma)
         return db_turma
     
     @staticmethod
-    def get_turma_by_id(db: Session, turma_id: int) -> Optional[Turma]:
+    async def get_turma_by_id(db: AsyncSession, turma_id: int) -> Optional[Turma]:
         """Busca turma por ID"""
-        return db.query(Turma).filter(Turma.id == turma_id).first()
+        return await db.get(Turma, turma_id)
     
     @staticmethod
-    def get_turmas(db: Session, skip: int = 0, limit: int = 100, ativas_apenas: bool = True) -> Tuple[List[Turma], int]:
+    async def get_turmas(db: AsyncSession, skip: int = 0, limit: int = 100, ativas_apenas: bool = True) -> Tuple[List[Turma], int]:
         """Lista turmas com paginação"""
-        query = db.query(Turma)
+        query = select(Turma)
         if ativas_apenas:
-            query = query.filter(Turma.ativa == True)
+            query = query.where(Turma.ativa == True)
         
-        total = query.count()
-        turmas = query.order_by(Turma.nome).offset(skip).limit(limit).all()
-        return turmas, total
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
+        turmas = (await db.scalars(query.order_by(Turma.nome).offset(skip).limit(limit))).all()
+        return list(turmas), total
     
     @staticmethod
-    def get_turmas_with_stats(db: Session) -> List[TurmaResponse]:
-        """Lista turmas com estatísticas de alunos"""
-        turmas = db.query(Turma).filter(Turma.ativa == True).all()
-        result = []
-        
-        for turma in turmas:
-            total_alunos = db.query(Aluno).filter(
-                Aluno.turma_id == turma.id,
-                Aluno.status == StatusAlunoEnum.ativo
-            ).count()
-            
-            turma_response = TurmaResponse(
-                id=turma.id,
-                nome=turma.nome,
-                descricao=turma.descricao,
-                capacidade=turma.capacidade,
-                ano_letivo=turma.ano_letivo,
-                periodo=turma.periodo,
-                ativa=turma.ativa,
-                data_criacao=turma.data_criacao,
-                total_alunos=total_alunos
-            )
-            result.append(turma_response)
+    async def get_turmas_with_stats(
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        ativas_apenas: bool = True
+    ) -> List[dict]:
+        """
+        Lista turmas com estatísticas de alunos.
+        
+        Uma única consulta agregada: LEFT JOIN com os alunos ativos de cada
+        turma e GROUP BY turma, já com filtro e paginação aplicados. Retorna
+        dicionários com os campos de TurmaResponse.
+        """
+        total_alunos = func.count(Aluno.id).label('total_alunos')
+        query = select(*TURMA_COLUNAS, total_alunos).join(
+            Aluno,
+            and_(Aluno.turma_id == Turma.id, Aluno.status == StatusAlunoEnum.ativo),
+            isouter=True
+        )
+        if ativas_apenas:
+            query = query.where(Turma.ativa == True)
         
-        return result
+        result = await db.execute(query.group_by(Turma.id).order_by(Turma.id).offset(skip).limit(limit))
+        return [dict(row) for row in result.mappings()]
     
     @staticmethod
-    def update_turma(db: Session, turma_id: int, turma_data: TurmaUpdate) -> Turma:
+    async def update_turma(db: AsyncSession, turma_id: int, turma_data: TurmaUpdate) -> Turma:
         """Atualiza turma"""
-        db_turma = db.query(Turma).filter(Turma.id == turma_id).first()
+        db_turma = await db.get(Turma, turma_id)
         if not db_turma:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -154,14 +207,14 @@ class TurmaService:
         for field, value in turma_data.dict(exclude_unset=True).items():
             setattr(db_turma, field, value)
         
-        db.commit()
-        db.refresh(db_turma)
+        await db.commit()
+        await db.refresh(db_turma)
         return db_turma
     
     @staticmethod
-    def delete_turma(db: Session, turma_id: int) -> bool:
+    async def delete_turma(db: AsyncSession, turma_id: int) -> bool:
         """Desativa turma (soft delete)"""
-        db_turma = db.query(Turma).filter(Turma.id == turma_id).first()
+        db_turma = await db.get(Turma, turma_id)
         if not db_turma:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -169,10 +222,12 @@ class TurmaService:
             )
         
         # Verificar se há alunos na turma
-        alunos_count = db.query(Aluno).filter(
-            Aluno.turma_id == turma_id,
-            Aluno.status == StatusAlunoEnum.ativo
-        ).count()
+        alunos_count = await db.scalar(
+            select(func.count(Aluno.id)).where(
+                Aluno.turma_id == turma_id,
+                Aluno.status == StatusAlunoEnum.ativo
+            )
+        )
         
         if alunos_count > 0:
             raise HTTPException(
@@ -181,16 +236,16 @@ class TurmaService:
             )
         
         db_turma.ativa = False
-        db.commit()
+        await db.commit()
         return True
 
 class AlunoService:
     @staticmethod
-    def create_aluno(db: Session, aluno_data: AlunoCreate) -> Aluno:
+    async def create_aluno(db: AsyncSession, aluno_data: AlunoCreate) -> Aluno:
         """Cria novo aluno"""
         # Verificar se email já existe
         if aluno_data.email:
-            existing_aluno = db.query(Aluno).filter(Aluno.email == aluno_data.email).first()
+            existing_aluno = await db.scalar(select(Aluno).where(Aluno.email == aluno_data.email))
             if existing_aluno:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -199,7 +254,7 @@ class AlunoService:
         
         # Verificar se CPF já existe
         if aluno_data.cpf:
-            existing_cpf = db.query(Aluno).filter(Aluno.cpf == aluno_data.cpf).first()
+            existing_cpf = await db.scalar(select(Aluno).where(Aluno.cpf == aluno_data.cpf))
             if existing_cpf:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -208,17 +263,19 @@ class AlunoService:
         
         # Verificar se turma existe e tem capacidade
         if aluno_data.turma_id:
-            turma = db.query(Turma).filter(Turma.id == aluno_data.turma_id).first()
+            turma = await db.get(Turma, aluno_data.turma_id)
             if not turma:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Turma não encontrada"
                 )
             
-            alunos_na_turma = db.query(Aluno).filter(
-                Aluno.turma_id == aluno_data.turma_id,
-                Aluno.status == StatusAlunoEnum.ativo
-            ).count()
+            alunos_na_turma = await db.scalar(
+                select(func.count(Aluno.id)).where(
+                    Aluno.turma_id == aluno_data.turma_id,
+                    Aluno.status == StatusAlunoEnum.ativo
+                )
+            )
             
             if alunos_na_turma >= turma.capacidade:
                 raise HTTPException(
@@ -228,85 +285,232 @@ class AlunoService:
         
         db_aluno = Aluno(**aluno_data.dict())
         db.add(db_aluno)
-        db.commit()
-        db.refresh(db_aluno)
+        await db.commit()
+        await db.refresh(db_aluno)
         return db_aluno
     
     @staticmethod
-    def get_aluno_by_id(db: Session, aluno_id: int) -> Optional[Aluno]:
+    async def import_alunos_lote(db: AsyncSession, lote: List[tuple]) -> Tuple[int, List[dict]]:
+        """
+        Valida e grava um lote da importação em massa em uma transação.
+        
+        `lote` é uma lista de (linha, registro, erro_de_leitura). Cada registro
+        passa pelas regras do AlunoCreate; email/CPF duplicados, turma
+        inexistente e capacidade são verificados com uma consulta por lote
+        (IN/GROUP BY) e os válidos são inseridos com executemany.
+        Retorna (quantidade importada, erros por linha).
+        """
+        erros = []
+        validos = []
+        for linha, registro, erro in lote:
+            if erro:
+                erros.append({"linha": linha, "erros": [erro]})
+                continue
+            try:
+                validos.append((linha, AlunoCreate(**registro)))
+            except ValidationError as e:
+                erros.append({
+                    "linha": linha,
+                    "erros": [
+                        f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}"
+                        for err in e.errors()
+                    ]
+                })
+        
+        if not validos:
+            return 0, erros
+        
+        # Consultas do lote inteiro
+        emails = {aluno.email for _, aluno in validos if aluno.email}
+        cpfs = {aluno.cpf for _, aluno in validos if aluno.cpf}
+        turma_ids = {aluno.turma_id for _, aluno in validos if aluno.turma_id}
+        
+        emails_existentes = set((await db.scalars(
+            select(Aluno.email).where(Aluno.email.in_(emails))
+        )).all()) if emails else set()
+        cpfs_existentes = set((await db.scalars(
+            select(Aluno.cpf).where(Aluno.cpf.in_(cpfs))
+        )).all()) if cpfs else set()
+        
+        capacidades = {}
+        ocupacao = {}
+        if turma_ids:
+            capacidades = dict((await db.execute(
+                select(Turma.id, Turma.capacidade).where(Turma.id.in_(turma_ids))
+            )).all())
+            ocupacao = dict((await db.execute(
+                select(Aluno.turma_id, func.count(Aluno.id)).where(
+                    Aluno.turma_id.in_(turma_ids),
+                    Aluno.status == StatusAlunoEnum.ativo
+                ).group_by(Aluno.turma_id)
+            )).all())
+        
+        linhas_inserir = []
+        for linha, aluno in validos:
+            problemas = []
+            if aluno.email and aluno.email in emails_existentes:
+                problemas.append("Email já cadastrado para outro aluno")
+            if aluno.cpf and aluno.cpf in cpfs_existentes:
+                problemas.append("CPF já cadastrado para outro aluno")
+            if aluno.turma_id:
+                if aluno.turma_id not in capacidades:
+                    problemas.append("Turma não encontrada")
+                elif ocupacao.get(aluno.turma_id, 0) >= capacidades[aluno.turma_id]:
+                    problemas.append("Turma já atingiu capacidade máxima")
+            
+            if problemas:
+                erros.append({"linha": linha, "erros": problemas})
+                continue
+            
+            # Duplicados dentro do próprio arquivo também contam
+            if aluno.email:
+                emails_existentes.add(aluno.email)
+            if aluno.cpf:
+                cpfs_existentes.add(aluno.cpf)
+            if aluno.turma_id and aluno.status.value == StatusAlunoEnum.ativo.value:
+                ocupacao[aluno.turma_id] = ocupacao.get(aluno.turma_id, 0) + 1
+            linhas_inserir.append(aluno.dict())
+        
+        if linhas_inserir:
+            await db.execute(insert(Aluno), linhas_inserir)
+            await db.run_sync(registrar_insercoes, Aluno, linhas_inserir)
+            await db.run_sync(registrar_alteracao, "alunos")
+            await db.commit()
+        
+        erros.sort(key=lambda erro: erro["linha"])
+        return len(linhas_inserir), erros
+    
+    @staticmethod
+    async def get_aluno_by_id(db: AsyncSession, aluno_id: int) -> Optional[Aluno]:
         """Busca aluno por ID"""
-        return db.query(Aluno).filter(Aluno.id == aluno_id).first()
+        return await db.get(Aluno, aluno_id)
+    
+    @staticmethod
+    def _calcular_idade(data_nascimento: date, today: date) -> int:
+        """Idade em anos completos na data `today`"""
+        return today.year - data_nascimento.year - ((today.month, today.day) < (data_nascimento.month, data_nascimento.day))
+    
+    @staticmethod
+    def _aluno_rows(result) -> List[dict]:
+        """
+        Converte o resultado de uma consulta sobre ALUNO_COLUNAS em
+        dicionários de AlunoResponse, acrescentando a idade. Os valores vêm
+        do banco e não são validados de novo pelo Pydantic.
+        """
+        today = date.today()
+        rows = []
+        for row in result.mappings():
+            aluno = dict(row)
+            aluno["idade"] = AlunoService._calcular_idade(aluno["data_nascimento"], today)
+            rows.append(aluno)
+        return rows
     
     @staticmethod
-    def get_alunos(
-        db: Session, 
+    async def get_alunos(
+        db: AsyncSession, 
         skip: int = 0, 
         limit: int = 100,
         search: Optional[str] = None,
         turma_id: Optional[int] = None,
-        status: Optional[StatusAlunoEnum] = None
-    ) -> Tuple[List[Aluno], int]:
-        """Lista alunos com filtros e paginação"""
-        query = db.query(Aluno)
+        status: Optional[StatusAlunoEnum] = None,
+        after_id: Optional[int] = None,
+        after_nome: Optional[str] = None
+    ) -> List[dict]:
+        """
+        Lista alunos com filtros e paginação executados no banco, como
+        dicionários com os campos de AlunoResponse (ver _aluno_rows).
+        
+        A ordenação é (nome, id). Quando `after_id` é informado usa paginação
+        por chave (keyset): retorna os alunos posteriores a (after_nome, after_id),
+        sem OFFSET. Se `after_nome` não for informado, ele é obtido pelo id.
+        Sem cursor, cai no OFFSET tradicional com `skip`.
+        
+        Com `search`, a busca usa o índice FTS5 (prefixo em nome, email, CPF,
+        responsável e observações) e os resultados vêm ordenados por
+        relevância, paginados por `skip`. Sem FTS5 (ex.: PostgreSQL) a busca
+        é por ILIKE em nome e email.
+        """
+        query = select(*ALUNO_COLUNAS).join(Turma, Aluno.turma_id == Turma.id, isouter=True)
         
         # Filtros
-        if search:
-            query = query.filter(
+        match_query = search_index.build_match_query(search) if search else None
+        if search and match_query and search_index.fts_ativo(db):
+            fts = search_index.alunos_fts
+            query = query.join(fts, fts.c.rowid == Aluno.id).where(search_index.match(match_query))
+        elif search:
+            # Busca literal: %, _ e \ digitados não viram curingas
+            literal = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            pattern = f"%{literal}%"
+            query = query.where(
                 or_(
-                    Aluno.nome.contains(search),
-                    Aluno.email.contains(search) if search else False
+                    Aluno.nome.ilike(pattern, escape="\\"),
+                    Aluno.email.ilike(pattern, escape="\\")
                 )
             )
         
         if turma_id:
-            query = query.filter(Aluno.turma_id == turma_id)
+            query = query.where(Aluno.turma_id == turma_id)
         
         if status:
-            query = query.filter(Aluno.status == status)
-        
-        total = query.count()
-        alunos = query.order_by(Aluno.nome).offset(skip).limit(limit).all()
-        return alunos, total
+            query = query.where(Aluno.status == status)
+        
+        # Busca textual: ordenação por relevância e paginação por offset
+        if match_query and search_index.fts_ativo(db):
+            query = query.order_by(search_index.alunos_fts.c.rank, Aluno.id).offset(skip).limit(limit)
+            return AlunoService._aluno_rows(await db.execute(query))
+        
+        # Paginação por chave (nome, id) ou por offset
+        if after_id is not None:
+            if after_nome is None:
+                after_nome = select(Aluno.nome).where(Aluno.id == after_id).scalar_subquery()
+            query = query.where(tuple_(Aluno.nome, Aluno.id) > tuple_(after_nome, after_id))
+        elif skip:
+            query = query.offset(skip)
+        
+        return AlunoService._aluno_rows(await db.execute(query.order_by(Aluno.nome, Aluno.id).limit(limit)))
     
     @staticmethod
-    def get_alunos_with_turma(db: Session) -> List[AlunoResponse]:
-        """Lista alunos com informações da turma"""
-        alunos = db.query(Aluno).join(Turma, Aluno.turma_id == Turma.id, isouter=True).all()
-        result = []
+    async def stream_alunos(
+        db: AsyncSession,
+        turma_id: Optional[int] = None,
+        status: Optional[StatusAlunoEnum] = None,
+        yield_per: int = 1000
+    ):
+        """
+        Percorre os alunos com cursor no servidor (yield_per), entregando
+        tuplas com as colunas de exportacao.COLUNAS, sem montar objetos ORM.
+        """
+        query = select(
+            Aluno.id, Aluno.nome, Aluno.cpf, Aluno.rg, Aluno.data_nascimento,
+            Aluno.email, Aluno.telefone, Aluno.endereco, Aluno.nome_responsavel,
+            Aluno.telefone_responsavel, Aluno.status, Aluno.data_matricula,
+            Aluno.observacoes, Aluno.turma_id, Turma.nome, Aluno.data_criacao,
+            Aluno.data_atualizacao
+        ).join(Turma, Aluno.turma_id == Turma.id, isouter=True)
         
-        for aluno in alunos:
-            # Calcular idade
-            today = date.today()
-            idade = today.year - aluno.data_nascimento.year - ((today.month, today.day) < (aluno.data_nascimento.month, aluno.data_nascimento.day))
-            
-            aluno_response = AlunoResponse(
-                id=aluno.id,
-                nome=aluno.nome,
-                cpf=aluno.cpf,
-                rg=aluno.rg,
-                data_nascimento=aluno.data_nascimento,
-                email=aluno.email,
-                telefone=aluno.telefone,
-                endereco=aluno.endereco,
-                nome_responsavel=aluno.nome_responsavel,
-                telefone_responsavel=aluno.telefone_responsavel,
-                status=aluno.status,
-                data_matricula=aluno.data_matricula,
-                observacoes=aluno.observacoes,
-                turma_id=aluno.turma_id,
-                data_criacao=aluno.data_criacao,
-                data_atualizacao=aluno.data_atualizacao,
-                turma_nome=aluno.turma.nome if aluno.turma else None,
-                idade=idade
-            )
-            result.append(aluno_response)
+        if turma_id:
+            query = query.where(Aluno.turma_id == turma_id)
         
-        return result
+        if status:
+            query = query.where(Aluno.status == status)
+        
+        result = await db.stream(
+            query.order_by(Aluno.nome, Aluno.id).execution_options(yield_per=yield_per)
+        )
+        async for row in result:
+            yield tuple(row)
+    
+    @staticmethod
+    async def get_alunos_with_turma(db: AsyncSession) -> List[dict]:
+        """Lista alunos com informações da turma"""
+        return AlunoService._aluno_rows(await db.execute(
+            select(*ALUNO_COLUNAS).join(Turma, Aluno.turma_id == Turma.id, isouter=True)
+        ))
     
     @staticmethod
-    def update_aluno(db: Session, aluno_id: int, aluno_data: AlunoUpdate) -> Aluno:
+    async def update_aluno(db: AsyncSession, aluno_id: int, aluno_data: AlunoUpdate) -> Aluno:
         """Atualiza aluno"""
-        db_aluno = db.query(Aluno).filter(Aluno.id == aluno_id).first()
+        db_aluno = await db.get(Aluno, aluno_id)
         if not db_aluno:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -317,10 +521,12 @@ class AlunoService:
         update_data = aluno_data.dict(exclude_unset=True)
         
         if 'email' in update_data and update_data['email']:
-            existing_aluno = db.query(Aluno).filter(
-                Aluno.email == update_data['email'],
-                Aluno.id != aluno_id
-            ).first()
+            existing_aluno = await db.scalar(
+                select(Aluno).where(
+                    Aluno.email == update_data['email'],
+                    Aluno.id != aluno_id
+                )
+            )
             if existing_aluno:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -328,10 +534,12 @@ class AlunoService:
                 )
         
         if 'cpf' in update_data and update_data['cpf']:
-            existing_cpf = db.query(Aluno).filter(
-                Aluno.cpf == update_data['cpf'],
-                Aluno.id != aluno_id
-            ).first()
+            existing_cpf = await db.scalar(
+                select(Aluno).where(
+                    Aluno.cpf == update_data['cpf'],
+                    Aluno.id != aluno_id
+                )
+            )
             if existing_cpf:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -341,14 +549,14 @@ class AlunoService:
         for field, value in update_data.items():
             setattr(db_aluno, field, value)
         
-        db.commit()
-        db.refresh(db_aluno)
+        await db.commit()
+        await db.refresh(db_aluno)
         return db_aluno
     
     @staticmethod
-    def delete_aluno(db: Session, aluno_id: int) -> dict:
+    async def delete_aluno(db: AsyncSession, aluno_id: int) -> dict:
         """Inativa aluno (soft delete) ou exclui permanentemente se já inativo"""
-        db_aluno = db.query(Aluno).filter(Aluno.id == aluno_id).first()
+        db_aluno = await db.get(Aluno, aluno_id)
         if not db_aluno:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -357,38 +565,47 @@ class AlunoService:
         
         # Se o aluno já está inativo, exclui permanentemente
         if db_aluno.status == StatusAlunoEnum.inativo:
-            db.delete(db_aluno)
-            db.commit()
+            await db.delete(db_aluno)
+            await db.commit()
             return {"action": "deleted", "message": "Aluno excluído permanentemente"}
         
         # Se o aluno está ativo, apenas inativa (soft delete)
         db_aluno.status = StatusAlunoEnum.inativo
-        db.commit()
+        await db.commit()
         return {"action": "inactivated", "message": "Aluno inativado com sucesso"}
 
 class StatisticsService:
     @staticmethod
-    def get_dashboard_stats(db: Session) -> dict:
-        """Retorna estatísticas para o dashboard"""
-        # Contadores básicos
-        total_alunos = db.query(Aluno).count()
-        alunos_ativos = db.query(Aluno).filter(Aluno.status == StatusAlunoEnum.ativo).count()
-        alunos_inativos = total_alunos - alunos_ativos
-        
-        total_turmas = db.query(Turma).count()
-        turmas_ativas = db.query(Turma).filter(Turma.ativa == True).count()
-        
-        usuarios_ativos = db.query(Usuario).filter(Usuario.ativo == True).count()
+    async def get_dashboard_stats(db: AsyncSession) -> dict:
+        """
+        Retorna estatísticas para o dashboard.
+        
+        Lê os contadores mantidos de forma incremental (ver estatisticas.py)
+        em vez de recontar as tabelas a cada chamada. Se faltar algum
+        (banco novo, antes da reconciliação do startup), conta nas tabelas
+        de origem e pede a reconciliação à tarefa periódica: a rota só lê,
+        `db` pode ser uma sessão somente leitura.
+        """
+        contadores = dict((await db.execute(
+            select(EstatisticaContador.chave, EstatisticaContador.valor)
+        )).all())
+        por_turma = EstatisticaTurma.__table__
+        if any(chave not in contadores for chave in CONTADORES):
+            contadores = await db.run_sync(contar)
+            por_turma = contar_por_turma().subquery()
+            solicitar_reconciliacao()
         
         # Alunos por turma
-        alunos_por_turma = db.query(
-            Turma.nome,
-            func.count(Aluno.id).label('total')
-        ).join(
-            Aluno, Turma.id == Aluno.turma_id, isouter=True
-        ).filter(
-            Turma.ativa == True
-        ).group_by(Turma.id, Turma.nome).all()
+        alunos_por_turma = (await db.execute(
+            select(
+                Turma.nome,
+                func.coalesce(por_turma.c.total_alunos, 0)
+            ).join(
+                por_turma, por_turma.c.turma_id == Turma.id, isouter=True
+            ).where(
+                Turma.ativa == True
+            ).order_by(Turma.id)
+        )).all()
         
         alunos_por_turma_list = [
             {"turma": nome, "total": total}
@@ -396,11 +613,11 @@ class StatisticsService:
         ]
         
         return {
-            "total_alunos": total_alunos,
-            "alunos_ativos": alunos_ativos,
-            "alunos_inativos": alunos_inativos,
-            "total_turmas": total_turmas,
-            "turmas_ativas": turmas_ativas,
+            "total_alunos": contadores["total_alunos"],
+            "alunos_ativos": contadores["alunos_ativos"],
+            "alunos_inativos": contadores["total_alunos"] - contadores["alunos_ativos"],
+            "total_turmas": contadores["total_turmas"],
+            "turmas_ativas": contadores["turmas_ativas"],
             "alunos_por_turma": alunos_por_turma_list,
-            "usuarios_ativos": usuarios_ativos
-        }
+            "usuarios_ativos": contadores["usuarios_ativos"]
+        }
\ No newline at end of file
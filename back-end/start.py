@@ -1,10 +1,25 @@
 # start.py
 # Script para inicializar o sistema completo
+#
+#   python start.py                       -> desenvolvimento (1 processo, --reload)
+#   python start.py --modo producao       -> vários workers, sem reload
+#
+# O modo também pode vir de START_MODE. Em produção:
+#   WEB_CONCURRENCY   número de workers (padrão: número de CPUs)
+#   MAX_REQUESTS      reinicia cada worker após N requisições (0 = nunca)
+#   GRACEFUL_TIMEOUT  segundos para terminar as requisições em andamento no SIGTERM
+import argparse
 import subprocess
 import sys
 import os
 from pathlib import Path
 
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0")) or (os.cpu_count() or 1)
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "10000"))
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+
 def check_dependencies():
     """Verifica se as dependências estão instaladas"""
     print("🔍 Verificando dependências...")
@@ -33,18 +48,102 @@ def initialize_database():
         print(f"❌ Erro ao inicializar banco: {e}")
         return False
 
-def start_server():
-    """Inicia o servidor FastAPI"""
+def start_server(host: str = HOST, port: int = PORT):
+    """Inicia o servidor FastAPI em modo desenvolvimento (reload)"""
     print("\n🚀 Iniciando servidor...")
     try:
-        os.system("uvicorn app:app --host 0.0.0.0 --port 8000 --reload")
+        subprocess.run([
+            sys.executable, "-m", "uvicorn", "app:app",
+            "--host", host, "--port", str(port), "--reload"
+        ])
     except KeyboardInterrupt:
         print("\n⏹️ Servidor parado pelo usuário")
     except Exception as e:
         print(f"❌ Erro ao iniciar servidor: {e}")
 
+def _event_loop_e_http():
+    """uvloop/httptools quando instalados (mesma escolha do modo "auto" do uvicorn)"""
+    try:
+        import uvloop  # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+    try:
+        import httptools  # noqa: F401
+        http = "httptools"
+    except ImportError:
+        http = "h11"
+    return loop, http
+
+def start_production_server(host: str = HOST, port: int = PORT, workers: int = WEB_CONCURRENCY,
+                            max_requests: int = MAX_REQUESTS, graceful_timeout: int = GRACEFUL_TIMEOUT):
+    """
+    Inicia o servidor em modo produção: gunicorn com workers do uvicorn,
+    app carregado antes do fork (preload), sem reload, SIGTERM com drenagem
+    das requisições em andamento e reinício dos workers a cada
+    `max_requests` requisições (com jitter, para não reiniciarem juntos).
+    Sem gunicorn (ex.: Windows) usa os workers do próprio uvicorn.
+    """
+    loop, http = _event_loop_e_http()
+    print(f"\n🚀 Iniciando servidor (produção): {workers} workers, loop={loop}, http={http}")
+    
+    # Cada worker tem memória própria: o limite de login precisa ser compartilhado
+    os.environ.setdefault("LOGIN_RATE_LIMIT_BACKEND", "sqlite")
+    # O seed abriu conexões no processo principal; não devem ser herdadas no fork
+    from database import engine
+    engine.dispose()
+    
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        BaseApplication = None
+    
+    if BaseApplication is None:
+        import uvicorn
+        print("⚠️ gunicorn não instalado: sem preload e sem reinício por max_requests")
+        uvicorn.run(
+            "app:app", host=host, port=port, workers=workers, loop=loop, http=http,
+            reload=False, timeout_graceful_shutdown=graceful_timeout, log_level="info"
+        )
+        return
+    
+    class ServidorProducao(BaseApplication):
+        def __init__(self, options: dict):
+            self.options = options
+            super().__init__()
+        
+        def load_config(self):
+            for chave, valor in self.options.items():
+                self.cfg.set(chave, valor)
+        
+        def load(self):
+            from app import app
+            return app
+    
+    ServidorProducao({
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "max_requests": max_requests,
+        "max_requests_jitter": max(1, max_requests // 10) if max_requests else 0,
+        "graceful_timeout": graceful_timeout,
+        "timeout": max(60, graceful_timeout * 2),
+        "keepalive": 5,
+        "accesslog": None,  # o app já registra cada requisição (logs.py)
+    }).run()
+
 def main():
     """Função principal"""
+    parser = argparse.ArgumentParser(description="Inicializa o Sistema de Gestão Escolar")
+    parser.add_argument("--modo", choices=["desenvolvimento", "producao"],
+                        default=os.getenv("START_MODE", "desenvolvimento"))
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY)
+    parser.add_argument("--max-requests", type=int, default=MAX_REQUESTS)
+    args = parser.parse_args()
+    
     print("🏫 Sistema de Gestão Escolar")
     print("=" * 40)
     
@@ -57,7 +156,10 @@ def main():
         print("⚠️ Continuando mesmo com erro no banco...")
     
     # Iniciar servidor
-    start_server()
+    if args.modo == "producao":
+        start_production_server(args.host, args.port, args.workers, args.max_requests)
+    else:
+        start_server(args.host, args.port)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# test_alunos.py
+# Listagem de alunos: paginação por chave (keyset) e busca textual
+#
+# Executar: python -m pytest test_alunos.py -q
+import asyncio
+import os
+from urllib.parse import unquote
+
+import pytest
+from sqlalchemy import select
+
+from models import Aluno
+
+def _ids_no_banco(sessoes) -> set:
+    async def consultar():
+        async with sessoes[1]() as db:
+            return set(await db.scalars(select(Aluno.id)))
+    return asyncio.run(consultar())
+
+def test_keyset_walks_every_page_without_gaps_or_repeats(client, headers, sessoes):
+    # Nomes repetidos: o desempate pelo id não pode pular nem repetir alunos
+    for _ in range(5):
+        response = client.post("/alunos", headers=headers, json={
+            "nome": "Aluno Repetido", "data_nascimento": "2012-01-01"
+        })
+        assert response.status_code == 200, response.text
+    
+    ids = []
+    params = {"limit": 7}
+    while True:
+        response = client.get("/alunos", headers=headers, params=params)
+        assert response.status_code == 200, response.text
+        ids.extend(aluno["id"] for aluno in response.json())
+        if "x-next-after-id" not in response.headers:
+            break
+        params = {
+            "limit": 7,
+            "after_id": response.headers["x-next-after-id"],
+            "after_nome": unquote(response.headers["x-next-after-nome"]),
+        }
+    
+    assert len(ids) == len(set(ids))
+    assert set(ids) == _ids_no_banco(sessoes)
+
+def test_after_nome_without_after_id_is_rejected(client, headers):
+    response = client.get("/alunos", headers=headers, params={"after_nome": "M"})
+    assert response.status_code == 422
+
+def test_search_treats_wildcards_literally(client, headers):
+    for termo in ["%", "_", "\\"]:
+        response = client.get("/alunos", headers=headers, params={"search": termo})
+        assert response.status_code == 200, response.text
+        assert response.json() == [], termo
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([os.path.abspath(__file__), "-q"]))
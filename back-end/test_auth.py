@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# test_auth.py
+# Cache do usuário autenticado: alterações de cargo/status valem na hora;
+# o último acesso gravado a cada login não invalida a ETag de /users
+#
+# Executar: python -m pytest test_auth.py -q
+import asyncio
+import os
+from datetime import datetime
+
+import pytest
+
+import auth
+from gerador import SENHA_PADRAO
+from services import UsuarioService
+
+@pytest.fixture
+def cache_longo(monkeypatch):
+    """TTL de uma hora: só a invalidação explica uma mudança imediata"""
+    monkeypatch.setattr(auth.user_cache, "ttl", 3600)
+
+def _login(client, email: str) -> dict:
+    response = client.post("/auth/login", json={"email": email, "senha": SENHA_PADRAO})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def _id_usuario(client, headers, email: str) -> int:
+    usuarios = client.get("/users", headers=headers, params={"limit": 1000}).json()
+    return next(usuario["id"] for usuario in usuarios if usuario["email"] == email)
+
+def test_deactivated_user_is_rejected_immediately(client, headers, cache_longo):
+    user_id = _id_usuario(client, headers, "joao@escola.com")
+    headers_joao = _login(client, "joao@escola.com")
+    assert client.get("/auth/me", headers=headers_joao).status_code == 200  # snapshot em cache
+    
+    response = client.put(f"/users/{user_id}", headers=headers, json={"ativo": False})
+    assert response.status_code == 200, response.text
+    try:
+        assert client.get("/turmas", headers=headers_joao).status_code == 401
+    finally:
+        client.put(f"/users/{user_id}", headers=headers, json={"ativo": True})
+
+def test_demoted_user_loses_access_immediately(client, headers, cache_longo):
+    user_id = _id_usuario(client, headers, "maria@escola.com")
+    assert client.put(f"/users/{user_id}", headers=headers, json={"cargo": "diretor"}).status_code == 200
+    headers_maria = _login(client, "maria@escola.com")
+    assert client.get("/auth/me", headers=headers_maria).status_code == 200  # snapshot em cache
+    assert client.get("/users", headers=headers_maria).status_code == 200
+    
+    response = client.put(f"/users/{user_id}", headers=headers, json={"cargo": "coordenador"})
+    assert response.status_code == 200, response.text
+    assert client.get("/users", headers=headers_maria).status_code == 403
+
+def test_last_access_flush_keeps_users_etag(client, headers, sessoes):
+    response = client.get("/users", headers=headers)
+    etag = response.headers["etag"]
+    ids = [usuario["id"] for usuario in response.json()]
+    
+    async def gravar():
+        async with sessoes[0]() as db:
+            await UsuarioService.registrar_acessos(db, [], {user_id: datetime.utcnow() for user_id in ids})
+            await UsuarioService.update_last_access(db, ids[0])
+    
+    asyncio.run(gravar())
+    response = client.get("/users", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([os.path.abspath(__file__), "-q"]))
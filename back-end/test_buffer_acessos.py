@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# test_buffer_acessos.py
+# Gravação adiada do histórico de login: nada se perde no shutdown
+#
+# Executar: python -m pytest test_buffer_acessos.py -q
+import asyncio
+import os
+
+import pytest
+
+from buffer_acessos import BufferAcessos
+from services import UsuarioService
+
+@pytest.fixture
+def gravados(monkeypatch):
+    """Substitui a gravação no banco por uma lenta que só registra as linhas"""
+    linhas = []
+    
+    async def registrar_acessos(db, historicos, ultimos_acessos):
+        await asyncio.sleep(0.05)
+        linhas.extend(historicos)
+    
+    monkeypatch.setattr(UsuarioService, "registrar_acessos", staticmethod(registrar_acessos))
+    return linhas
+
+def test_stop_during_write_keeps_in_flight_batch(gravados):
+    async def cenario():
+        buffer = BufferAcessos(intervalo_ms=10_000, max_linhas=1, max_pendentes=100)
+        await buffer.iniciar()
+        buffer.registrar_login(1, "127.0.0.1", None, True)  # atinge max_linhas: grava já
+        await asyncio.sleep(0.01)  # gravação em andamento
+        buffer.registrar_login(2, "127.0.0.1", None, False)
+        await buffer.parar()
+        return buffer
+    
+    buffer = asyncio.run(cenario())
+    assert [linha["usuario_id"] for linha in gravados] == [1, 2]
+    assert buffer.profundidade() == 0
+
+def test_cancelled_write_requeues_batch(gravados):
+    async def cenario():
+        buffer = BufferAcessos(intervalo_ms=10_000, max_linhas=100, max_pendentes=100)
+        buffer.registrar_login(1, "127.0.0.1", None, True)
+        gravacao = asyncio.create_task(buffer.gravar())
+        await asyncio.sleep(0.01)
+        gravacao.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await gravacao
+        return buffer
+    
+    buffer = asyncio.run(cenario())
+    assert gravados == []
+    assert buffer.profundidade() == 2  # histórico e último acesso de volta na fila
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([os.path.abspath(__file__), "-q"]))
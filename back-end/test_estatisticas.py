@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# test_estatisticas.py
+# Contadores incrementais do dashboard: depois de cada alteração feita pela
+# API, devem bater com uma recontagem completa das tabelas
+#
+# Executar: python -m pytest test_estatisticas.py -q
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import select, or_
+
+from estatisticas import recalcular_contadores, CONTADORES
+from models import EstatisticaTurma
+from services import StatisticsService
+
+async def _por_turma(db) -> dict:
+    linhas = await db.execute(
+        select(EstatisticaTurma.turma_id, EstatisticaTurma.total_alunos, EstatisticaTurma.alunos_ativos)
+        .where(or_(EstatisticaTurma.total_alunos != 0, EstatisticaTurma.alunos_ativos != 0))
+    )
+    return {turma_id: (total, ativos) for turma_id, total, ativos in linhas}
+
+def assert_contadores_consistentes(sessoes):
+    """Compara os contadores mantidos com a recontagem (desfeita no rollback)"""
+    async def comparar():
+        async with sessoes[0]() as db:
+            stats = await StatisticsService.get_dashboard_stats(db)
+            por_turma = await _por_turma(db)
+            esperado = await db.run_sync(recalcular_contadores)
+            esperado_por_turma = await _por_turma(db)
+            await db.rollback()
+        return stats, por_turma, esperado, esperado_por_turma
+    
+    stats, por_turma, esperado, esperado_por_turma = asyncio.run(comparar())
+    assert {chave: stats[chave] for chave in CONTADORES} == esperado
+    assert stats["alunos_inativos"] == esperado["total_alunos"] - esperado["alunos_ativos"]
+    assert por_turma == esperado_por_turma
+
+def _turmas_com_vaga(client, headers) -> list:
+    turmas = client.get("/turmas", headers=headers).json()
+    return [turma["id"] for turma in turmas if turma["total_alunos"] < turma["capacidade"]]
+
+def test_counters_follow_every_change(client, headers, sessoes):
+    assert_contadores_consistentes(sessoes)
+    turma_a, turma_b = _turmas_com_vaga(client, headers)[:2]
+    
+    response = client.post("/alunos", headers=headers, json={
+        "nome": "Aluno Contado", "data_nascimento": "2012-01-01", "turma_id": turma_a
+    })
+    assert response.status_code == 200, response.text
+    aluno_id = response.json()["id"]
+    assert_contadores_consistentes(sessoes)
+    
+    passos = [
+        {"status": "inativo"},                    # mudança de status
+        {"turma_id": turma_b},                    # mudança de turma (inativo)
+        {"status": "ativo", "turma_id": turma_a},  # as duas juntas
+        {"turma_id": None},                       # sai da turma
+        {"turma_id": turma_b},
+    ]
+    for passo in passos:
+        response = client.put(f"/alunos/{aluno_id}", headers=headers, json=passo)
+        assert response.status_code == 200, response.text
+        assert_contadores_consistentes(sessoes)
+    
+    # Primeira exclusão inativa, a segunda remove de vez
+    for _ in range(2):
+        response = client.delete(f"/alunos/{aluno_id}", headers=headers)
+        assert response.status_code == 200, response.text
+        assert_contadores_consistentes(sessoes)
+    assert client.get(f"/alunos/{aluno_id}", headers=headers).status_code == 404
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([os.path.abspath(__file__), "-q"]))
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# test_exportacao.py
+# Exportação de alunos em streaming (CSV/NDJSON): conteúdo igual ao banco
+#
+# Executar: python -m pytest test_exportacao.py -q
+import asyncio
+import csv
+import io
+import json
+import os
+
+import pytest
+from sqlalchemy import select
+
+import exportacao
+from models import Aluno, Turma, StatusAlunoEnum
+
+@pytest.fixture(autouse=True)
+def sessao_exportacao(sessoes, monkeypatch):
+    """A exportação abre a própria sessão: aponta para o banco do teste"""
+    monkeypatch.setattr(exportacao, "ReadSessionLocal", sessoes[1])
+    # Vários pedaços por resposta, mesmo com poucos alunos
+    monkeypatch.setattr(exportacao, "EXPORT_FLUSH_ROWS", 7)
+
+def _no_banco(sessoes, turma_id=None, status=None) -> dict:
+    """Alunos esperados, por id, com os campos como a exportação os escreve"""
+    async def consultar():
+        query = select(Aluno, Turma.nome).join(Turma, Aluno.turma_id == Turma.id, isouter=True)
+        if turma_id:
+            query = query.where(Aluno.turma_id == turma_id)
+        if status:
+            query = query.where(Aluno.status == status)
+        async with sessoes[1]() as db:
+            return (await db.execute(query)).all()
+    
+    return {
+        aluno.id: {
+            "nome": aluno.nome,
+            "cpf": aluno.cpf,
+            "email": aluno.email,
+            "data_nascimento": aluno.data_nascimento.isoformat(),
+            "status": aluno.status.value,
+            "turma_id": aluno.turma_id,
+            "turma_nome": turma_nome,
+        }
+        for aluno, turma_nome in asyncio.run(consultar())
+    }
+
+def _csv(texto: str) -> dict:
+    leitor = csv.DictReader(io.StringIO(texto))
+    assert leitor.fieldnames == exportacao.COLUNAS
+    return {
+        int(linha["id"]): {
+            "nome": linha["nome"],
+            "cpf": linha["cpf"] or None,
+            "email": linha["email"] or None,
+            "data_nascimento": linha["data_nascimento"],
+            "status": linha["status"],
+            "turma_id": int(linha["turma_id"]) if linha["turma_id"] else None,
+            "turma_nome": linha["turma_nome"] or None,
+        }
+        for linha in leitor
+    }
+
+def _ndjson(texto: str) -> dict:
+    campos = ["nome", "cpf", "email", "data_nascimento", "status", "turma_id", "turma_nome"]
+    registros = [json.loads(linha) for linha in texto.splitlines()]
+    assert all(list(registro) == exportacao.COLUNAS for registro in registros)
+    return {registro["id"]: {campo: registro[campo] for campo in campos} for registro in registros}
+
+LEITORES = {"csv": _csv, "ndjson": _ndjson}
+
+@pytest.mark.parametrize("formato", ["csv", "ndjson"])
+def test_export_matches_database(client, headers, sessoes, formato):
+    response = client.get("/alunos/export", headers=headers, params={"formato": formato})
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith(exportacao.FORMATOS[formato])
+    
+    exportados = LEITORES[formato](response.text)
+    esperados = _no_banco(sessoes)
+    assert len(response.text.splitlines()) == len(esperados) + (formato == "csv")
+    assert exportados == esperados
+
+@pytest.mark.parametrize("formato", ["csv", "ndjson"])
+def test_export_filters_by_turma_and_status(client, headers, sessoes, formato):
+    turma_id = client.get("/turmas", headers=headers).json()[0]["id"]
+    for status in [None, StatusAlunoEnum.ativo, StatusAlunoEnum.inativo]:
+        params = {"formato": formato, **({"status": status.value} if status else {})}
+        response = client.get(f"/turmas/{turma_id}/alunos/export", headers=headers, params=params)
+        assert response.status_code == 200, response.text
+        assert LEITORES[formato](response.text) == _no_banco(sessoes, turma_id, status)
+    
+    response = client.get("/alunos/export", headers=headers,
+                          params={"formato": formato, "status": "inativo"})
+    assert LEITORES[formato](response.text) == _no_banco(sessoes, status=StatusAlunoEnum.inativo)
+
+def test_export_unknown_turma_is_404(client, headers):
+    response = client.get("/turmas/999999/alunos/export", headers=headers)
+    assert response.status_code == 404
+
+def test_export_invalid_format_is_400(client, headers):
+    response = client.get("/alunos/export", headers=headers, params={"formato": "xlsx"})
+    assert response.status_code == 400
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([os.path.abspath(__file__), "-q"]))
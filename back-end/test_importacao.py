@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# test_importacao.py
+# Importação em massa de alunos (POST /alunos/import): leitura do CSV/NDJSON,
+# erros por linha e efeitos nos contadores e nas versões das tabelas
+#
+# Executar: python -m pytest test_importacao.py -q
+import asyncio
+import json
+import os
+
+import pytest
+from sqlalchemy import select
+
+from gerador import digitos_cpf
+from models import Aluno
+from services import StatisticsService
+from versoes import obter_versoes
+
+def cpf_de_teste(numero: int) -> str:
+    """CPF com dígitos verificadores errados: nunca coincide com os do gerador"""
+    base = f"{numero:09d}"
+    dv = "00" if digitos_cpf(base) != "00" else "01"
+    return f"{base[:3]}.{base[3:6]}.{base[6:]}-{dv}"
+
+def importar(client, headers, corpo: str, content_type: str):
+    return client.post("/alunos/import", headers={**headers, "Content-Type": content_type},
+                       content=corpo.encode())
+
+def _alunos_por_cpf(sessoes, *cpfs) -> dict:
+    async def consultar():
+        async with sessoes[1]() as db:
+            return {aluno.cpf: aluno for aluno in await db.scalars(select(Aluno).where(Aluno.cpf.in_(cpfs)))}
+    return asyncio.run(consultar())
+
+def _ndjson(*registros) -> str:
+    return "\n".join(r if isinstance(r, str) else json.dumps(r) for r in registros) + "\n"
+
+def test_csv_quoted_fields_with_commas_and_newlines(client, headers, sessoes):
+    cpf = cpf_de_teste(1)
+    corpo = (
+        "nome,cpf,data_nascimento,endereco,observacoes\r\n"
+        f'Aluno Csv,{cpf},2012-01-01,"Rua A, 10","primeira linha\nsegunda, com ""aspas"""\r\n'
+    )
+    response = importar(client, headers, corpo, "text/csv")
+    assert response.status_code == 200, response.text
+    assert response.json() == {"total_linhas": 1, "importados": 1, "erros": []}
+    
+    aluno = _alunos_por_cpf(sessoes, cpf)[cpf]
+    assert aluno.endereco == "Rua A, 10"
+    assert aluno.observacoes == 'primeira linha\nsegunda, com "aspas"'
+
+def test_ndjson_bad_line_is_reported_and_others_inserted(client, headers, sessoes):
+    cpfs = [cpf_de_teste(10), cpf_de_teste(11)]
+    corpo = _ndjson(
+        {"nome": "Aluno Um", "cpf": cpfs[0], "data_nascimento": "2012-01-01"},
+        '{"nome": "quebrado",',
+        {"nome": "Aluno Dois", "cpf": cpfs[1], "data_nascimento": "2012-01-01"},
+        {"nome": "Aluno Sem Data"},
+    )
+    response = importar(client, headers, corpo, "application/x-ndjson")
+    assert response.status_code == 200, response.text
+    resultado = response.json()
+    assert resultado["total_linhas"] == 4
+    assert resultado["importados"] == 2
+    assert [erro["linha"] for erro in resultado["erros"]] == [2, 4]
+    assert set(_alunos_por_cpf(sessoes, *cpfs)) == set(cpfs)
+
+def test_duplicate_cpf_in_batch_and_in_database(client, headers, sessoes):
+    async def cpf_existente():
+        async with sessoes[1]() as db:
+            return await db.scalar(select(Aluno.cpf).where(Aluno.cpf.is_not(None)).limit(1))
+    
+    existente = asyncio.run(cpf_existente())
+    novo = cpf_de_teste(20)
+    corpo = _ndjson(
+        {"nome": "Aluno Novo", "cpf": novo, "data_nascimento": "2012-01-01"},
+        {"nome": "Aluno Repetido", "cpf": novo, "data_nascimento": "2012-01-01"},
+        {"nome": "Aluno Antigo", "cpf": existente, "data_nascimento": "2012-01-01"},
+    )
+    resultado = importar(client, headers, corpo, "application/x-ndjson").json()
+    assert resultado["importados"] == 1
+    assert resultado["erros"] == [
+        {"linha": 2, "erros": ["CPF já cadastrado para outro aluno"]},
+        {"linha": 3, "erros": ["CPF já cadastrado para outro aluno"]},
+    ]
+    assert _alunos_por_cpf(sessoes, novo)[novo].nome == "Aluno Novo"
+
+def test_full_turma_rejects_extra_rows(client, headers):
+    response = client.post("/turmas", headers=headers, json={
+        "nome": "Turma Lotada", "capacidade": 1, "ano_letivo": "2025"
+    })
+    assert response.status_code == 200, response.text
+    turma_id = response.json()["id"]
+    
+    corpo = _ndjson(*[
+        {"nome": f"Aluno Vaga {i}", "cpf": cpf_de_teste(30 + i), "data_nascimento": "2012-01-01",
+         "turma_id": turma_id}
+        for i in range(2)
+    ])
+    resultado = importar(client, headers, corpo, "application/x-ndjson").json()
+    assert resultado["importados"] == 1
+    assert resultado["erros"] == [{"linha": 2, "erros": ["Turma já atingiu capacidade máxima"]}]
+
+def test_json_array_is_rejected(client, headers):
+    corpo = json.dumps([{"nome": "Aluno Array", "data_nascimento": "2012-01-01"}])
+    assert importar(client, headers, corpo, "application/json").status_code == 415
+
+def test_import_updates_counters_and_version(client, headers, sessoes):
+    async def estado():
+        async with sessoes[1]() as db:
+            return await StatisticsService.get_dashboard_stats(db), await obter_versoes(db, ["alunos"])
+    
+    stats_antes, versoes_antes = asyncio.run(estado())
+    corpo = _ndjson(*[
+        {"nome": f"Aluno Contado {i}", "cpf": cpf_de_teste(40 + i), "data_nascimento": "2012-01-01",
+         "status": "ativo" if i else "inativo"}
+        for i in range(3)
+    ])
+    assert importar(client, headers, corpo, "application/x-ndjson").json()["importados"] == 3
+    
+    stats, versoes = asyncio.run(estado())
+    assert stats["total_alunos"] == stats_antes["total_alunos"] + 3
+    assert stats["alunos_ativos"] == stats_antes["alunos_ativos"] + 2
+    assert versoes["alunos"] > versoes_antes["alunos"]
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([os.path.abspath(__file__), "-q"]))
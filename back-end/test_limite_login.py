@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# test_limite_login.py
+# Limite de tentativas de login: token bucket, bloqueio exponencial, chaves
+# por IP / email + IP / email e o IP do cliente atrás de proxy
+#
+# Executar: python -m pytest test_limite_login.py -q
+import asyncio
+import os
+
+import pytest
+
+import app as app_module
+import auth
+import limite_login
+from limite_login import LimitadorLogin, BackendMemoria, BackendSQLite, Regra, ip_cliente
+
+class Relogio:
+    """Substitui o módulo time em limite_login: o tempo só anda quando o teste manda"""
+    
+    def __init__(self):
+        self.agora = 1_000_000.0
+    
+    def time(self) -> float:
+        return self.agora
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(limite_login, "time", relogio)
+    return relogio
+
+@pytest.fixture(params=["memoria", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memoria":
+        return BackendMemoria()
+    return BackendSQLite(str(tmp_path / "limites_login.db"))
+
+def _estados(limitador, chaves):
+    return asyncio.run(limitador.backend.transacao(chaves, lambda estados: dict(estados)))
+
+# Regras largas: cada teste aperta só a que interessa
+FOLGA = Regra(1000, 1.0, 1000)
+
+def test_token_bucket_refills(backend, relogio):
+    limitador = LimitadorLogin(backend, {"ip": Regra(2, 0.5, 1000), "email_ip": FOLGA, "email": FOLGA})
+    
+    async def tentar():
+        return await limitador.consumir("10.0.0.1", "aluno@escola.com")
+    
+    assert asyncio.run(tentar()) is None
+    assert asyncio.run(tentar()) is None
+    assert asyncio.run(tentar()) == pytest.approx(2.0)  # 1 token a 0,5/s
+    
+    relogio.agora += 2.0
+    assert asyncio.run(tentar()) is None
+    assert asyncio.run(tentar()) is not None
+
+def test_lockout_grows_exponentially_up_to_max(backend, relogio, monkeypatch):
+    monkeypatch.setattr(limite_login, "LOGIN_LOCKOUT_BASE", 1.0)
+    monkeypatch.setattr(limite_login, "LOGIN_LOCKOUT_MAX", 8.0)
+    limitador = LimitadorLogin(backend, {"ip": FOLGA, "email_ip": Regra(1000, 1.0, 3), "email": FOLGA})
+    
+    esperas = []
+    for _ in range(8):
+        asyncio.run(limitador.registrar_falha("10.0.0.1", "aluno@escola.com"))
+        esperas.append(asyncio.run(limitador.consumir("10.0.0.1", "aluno@escola.com")))
+    assert esperas == [None, None, 1.0, 2.0, 4.0, 8.0, 8.0, 8.0]
+
+def test_email_total_lockout_uses_its_own_max(backend, relogio, monkeypatch):
+    monkeypatch.setattr(limite_login, "LOGIN_LOCKOUT_BASE", 1.0)
+    limitador = LimitadorLogin(backend, {"ip": FOLGA, "email_ip": FOLGA, "email": Regra(1000, 1.0, 1, 2.0)})
+    
+    for _ in range(5):
+        asyncio.run(limitador.registrar_falha("10.0.0.1", "aluno@escola.com"))
+    assert asyncio.run(limitador.consumir("10.0.0.2", "aluno@escola.com")) == 2.0
+
+def test_success_clears_only_email_keys(backend, relogio):
+    limitador = LimitadorLogin(backend, {"ip": Regra(1000, 1.0, 1), "email_ip": Regra(1000, 1.0, 1),
+                                         "email": Regra(1000, 1.0, 1)})
+    asyncio.run(limitador.registrar_falha("10.0.0.1", "aluno@escola.com"))
+    asyncio.run(limitador.registrar_sucesso("10.0.0.1", "Aluno@Escola.com "))
+    
+    chaves = limitador.chaves("10.0.0.1", "aluno@escola.com")
+    assert chaves == ["ip:10.0.0.1", "email_ip:aluno@escola.com|10.0.0.1", "email:aluno@escola.com"]
+    estados = _estados(limitador, chaves)
+    assert estados["ip:10.0.0.1"]["falhas"] == 1
+    assert estados["ip:10.0.0.1"]["bloqueado_ate"] > relogio.agora
+    for chave in chaves[1:]:
+        assert estados[chave]["falhas"] == 0 and estados[chave]["bloqueado_ate"] == 0.0
+
+def test_failures_from_one_ip_do_not_lock_owner_elsewhere(relogio):
+    limitador = LimitadorLogin(BackendMemoria())
+    for _ in range(limite_login.LOGIN_LOCKOUT_FALHAS_EMAIL):
+        asyncio.run(limitador.registrar_falha("10.0.0.1", "aluno@escola.com"))
+    assert asyncio.run(limitador.consumir("10.0.0.1", "aluno@escola.com")) is not None
+    assert asyncio.run(limitador.consumir("10.0.0.2", "aluno@escola.com")) is None
+
+def test_client_ip_behind_trusted_proxy(monkeypatch):
+    xff = "203.0.113.9, 198.51.100.7, 10.0.0.2"
+    assert ip_cliente("10.0.0.1", xff) == "10.0.0.1"  # sem FORWARDED_ALLOW_IPS
+    
+    monkeypatch.setattr(limite_login, "FORWARDED_ALLOW_IPS", {"10.0.0.1", "10.0.0.2"})
+    assert ip_cliente("10.0.0.1", xff) == "198.51.100.7"  # o primeiro pode ser forjado
+    assert ip_cliente("10.0.0.1", "10.0.0.2") == "10.0.0.2"
+    assert ip_cliente("10.0.0.1", None) == "10.0.0.1"
+    assert ip_cliente("203.0.113.50", xff) == "203.0.113.50"  # conexão de fora do proxy
+    
+    monkeypatch.setattr(limite_login, "FORWARDED_ALLOW_IPS", {"*"})
+    assert ip_cliente("10.0.0.1", xff) == "203.0.113.9"  # todos confiáveis: o mais antigo
+
+def test_failures_spread_over_many_ips_lock_the_account(client, monkeypatch):
+    # Atrás do proxy (o TestClient conecta como "testclient"), cada
+    # tentativa vem de outro IP: só o total por email segura o ataque
+    monkeypatch.setattr(limite_login, "FORWARDED_ALLOW_IPS", {"testclient"})
+    credenciais = {"email": "vitima@escola.com", "senha": "errada"}
+    
+    for i in range(limite_login.LOGIN_LOCKOUT_FALHAS_EMAIL_TOTAL):
+        response = client.post("/auth/login", json=credenciais,
+                               headers={"X-Forwarded-For": f"203.0.113.{i}"})
+        assert response.status_code == 401, response.text
+    
+    response = client.post("/auth/login", json=credenciais, headers={"X-Forwarded-For": "198.51.100.1"})
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+
+def test_rate_limited_login_skips_authentication(client, monkeypatch):
+    email = "bloqueado@escola.com"
+    
+    async def bloquear():
+        for _ in range(limite_login.LOGIN_LOCKOUT_FALHAS_EMAIL):
+            await app_module.limitador_login.registrar_falha("testclient", email)
+    
+    asyncio.run(bloquear())
+    chamadas = []
+    
+    async def authenticate_user(*args):
+        chamadas.append("authenticate_user")
+    
+    monkeypatch.setattr(app_module, "authenticate_user", authenticate_user)
+    monkeypatch.setattr(auth._password_executor, "submit",
+                        lambda *args, **kwargs: chamadas.append("bcrypt"))
+    
+    response = client.post("/auth/login", json={"email": email, "senha": "123456"})
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+    assert chamadas == []
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([os.path.abspath(__file__), "-q"]))
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# test_query_budget.py
+# Executa as rotas de leitura com SQL_QUERY_BUDGET=raise: falha se alguma rota
+# passar do orçamento de consultas (@orcamento_consultas) ou tiver N+1.
+# Roda em SQLite e, quando disponível, em PostgreSQL (fixtures em conftest.py).
+#
+# Executar: python -m pytest test_query_budget.py -q
+import asyncio
+import os
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import delete, update
+from sqlalchemy.exc import DBAPIError
+
+import app as app_module
+import estatisticas
+import instrumentacao
+from app import app
+from estatisticas import recalcular_contadores, iniciar_pedidos_reconciliacao
+from instrumentacao import OrcamentoConsultasExcedido
+from models import Turma, EstatisticaContador
+
+# Rotas de leitura usadas pelo front-end
+ROTAS = [
+    "/auth/me",
+    "/users",
+    "/users/1",
+    "/turmas",
+    "/turmas?ativas_apenas=false",
+    "/turmas/1",
+    "/alunos",
+    "/alunos?search=silva",
+    "/alunos?turma_id=1&status=ativo",
+    "/alunos?after_id=20&after_nome=M",
+    "/alunos/1",
+    "/statistics",
+]
+
+@pytest.mark.parametrize("rota", ROTAS)
+def test_route_within_query_budget(client, headers, rota):
+    response = client.get(rota, headers=headers)
+    assert response.status_code == 200, response.text
+
+def test_conditional_request_within_budget(client, headers):
+    etag = client.get("/alunos", headers=headers).headers["etag"]
+    response = client.get("/alunos", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+def test_etag_changes_with_date(client, headers, monkeypatch):
+    # A idade dos alunos depende da data: a ETag de ontem não vale mais
+    etag = client.get("/alunos", headers=headers).headers["etag"]
+    assert etag.startswith('W/"')
+    
+    class Amanha(date):
+        @classmethod
+        def today(cls):
+            return date.today() + timedelta(days=1)
+    
+    monkeypatch.setattr(app_module, "date", Amanha)
+    response = client.get("/alunos", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+
+def test_server_timing_breakdown(client, headers):
+    timing = client.get("/alunos", headers=headers).headers["server-timing"]
+    fases = dict(item.split(";dur=") for item in timing.split(", "))
+    assert list(fases) == ["auth", "db", "app", "ser", "total"]
+    assert float(fases["db"]) > 0 and float(fases["total"]) >= float(fases["db"])
+
+def test_budget_violation_raises(client, headers, monkeypatch):
+    endpoint = next(r.endpoint for r in app.routes if getattr(r, "path", None) == "/users/{user_id}")
+    monkeypatch.setattr(endpoint, "_orcamento_consultas", (0, True))
+    with pytest.raises(OrcamentoConsultasExcedido):
+        client.get("/users/1", headers=headers)
+
+def test_read_routes_do_not_use_write_session(client, headers, sessoes):
+    comandos_escrita = sessoes[2]
+    comandos_escrita.clear()
+    for rota in ROTAS:
+        assert client.get(rota, headers=headers).status_code == 200
+    assert comandos_escrita == []
+
+def test_read_session_rejects_writes(sessoes):
+    async def gravar():
+        async with sessoes[1]() as db:
+            await db.execute(update(Turma).where(Turma.id == 1).values(capacidade=99))
+            await db.commit()
+    
+    with pytest.raises(DBAPIError):
+        asyncio.run(gravar())
+
+def test_statistics_counts_missing_counters_read_only(client, headers, sessoes, monkeypatch):
+    async def apagar_contadores():
+        async with sessoes[0]() as db:
+            await db.execute(delete(EstatisticaContador))
+            await db.commit()
+    
+    async def recontar():
+        async with sessoes[0]() as db:
+            valores = await db.run_sync(recalcular_contadores)
+            await db.commit()
+        return valores
+    
+    asyncio.run(apagar_contadores())
+    monkeypatch.setattr(estatisticas, "_pedido_reconciliacao", None)  # restaurado no teardown
+    pedido = iniciar_pedidos_reconciliacao()
+    comandos_escrita = sessoes[2]
+    comandos_escrita.clear()
+    # A contagem nas tabelas de origem fica fora do orçamento da rota
+    monkeypatch.setattr(instrumentacao, "SQL_QUERY_BUDGET", "off")
+    try:
+        response = client.get("/statistics", headers=headers)
+        assert response.status_code == 200, response.text
+        assert comandos_escrita == []
+        assert pedido.is_set()  # a tarefa periódica reconcilia em seguida
+    finally:
+        esperado = asyncio.run(recontar())
+    
+    stats = response.json()
+    assert {chave: stats[chave] for chave in esperado} == esperado
+    assert sum(turma["total"] for turma in stats["alunos_por_turma"]) == esperado["total_alunos"]
+
+def test_normalize_collapses_literals_and_in_lists():
+    a = instrumentacao.normalizar("SELECT * FROM alunos WHERE id IN (?, ?, ?) AND nome = 'Ana'")
+    b = instrumentacao.normalizar("SELECT *  FROM alunos\nWHERE id IN (?) AND nome = 'Bia'")
+    assert a == b == "SELECT * FROM alunos WHERE id IN (?) AND nome = ?"
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([os.path.abspath(__file__), "-q"]))
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# test_query_plans.py
+# Verifica com EXPLAIN QUERY PLAN que as consultas dos serviços usam índices
+#
+# Executar: python -m pytest test_query_plans.py -q
+import asyncio
+import os
+import re
+import sqlite3
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from models import Base, Usuario, Turma, Aluno, HistoricoLogin, CargoEnum, StatusAlunoEnum
+from schemas import (
+    UsuarioCreate, UsuarioUpdate, TurmaCreate, TurmaUpdate, AlunoCreate, AlunoUpdate
+)
+from search import ensure_search_index
+from estatisticas import reconciliar_estatisticas
+from retencao import executar_retencao, create_arquivo_engine
+from services import UsuarioService, TurmaService, AlunoService, StatisticsService
+from auth import authenticate_user, get_password_hash
+
+# Tabelas que crescem com o uso; varredura completa nelas reprova o teste.
+# estatisticas/estatisticas_turma têm uma linha por contador/turma.
+HOT_TABLES = {"alunos", "turmas", "usuarios", "historico_login"}
+
+# Consultas liberadas da checagem:
+#   reconciliar_estatisticas -> manutenção periódica, reconta tudo por definição
+#   UsuarioService.get_users -> percorre usuarios na ordem da PK com LIMIT
+#   AlunoService.stream_alunos (todos) -> exportação completa, lê tudo por definição
+FULL_SCAN_ALLOWED = {
+    "reconciliar_estatisticas", "UsuarioService.get_users", "AlunoService.stream_alunos (todos)"
+}
+
+# Índices parciais (ix_turmas_ativas, ...): percorrê-los lê só as linhas do filtro
+PARTIAL_INDEXES = {
+    index.name
+    for table in Base.metadata.tables.values()
+    for index in table.indexes
+    if index.dialect_options["sqlite"]["where"] is not None
+}
+
+def is_full_scan(detail: str, statement: str) -> bool:
+    """
+    Linha do plano que lê uma tabela quente inteira: SCAN sem índice ou
+    percorrendo um índice completo (SCAN ... USING INDEX). Percorrer um
+    índice só é aceito se ele é parcial ou se a consulta tem LIMIT (listagem
+    paginada na ordem do índice, que para ao completar a página).
+    """
+    match = re.match(r"SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?", detail)
+    if not match or match.group(1) not in HOT_TABLES:
+        return False
+    indice = match.group(2)
+    if indice is None:
+        return True
+    if indice in PARTIAL_INDEXES:
+        return False
+    return not re.search(r"\bLIMIT\b", statement, re.IGNORECASE)
+
+def seed(db_path: str):
+    """Popula um banco temporário com volume suficiente para o planner"""
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    
+    senha_hash = get_password_hash("123456")
+    with sessionmaker(bind=engine)() as db:
+        db.add_all([
+            Usuario(nome=f"Usuario {i}", email=f"user{i}@escola.com", senha_hash=senha_hash,
+                    cargo=CargoEnum.diretor, ativo=i % 5 != 0)
+            for i in range(20)
+        ])
+        turmas = [
+            Turma(nome=f"TURMA {i}", capacidade=100, ano_letivo="2025", ativa=i % 4 == 0)
+            for i in range(40)
+        ]
+        db.add_all(turmas)
+        db.flush()
+        db.add_all([
+            Aluno(
+                nome=f"Aluno {i:05d}",
+                cpf=f"{i:011d}",
+                email=f"aluno{i}@escola.com",
+                data_nascimento=date(2010, 1, 1),
+                status=StatusAlunoEnum.ativo if i % 7 else StatusAlunoEnum.inativo,
+                turma_id=turmas[i % len(turmas)].id,
+            )
+            for i in range(2000)
+        ])
+        db.add_all([
+            HistoricoLogin(usuario_id=(i % 20) + 1, ip_address="127.0.0.1", sucesso=i % 3 != 0,
+                           data_login=datetime(2025, 1, 1) + timedelta(hours=i))
+            for i in range(500)
+        ])
+        db.commit()
+    engine.dispose()
+
+async def exercise(db_factory, mark, arquivo_engine):
+    """Chama cada consulta dos serviços, marcando qual está executando"""
+    async with db_factory() as db:
+        mark("authenticate_user")
+        await authenticate_user(db, "user1@escola.com", "123456")
+        mark("UsuarioService.get_user_by_id")
+        await UsuarioService.get_user_by_id(db, 1)
+        mark("UsuarioService.get_user_by_email")
+        await UsuarioService.get_user_by_email(db, "user2@escola.com")
+        mark("UsuarioService.get_users")
+        await UsuarioService.get_users(db, 0, 100)
+        mark("UsuarioService.create_user")
+        await UsuarioService.create_user(db, UsuarioCreate(
+            nome="Novo Usuario", email="novo@escola.com", senha="123456", cargo="professor"
+        ))
+        mark("UsuarioService.update_user")
+        await UsuarioService.update_user(db, 2, UsuarioUpdate(ativo=False))
+        mark("UsuarioService.update_last_access")
+        await UsuarioService.update_last_access(db, 1)
+        mark("UsuarioService.registrar_acessos")
+        await UsuarioService.registrar_acessos(db, [
+            {"usuario_id": 1, "ip_address": "127.0.0.1", "user_agent": None, "sucesso": True}
+        ], {1: date(2025, 1, 1)})
+        
+        mark("TurmaService.create_turma")
+        turma = await TurmaService.create_turma(db, TurmaCreate(
+            nome="nova turma", capacidade=30, ano_letivo="2025"
+        ))
+        mark("TurmaService.get_turma_by_id")
+        await TurmaService.get_turma_by_id(db, turma.id)
+        mark("TurmaService.get_turmas")
+        await TurmaService.get_turmas(db, 0, 100, True)
+        mark("TurmaService.get_turmas_with_stats")
+        await TurmaService.get_turmas_with_stats(db, 0, 100, True)
+        mark("TurmaService.update_turma")
+        await TurmaService.update_turma(db, turma.id, TurmaUpdate(capacidade=35))
+        mark("TurmaService.delete_turma")
+        await TurmaService.delete_turma(db, turma.id)
+        
+        mark("AlunoService.create_aluno")
+        aluno = await AlunoService.create_aluno(db, AlunoCreate(
+            nome="aluno novo", cpf="999.999.999-99", email="novo.aluno@escola.com",
+            data_nascimento=date(2011, 5, 5), turma_id=2
+        ))
+        mark("AlunoService.get_aluno_by_id")
+        await AlunoService.get_aluno_by_id(db, aluno.id)
+        mark("AlunoService.get_alunos")
+        await AlunoService.get_alunos(db)
+        await AlunoService.get_alunos(db, skip=50)
+        await AlunoService.get_alunos(db, turma_id=3)
+        await AlunoService.get_alunos(db, status=StatusAlunoEnum.inativo)
+        await AlunoService.get_alunos(db, turma_id=3, status=StatusAlunoEnum.ativo)
+        await AlunoService.get_alunos(db, after_id=100)
+        await AlunoService.get_alunos(db, after_id=100, after_nome="Aluno 00100")
+        await AlunoService.get_alunos(db, search="aluno 0001")
+        await AlunoService.get_alunos(db, search="00000000042", status=StatusAlunoEnum.ativo)
+        mark("AlunoService.import_alunos_lote")
+        await AlunoService.import_alunos_lote(db, [
+            (2, {"nome": "aluno importado", "cpf": "777.777.777-77", "email": "importado@escola.com",
+                 "data_nascimento": "2012-03-03", "turma_id": 4}, None),
+            (3, {"nome": "aluno repetido", "cpf": "00000000001"}, None),
+            (4, None, "JSON inválido"),
+        ])
+        mark("AlunoService.stream_alunos")
+        async for _ in AlunoService.stream_alunos(db, turma_id=3):
+            pass
+        async for _ in AlunoService.stream_alunos(db, turma_id=3, status=StatusAlunoEnum.ativo):
+            pass
+        mark("AlunoService.stream_alunos (todos)")
+        async for _ in AlunoService.stream_alunos(db):
+            pass
+        mark("AlunoService.update_aluno")
+        await AlunoService.update_aluno(db, aluno.id, AlunoUpdate(
+            email="outro.email@escola.com", cpf="888.888.888-88", status="inativo"
+        ))
+        mark("AlunoService.delete_aluno")
+        await AlunoService.delete_aluno(db, aluno.id)
+        
+        mark("StatisticsService.get_dashboard_stats")
+        await StatisticsService.get_dashboard_stats(db)
+        mark("reconciliar_estatisticas")
+        await reconciliar_estatisticas(db)
+        mark("executar_retencao")
+        await executar_retencao(db, arquivo_engine, dias=30)
+
+@pytest.fixture(scope="module")
+def query_plans(tmp_path_factory):
+    """Executa os serviços em um banco temporário e coleta os planos"""
+    db_path = str(tmp_path_factory.mktemp("plans") / "escola.db")
+    seed(db_path)
+    
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    statements = []
+    context = {"atual": None}
+    
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, exec_context, executemany):
+        if not executemany:
+            statements.append((context["atual"], statement, parameters))
+    
+    def mark(nome):
+        context["atual"] = nome
+    
+    async def run():
+        arquivo_engine = create_arquivo_engine(db_path.replace("escola.db", "arquivo.db"))
+        await exercise(async_sessionmaker(bind=engine, expire_on_commit=False), mark, arquivo_engine)
+        await arquivo_engine.dispose()
+        await engine.dispose()
+    
+    asyncio.run(run())
+    
+    conn = sqlite3.connect(db_path)
+    plans = []
+    for origem, statement, parameters in statements:
+        if not re.match(r"\s*(SELECT|UPDATE|DELETE)", statement, re.IGNORECASE):
+            continue
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        plans.append((origem, statement, [row[3] for row in rows]))
+    conn.close()
+    return plans
+
+def test_all_services_were_exercised(query_plans):
+    origens = {origem for origem, _, _ in query_plans}
+    for nome in ["AlunoService.get_alunos", "TurmaService.get_turmas_with_stats",
+                 "StatisticsService.get_dashboard_stats", "AlunoService.create_aluno",
+                 "AlunoService.import_alunos_lote", "AlunoService.stream_alunos"]:
+        assert nome in origens
+
+def test_no_full_table_scans(query_plans):
+    violations = []
+    for origem, statement, details in query_plans:
+        if origem in FULL_SCAN_ALLOWED:
+            continue
+        for detail in details:
+            if is_full_scan(detail, statement):
+                violations.append(f"{origem}: {detail}\n    {' '.join(statement.split())}")
+    assert not violations, "Varredura completa em consultas quentes:\n" + "\n".join(violations)
+
+def test_full_index_scan_is_flagged():
+    assert is_full_scan("SCAN alunos", "SELECT * FROM alunos LIMIT ?")
+    assert is_full_scan("SCAN alunos USING INDEX ix_alunos_nome", "SELECT * FROM alunos ORDER BY nome")
+    assert is_full_scan("SCAN alunos USING COVERING INDEX ix_alunos_nome", "SELECT nome FROM alunos")
+    assert not is_full_scan("SCAN alunos USING INDEX ix_alunos_nome", "SELECT * FROM alunos ORDER BY nome LIMIT ?")
+    assert not is_full_scan("SCAN turmas USING INDEX ix_turmas_ativas", "SELECT count(*) FROM turmas WHERE ativa = 1")
+
+def test_capacity_check_uses_turma_status_index(query_plans):
+    details = [
+        d for origem, statement, plan in query_plans
+        if origem == "AlunoService.create_aluno" and "count" in statement.lower()
+        for d in plan
+    ]
+    assert any("ix_alunos_turma_status" in d for d in details), details
+
+def test_active_turmas_use_partial_index(query_plans):
+    details = [
+        d for origem, _, plan in query_plans
+        if origem == "TurmaService.get_turmas_with_stats"
+        for d in plan
+    ]
+    assert any("ix_turmas_ativas" in d for d in details), details
+
+def test_retention_archives_by_date_index(query_plans):
+    details = [
+        d for origem, statement, plan in query_plans
+        if origem == "executar_retencao" and statement.lstrip().upper().startswith("SELECT")
+        and "data_login <" in statement
+        for d in plan
+    ]
+    assert any("ix_historico_login_data" in d for d in details), details
+
+def test_search_uses_fts_index(query_plans):
+    details = [
+        d for origem, statement, plan in query_plans
+        if origem == "AlunoService.get_alunos" and "alunos_fts" in statement
+        for d in plan
+    ]
+    assert details and any("VIRTUAL TABLE" in d for d in details), details
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([os.path.abspath(__file__), "-q"]))
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# test_retencao.py
+# Retenção do historico_login: resumos idempotentes e arquivamento sem perdas
+#
+# Executar: python -m pytest test_retencao.py -q
+import asyncio
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, delete, func
+
+import retencao
+from models import HistoricoLogin, ResumoLoginUsuario, ResumoLoginIp
+from retencao import executar_retencao, arquivar_historico, create_arquivo_engine, historico_arquivo
+
+DIAS = 5
+
+@pytest.fixture
+def historico(sessoes):
+    """
+    Histórico conhecido: 10 dias até hoje, 4 a 7 logins por dia em dois IPs.
+    Retorna {id: data_login} das linhas inseridas.
+    """
+    hoje = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    linhas = [
+        HistoricoLogin(usuario_id=(i % 3), ip_address=f"10.0.0.{i % 2}", sucesso=i % 3 != 0,
+                       data_login=hoje - timedelta(days=dia) + timedelta(hours=1 + i))
+        for dia in range(10)
+        for i in range(4 + dia % 4)
+    ]
+    
+    async def preparar():
+        async with sessoes[0]() as db:
+            for tabela in (HistoricoLogin, ResumoLoginUsuario, ResumoLoginIp):
+                await db.execute(delete(tabela))
+            db.add_all(linhas)
+            await db.commit()
+            return dict((await db.execute(select(HistoricoLogin.id, HistoricoLogin.data_login))).all())
+    
+    return asyncio.run(preparar())
+
+@pytest.fixture
+def arquivo_path(tmp_path):
+    return str(tmp_path / "arquivo.db")
+
+def _estado(sessoes, arquivo_path):
+    """(ids no principal, ids no arquivo, logins por dia nos dois resumos)"""
+    async def consultar():
+        arquivo_engine = create_arquivo_engine(arquivo_path)
+        try:
+            async with arquivo_engine.connect() as conn:
+                arquivados = list(await conn.scalars(select(historico_arquivo.c.id)))
+        finally:
+            await arquivo_engine.dispose()
+        async with sessoes[1]() as db:
+            principal = list(await db.scalars(select(HistoricoLogin.id)))
+            por_usuario = dict((await db.execute(
+                select(ResumoLoginUsuario.dia, func.sum(ResumoLoginUsuario.sucessos + ResumoLoginUsuario.falhas))
+                .group_by(ResumoLoginUsuario.dia)
+            )).all())
+            por_ip = dict((await db.execute(
+                select(ResumoLoginIp.dia, func.sum(ResumoLoginIp.sucessos + ResumoLoginIp.falhas))
+                .group_by(ResumoLoginIp.dia)
+            )).all())
+        return principal, arquivados, por_usuario, por_ip
+    return asyncio.run(consultar())
+
+def _executar(sessoes, arquivo_path, funcao, *args, **kwargs):
+    async def rodar():
+        arquivo_engine = create_arquivo_engine(arquivo_path)
+        try:
+            async with sessoes[0]() as db:
+                return await funcao(db, arquivo_engine, *args, **kwargs)
+        finally:
+            await arquivo_engine.dispose()
+    return asyncio.run(rodar())
+
+def test_retention_archives_old_rows_and_is_idempotent(sessoes, historico, arquivo_path):
+    hoje = datetime.utcnow().date()
+    corte = datetime.combine(hoje - timedelta(days=DIAS), datetime.min.time())
+    antigos = {id_ for id_, data in historico.items() if data < corte}
+    esperado_por_dia = Counter(data.date() for data in historico.values() if data.date() < hoje)
+    assert antigos and len(antigos) < len(historico)
+    
+    for _ in range(2):
+        _executar(sessoes, arquivo_path, executar_retencao, dias=DIAS)
+        principal, arquivados, por_usuario, por_ip = _estado(sessoes, arquivo_path)
+        
+        assert set(arquivados) == antigos and len(arquivados) == len(antigos)
+        assert set(principal) == set(historico) - antigos
+        # Nenhum dia contado duas vezes, nem os já arquivados
+        assert por_usuario == esperado_por_dia
+        assert por_ip == esperado_por_dia
+
+def test_failure_mid_archive_loses_nothing(sessoes, historico, arquivo_path, monkeypatch):
+    corte = datetime.combine(datetime.utcnow().date() - timedelta(days=DIAS), datetime.min.time())
+    antigos = {id_ for id_, data in historico.items() if data < corte}
+    
+    # O segundo lote é copiado para o arquivo e falha antes de sair do principal
+    delete_original = retencao.delete
+    chamadas = []
+    
+    def delete_com_falha(*args, **kwargs):
+        chamadas.append(args)
+        if len(chamadas) == 2:
+            raise RuntimeError("falha simulada")
+        return delete_original(*args, **kwargs)
+    
+    monkeypatch.setattr(retencao, "delete", delete_com_falha)
+    with pytest.raises(RuntimeError):
+        _executar(sessoes, arquivo_path, arquivar_historico, corte, lote=4, pausa=0)
+    
+    principal, arquivados, _, _ = _estado(sessoes, arquivo_path)
+    assert set(historico) == set(principal) | set(arquivados)       # nada perdido
+    assert set(historico) - set(principal) <= set(arquivados)       # só sai quem foi arquivado
+    assert len(arquivados) == len(set(arquivados))
+    assert set(principal) & set(arquivados)  # o lote da falha ficou nos dois
+    
+    # A nova execução termina o trabalho sem duplicar linhas no arquivo
+    monkeypatch.setattr(retencao, "delete", delete_original)
+    _executar(sessoes, arquivo_path, arquivar_historico, corte, lote=4, pausa=0)
+    principal, arquivados, _, _ = _estado(sessoes, arquivo_path)
+    assert sorted(arquivados) == sorted(antigos)
+    assert set(principal) == set(historico) - antigos
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([os.path.abspath(__file__), "-q"]))
@@ -0,0 +1,83 @@
+# versoes.py
+# Versões por tabela para ETags e respostas condicionais (304)
+import hashlib
+import time
+from typing import Iterable
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from models import Usuario, Turma, Aluno, VersaoTabela
+from dialetos import upsert_insert
+
+# Modelos cujas alterações invalidam as respostas em cache. Exceção:
+# Usuario.ultimo_acesso, gravado em UPDATE direto (fora do after_flush) a
+# cada login, não versiona "usuarios"; senão todo login invalidaria as ETags
+# de /users e /statistics. Um 304 pode trazer um ultimo_acesso antigo até a
+# próxima alteração real de usuário.
+TABELAS_VERSIONADAS = {
+    Usuario: "usuarios",
+    Turma: "turmas",
+    Aluno: "alunos",
+}
+
+def _tabela(obj):
+    for cls, tabela in TABELAS_VERSIONADAS.items():
+        if isinstance(obj, cls):
+            return tabela
+    return None
+
+def registrar_alteracao(session: Session, *tabelas: str):
+    """
+    Incrementa a versão das tabelas na transação atual. Uma tabela sem
+    versão começa no instante atual (ms), para que um banco recriado não
+    repita versões (e ETags) já vistas pelos clientes.
+    """
+    conn = session.connection()
+    # Ordem fixa: transações concorrentes travam as linhas na mesma sequência
+    # (no PostgreSQL, ordens diferentes podem causar deadlock)
+    for tabela in sorted(set(tabelas)):
+        stmt = upsert_insert(conn, VersaoTabela).values(tabela=tabela, versao=int(time.time() * 1000))
+        conn.execute(stmt.on_conflict_do_update(
+            index_elements=[VersaoTabela.tabela],
+            set_={"versao": VersaoTabela.versao + 1}
+        ))
+
+def _incrementar_versoes(session: Session, flush_context):
+    """Listener after_flush: versiona as tabelas alteradas neste flush"""
+    tabelas = {_tabela(obj) for obj in session.new}
+    tabelas |= {_tabela(obj) for obj in session.deleted}
+    tabelas |= {_tabela(obj) for obj in session.dirty if session.is_modified(obj)}
+    tabelas.discard(None)
+    if tabelas:
+        registrar_alteracao(session, *tabelas)
+
+event.listen(Session, "after_flush", _incrementar_versoes)
+
+async def obter_versoes(db, tabelas: Iterable[str]) -> dict:
+    """Versão atual de cada tabela (0 se nunca alterada)"""
+    tabelas = sorted(set(tabelas))
+    result = await db.execute(
+        select(VersaoTabela.tabela, VersaoTabela.versao).where(VersaoTabela.tabela.in_(tabelas))
+    )
+    versoes = dict(result.all())
+    return {tabela: versoes.get(tabela, 0) for tabela in tabelas}
+
+def calcular_etag(recurso: str, versoes: dict, parametros: str = "") -> str:
+    """
+    ETag fraca a partir do recurso, dos parâmetros e das versões. Fraca
+    porque o mesmo conteúdo sai em bytes diferentes com e sem compressão.
+    """
+    base = "|".join([recurso, parametros] + [f"{t}={v}" for t, v in sorted(versoes.items())])
+    return 'W/"' + hashlib.sha1(base.encode()).hexdigest() + '"'
+
+def etag_corresponde(if_none_match: str, etag: str) -> bool:
+    """Compara o header If-None-Match com a ETag atual (comparação fraca)"""
+    if not if_none_match:
+        return False
+    etag = etag.removeprefix("W/")
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*" or candidato.removeprefix("W/") == etag:
+            return True
+    return False